@@ -1,12 +1,232 @@
-from google import genai
-from typing import Dict
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Type, TypeVar
 
-class StockAnalyzer:
-    def __init__(self, api_key: str):
-        self.client = genai.Client(api_key=api_key)
-        self.model_id = "gemini-2.5-flash"
+from pydantic import BaseModel, ValidationError
+
+from .context_packer import DEFAULT_CONTEXT_TOKENS, ContextPacker, TokenCounter
+from .digest_store import DigestStore
+from .llm_cache import ResponseCache, response_key
+from .llm_executor import DEFAULT_MODEL_ID, GeminiExecutor, GenAIBackend, InvalidResponseError
+from .profiling import profiler
+from .schemas import MultiYearVerdict, QualitativeAnalysis, structured_config
+from .section_diff import previous_dates, year_over_year
+
+# First stage of the two-stage multi-year analysis: a compact, factual digest of one filing.
+DIGEST_PROMPT = """
+Extract a factual digest of the 10-K filing of {ticker} dated {date}.
+It will be compared against digests of the company's other 10-K filings, so record what the filing says, not your opinion of it.
+
+Use exactly these headings, with short bullet points under each:
+
+## Moat Claims
+Competitive advantages management claims (brand, network effects, switching costs, scale, pricing power), with any supporting metrics.
+
+## Risks
+Each material risk in a few words. Mark risks described as already happening ("has", "is experiencing") with [REALIZED].
+
+## Capital Allocation
+Buybacks, dividends, acquisitions, goodwill, debt, share count, stock-based compensation and capex, with figures where given.
+
+## Strategy and Management Claims
+Stated strategy, goals, new initiatives, and any initiatives described as discontinued or deprioritized.
+
+## Tone
+Promotional, defensive or non-GAAP-heavy language, with short quotes.
+
+Stay under 600 words.
+
+---
+
+BUSINESS SECTION (EXCERPTS):
+{business}
+
+MANAGEMENT DISCUSSION & ANALYSIS (EXCERPTS):
+{mda}
+
+RISK FACTORS (EXCERPTS):
+{risk}
+"""
+DIGEST_PROMPT_VERSION = hashlib.sha256(DIGEST_PROMPT.encode("utf-8")).hexdigest()[:12]
+
+# Heading of the XBRL table from financials.py, placed ahead of the filing text when available.
+FINANCIALS_HEADING = ("REPORTED FINANCIALS (from the company's XBRL filings, computed locally; "
+                      "rely on these figures rather than estimating them from the text):")
+
+# Share of the synthesis call's budget spent on year-over-year Risk Factor changes.
+CHANGES_BUDGET_FRACTION = 0.25
 
-    def analyze_qualitative(self, ticker: str, business_text: str, mda_text: str, risk_text: str) -> str:
+# Free-text report layouts. Structured requests replace them with STRUCTURED_OUTPUT_FORMAT
+# and a response schema from schemas.py.
+QUALITATIVE_OUTPUT_FORMAT = """OUTPUT FORMAT:
+
+        1. Durable Competitive Advantages: [RATING]
+        Justification: ...
+
+        2. Reinvestment Opportunities: [RATING]
+        Justification: ...
+
+        3. Management Capability: [RATING]
+        Justification: ...
+
+        4. Risk Profile: [RATING]
+        Justification: ...
+
+        5. Thesis-Breaking Scenarios:
+        Scenario 1:
+        Trigger:
+        Mechanism:
+        Management Preparedness:
+        Severity:
+
+        Scenario 2:
+        ...
+
+        Scenario 3:
+        ..."""
+
+MULTI_YEAR_OUTPUT_FORMAT = """OUTPUT FORMAT:
+
+# Multi-Year Forensic Analysis: {ticker}
+
+## Moat Durability
+...
+
+## Strategic Discipline
+...
+
+## Risk Escalation
+...
+
+## Management Credibility
+...
+
+## Capital Allocation Quality
+...
+
+## Final Quality Score
+Score: [SCORE]
+Rationale: ..."""
+
+STRUCTURED_OUTPUT_FORMAT = "OUTPUT FORMAT: a JSON object matching the response schema, with the ratings, justifications and scenarios described above."
+
+Schema = TypeVar("Schema", bound=BaseModel)
+
+class StockAnalyzer:
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 digests: Optional[DigestStore] = None, digest_workers: int = 4,
+                 context_tokens: int = DEFAULT_CONTEXT_TOKENS, executor: Optional[GeminiExecutor] = None):
+        """
+        cache: answers byte-identical requests without calling Gemini again.
+        digests: per-filing digests reused by analyze_multi_year_incremental.
+        digest_workers: filings digested concurrently, further capped by the executor's max_in_flight
+            so that concurrent analyses sharing the executor stay within one Gemini concurrency limit.
+        context_tokens: filing text allowed per Gemini call, packed by ContextPacker.
+        executor: runs the model calls; defaults to Gemini via api_key with default limits.
+        """
+        if executor is None:
+            from google import genai  # Deferred: the SDK takes about half a second to import
+            executor = GeminiExecutor(GenAIBackend(genai.Client(api_key=api_key)))
+        self.executor = executor
+        self.model_id = DEFAULT_MODEL_ID
+        self.generation_config: Optional[Dict] = None
+        self.packer = ContextPacker(TokenCounter(self.model_id), context_tokens)
+        self.cache = cache
+        self.digests = digests
+        self.digest_workers = digest_workers
+
+    def generate(self, prompt: str, on_chunk: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Sends the prompt to the model, answering from the response cache when possible.
+        With on_chunk, the response is streamed and each piece of text is passed to it as it arrives.
+        Raises LLMError when no answer could be obtained.
+        """
+        if on_chunk:
+            parts = []
+            for chunk in self.generate_stream(prompt):
+                parts.append(chunk)
+                on_chunk(chunk)
+            return "".join(parts)
+        key = response_key(self.model_id, prompt, self.generation_config)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                profiler.count("llm.cache_hits")
+                return cached
+        profiler.count("llm.cache_misses")
+        text = self.executor.generate(self.model_id, prompt, self.generation_config)
+        if self.cache:
+            self.cache.put(key, text)
+        return text
+
+    def generate_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Yields the response text as the model produces it. A cached response is yielded in one piece;
+        a completed stream is cached like generate() so both paths give the same final text.
+        """
+        key = response_key(self.model_id, prompt, self.generation_config)
+        if self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                profiler.count("llm.cache_hits")
+                yield cached
+                return
+        profiler.count("llm.cache_misses")
+        parts = []
+        for chunk in self.executor.stream(self.model_id, prompt, self.generation_config):
+            parts.append(chunk)
+            yield chunk
+        if self.cache:
+            self.cache.put(key, "".join(parts))
+
+    def generate_structured(self, prompt: str, schema: Type[Schema]) -> Schema:
+        """
+        Sends the prompt with the response constrained to JSON matching the pydantic schema and
+        returns the validated model. Answers are cached like generate(); one that fails
+        validation is not cached and raises InvalidResponseError.
+        """
+        config = {**(self.generation_config or {}), **structured_config(schema)}
+        key = response_key(self.model_id, prompt, config)
+        cached = self.cache.get(key) if self.cache else None
+        if cached is not None:
+            try:
+                result = schema.model_validate_json(cached)
+                profiler.count("llm.cache_hits")
+                return result
+            except ValidationError:
+                pass  # Written under an older schema; ask again.
+        profiler.count("llm.cache_misses")
+        text = self.executor.generate(self.model_id, prompt, config)
+        try:
+            result = schema.model_validate_json(text)
+        except ValidationError as e:
+            raise InvalidResponseError(
+                f"Gemini's answer does not match the {schema.__name__} schema ({e.error_count()} errors).") from e
+        if self.cache:
+            self.cache.put(key, text)
+        return result
+
+    def analyze_qualitative(self, ticker: str, business_text: str, mda_text: str, risk_text: str,
+                            on_chunk: Optional[Callable[[str], None]] = None, financials: Optional[str] = None) -> str:
+        """
+        on_chunk: streams the report as it is generated (see generate).
+        financials: table of reported figures and ratios (financials.FactTable.summary) to include.
+        """
+        prompt = self._qualitative_prompt(ticker, business_text, mda_text, risk_text, QUALITATIVE_OUTPUT_FORMAT,
+                                          financials)
+        return self.generate(prompt, on_chunk)
+
+    def assess_qualitative(self, ticker: str, business_text: str, mda_text: str, risk_text: str,
+                           financials: Optional[str] = None) -> QualitativeAnalysis:
+        """The single-filing analysis as schema-validated ratings. Raises LLMError."""
+        prompt = self._qualitative_prompt(ticker, business_text, mda_text, risk_text, STRUCTURED_OUTPUT_FORMAT,
+                                          financials)
+        return self.generate_structured(prompt, QualitativeAnalysis)
+
+    def _qualitative_prompt(self, ticker: str, business_text: str, mda_text: str, risk_text: str,
+                            output_format: str, financials: Optional[str] = None) -> str:
+        reported = f"{FINANCIALS_HEADING}\n{financials}\n\n        " if financials else ""
+        packed = self.packer.pack({"business": business_text, "mda": mda_text, "risk": risk_text})
         # prompt = f"""
         # Analyze the following sections from the latest 10-K filing of {ticker}.
         # Provide a rating for each of the FOUR categories below using this scale:
@@ -122,80 +342,158 @@ class StockAnalyzer:
 
         ---
 
-        BUSINESS SECTION (PARTIAL):
-        {business_text[:20000]}
+        {reported}BUSINESS SECTION (PARTIAL):
+        {packed["business"]}
 
         MANAGEMENT DISCUSSION & ANALYSIS (PARTIAL):
-        {mda_text[:20000]}
+        {packed["mda"]}
 
         RISK FACTORS (PARTIAL):
-        {risk_text[:20000]}
+        {packed["risk"]}
 
         ---
 
-        OUTPUT FORMAT:
-
-        1. Durable Competitive Advantages: [RATING]
-        Justification: ...
-
-        2. Reinvestment Opportunities: [RATING]
-        Justification: ...
-
-        3. Management Capability: [RATING]
-        Justification: ...
-
-        4. Risk Profile: [RATING]
-        Justification: ...
-
-        5. Thesis-Breaking Scenarios:
-        Scenario 1:
-        Trigger:
-        Mechanism:
-        Management Preparedness:
-        Severity:
-
-        Scenario 2:
-        ...
-
-        Scenario 3:
-        ...
+        {output_format}
         """
         
-        try:
-            response = self.client.models.generate_content(
-                model=self.model_id,
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            return f"Error during analysis: {str(e)}"
+        return prompt
 
-    def analyze_multi_year(self, ticker: str, filings_content: list[dict]) -> str:
+    def analyze_multi_year(self, ticker: str, filings_content: list[dict],
+                           on_chunk: Optional[Callable[[str], None]] = None, financials: Optional[str] = None) -> str:
         """
         Performs a longitudinal analysis across multiple years of filings.
         filings_content: list of {'date': str, 'business': str, 'mda': str, 'risk': str}
+        on_chunk: streams the report as it is generated (see generate).
+        financials: table of reported figures and ratios (financials.FactTable.summary) to include.
+        Raises LLMError when the analysis cannot be generated.
+        """
+        prompt = self._multi_year_prompt(ticker, f"{len(filings_content)} 10-K filings", self._full_context(filings_content),
+                                         financials=financials)
+        return self.generate(prompt, on_chunk)
+
+    def assess_multi_year(self, ticker: str, filings_content: list[dict], mode: str = "digest",
+                          financials: Optional[str] = None) -> MultiYearVerdict:
         """
+        The multi-year analysis as a schema-validated verdict. mode: 'digest' for the two-stage
+        analysis (see analyze_multi_year_incremental), 'full' to send every filing's text.
+        Raises LLMError.
+        """
+        if mode == "digest":
+            scope, context = self._digest_context(ticker, filings_content)
+        else:
+            scope, context = f"{len(filings_content)} 10-K filings", self._full_context(filings_content)
+        prompt = self._multi_year_prompt(ticker, scope, context, STRUCTURED_OUTPUT_FORMAT, financials)
+        return self.generate_structured(prompt, MultiYearVerdict)
+
+    def _full_context(self, filings_content: list[dict]) -> str:
+        # Risk Factors and MD&A are sent in full only for the oldest filing; later years
+        # carry just the paragraphs that changed since the previous filing.
+        changes = year_over_year(filings_content)
+        previous = previous_dates(filings_content)
+        sections = {}
+        for f in filings_content:
+            diff = changes.get(f['date'])
+            sections[(f['date'], 'business')] = f['business']
+            sections[(f['date'], 'mda')] = diff['mda'].changes() if diff else f['mda']
+            sections[(f['date'], 'risk')] = diff['risk'].changes() if diff else f['risk']
+        packed = self.packer.pack(sections)
+
         context_parts = []
         for f in filings_content:
+            diff = changes.get(f['date'])
+            if diff:
+                since = previous[f['date']]
+                mda = f"MANAGEMENT DISCUSSION & ANALYSIS (CHANGES SINCE {since}; {diff['mda'].summary()}):"
+                risk = f"RISK FACTORS (CHANGES SINCE {since}; {diff['risk'].summary()}):"
+            else:
+                mda = "MANAGEMENT DISCUSSION & ANALYSIS (EXCERPTS):"
+                risk = "RISK FACTORS (EXCERPTS):"
             part = f"""
 ### FILING DATE: {f['date']}
 ---
-BUSINESS SECTION (TRUNCATED):
-{f['business'][:15000]}
+BUSINESS SECTION (EXCERPTS):
+{packed[(f['date'], 'business')]}
 
-MANAGEMENT DISCUSSION & ANALYSIS (TRUNCATED):
-{f['mda'][:15000]}
+{mda}
+{packed[(f['date'], 'mda')]}
 
-RISK FACTORS (TRUNCATED):
-{f['risk'][:15000]}
+{risk}
+{packed[(f['date'], 'risk')]}
 ---
 """
             context_parts.append(part)
 
-        full_context = "\n".join(context_parts)
+        return "\n".join(context_parts)
 
-        prompt = f"""
-Perform a forensic, adversarial multi-year qualitative analysis of {ticker} across {len(filings_content)} 10-K filings.
+    def digest_filing(self, ticker: str, filing: Dict) -> str:
+        """
+        Condenses one filing into the structured digest used by the two-stage analysis.
+        Digests are stored by accession number, so each filing is only digested once.
+        """
+        accession = filing.get('accession')
+        # The excerpt budget shapes the digest, so it is part of the stored digest's version.
+        version = f"{DIGEST_PROMPT_VERSION}:{self.packer.budget}"
+        if self.digests and accession:
+            digest = self.digests.get(accession, self.model_id, version)
+            if digest is not None:
+                return digest
+
+        packed = self.packer.pack({key: filing[key] for key in ("business", "mda", "risk")})
+        prompt = DIGEST_PROMPT.format(ticker=ticker, date=filing['date'], **packed)
+        digest = self.generate(prompt)
+        if self.digests and accession and digest:
+            self.digests.put(accession, self.model_id, version, digest, filing_date=filing['date'])
+        return digest
+
+    def analyze_multi_year_incremental(self, ticker: str, filings_content: list[dict],
+                                       on_chunk: Optional[Callable[[str], None]] = None,
+                                       financials: Optional[str] = None) -> str:
+        """
+        Two-stage longitudinal analysis: every filing is digested (concurrently, reusing stored
+        digests), then a single synthesis call compares the digests.
+        Adding a year to an analyzed history costs one digest call plus the synthesis.
+        filings_content: list of {'date', 'accession', 'business', 'mda', 'risk'}
+        on_chunk: streams the synthesis as it is generated (see generate); digests are not streamed.
+        financials: table of reported figures and ratios, included in the synthesis.
+        Raises LLMError when a digest or the synthesis cannot be generated.
+        """
+        scope, context = self._digest_context(ticker, filings_content)
+        return self.generate(self._multi_year_prompt(ticker, scope, context, financials=financials), on_chunk)
+
+    def _digest_context(self, ticker: str, filings_content: list[dict]) -> tuple[str, str]:
+        """Digests every filing and returns the synthesis scope and context."""
+        workers = max(1, min(self.digest_workers, self.executor.max_in_flight, len(filings_content)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = list(pool.map(lambda f: self.digest_filing(ticker, f), filings_content))
+
+        context = "\n".join(
+            f"\n### FILING DATE: {f['date']}\n---\n{digest}\n---\n"
+            for f, digest in zip(filings_content, digests)
+        )
+        changes = year_over_year(filings_content)
+        if changes:
+            # Measured paragraph-level changes make risk escalation explicit rather than inferred.
+            previous = previous_dates(filings_content)
+            dates = sorted(changes, reverse=True)
+            packed = self.packer.pack({date: changes[date]['risk'].changes() for date in dates},
+                                      budget=int(self.packer.budget * CHANGES_BUDGET_FRACTION))
+            context += "\n### YEAR-OVER-YEAR CHANGES (measured locally)\n" + "\n".join(
+                f"\n{date} vs {previous[date]}:\n{changes[date]['risk'].summary()}\n"
+                f"{changes[date]['mda'].summary()}\n{packed[date]}"
+                for date in dates
+            )
+        return f"{len(filings_content)} 10-K filings, each condensed into a digest", context
+
+    def _multi_year_prompt(self, ticker: str, scope: str, context: str,
+                           output_format: str = MULTI_YEAR_OUTPUT_FORMAT, financials: Optional[str] = None) -> str:
+        """
+        The longitudinal analysis prompt; scope describes what `context` holds (e.g. '3 10-K filings').
+        financials, when given, precedes the filing context.
+        """
+        if financials:
+            context = f"### {FINANCIALS_HEADING}\n{financials}\n\n{context}"
+        return f"""
+Perform a forensic, adversarial multi-year qualitative analysis of {ticker} across {scope}.
 
 Assume management language is partially promotional. Your job is not to summarize, but to detect structural strength OR hidden deterioration.
 
@@ -279,40 +577,9 @@ Default to the LOWER tier when evidence is ambiguous.
 
 ---
 
-{full_context}
+{context}
 
 ---
 
-OUTPUT FORMAT:
-
-# Multi-Year Forensic Analysis: {ticker}
-
-## Moat Durability
-...
-
-## Strategic Discipline
-...
-
-## Risk Escalation
-...
-
-## Management Credibility
-...
-
-## Capital Allocation Quality
-...
-
-## Final Quality Score
-Score: [SCORE]
-Rationale: ...
+{output_format.format(ticker=ticker)}
 """
-
-        try:
-            # Using a model with a larger context window for multi-year data
-            response = self.client.models.generate_content(
-                model=self.model_id,
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            return f"Error during multi-year analysis: {str(e)}"
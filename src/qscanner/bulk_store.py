@@ -0,0 +1,177 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+import zipfile
+import zlib
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .cache import default_cache_dir
+from .filing_index import SUBMISSIONS_BASE
+
+BULK_FILE = "bulk.sqlite"
+SUBMISSIONS_ZIP_URL = "https://www.sec.gov/Archives/edgar/daily-index/bulkdata/submissions.zip"
+COMPANYFACTS_ZIP_URL = "https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip"
+# Annual report forms; the only ones qscanner queries.
+DEFAULT_FORMS = ("10-K", "10-K/A", "10-K405", "10-KT")
+
+# CIK0000320193.json (the recent block) and CIK0000320193-submissions-001.json (older pages)
+_MEMBER = re.compile(r"CIK(\d{10})(?:-submissions-\d+)?\.json$")
+_BATCH_ROWS = 50_000
+
+
+class BulkStore:
+    """
+    Offline copy of EDGAR's nightly bulk archives.
+
+    `ingest_submissions` reads submissions.zip member by member, straight from
+    the archive, into one table of filings (CIK, form, accession, date, primary
+    document) for every company; SECClient answers submissions lookups for those
+    CIKs from it instead of data.sec.gov. `ingest_companyfacts` keeps each
+    company's XBRL facts from companyfacts.zip as a compressed JSON document.
+    Each ingest replaces the previous one in a single transaction.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_cache_dir() / BULK_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS filings (
+                cik TEXT NOT NULL,
+                form TEXT NOT NULL,
+                accession TEXT NOT NULL,
+                filing_date TEXT NOT NULL,
+                primary_document TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS filings_cik ON filings (cik, filing_date);
+            CREATE TABLE IF NOT EXISTS companies (cik TEXT PRIMARY KEY, name TEXT);
+            CREATE TABLE IF NOT EXISTS facts (cik TEXT PRIMARY KEY, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._db.commit()
+
+    @classmethod
+    def existing(cls, path: Optional[Path] = None) -> Optional["BulkStore"]:
+        """The store at path (default: the cache directory) if something has been ingested, else None."""
+        path = Path(path) if path else default_cache_dir() / BULK_FILE
+        return cls(path) if path.exists() else None
+
+    def ingest_submissions(self, archive: Path, forms: Optional[Iterable[str]] = DEFAULT_FORMS,
+                           progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """
+        Rebuilds the filing index from submissions.zip. forms: form types to keep (None keeps every form).
+        progress: called as progress(members read, total members).
+        Returns the number of companies and filings indexed.
+        """
+        wanted = set(forms) if forms is not None else None
+        counts = {"companies": 0, "filings": 0}
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM filings")
+            self._db.execute("DELETE FROM companies")
+            batch: List[Tuple] = []
+            for cik, name, raw in _read_members(archive, progress):
+                data = json.loads(raw)
+                if "-submissions-" in name:
+                    block = data  # An older page holds the filing columns directly
+                else:
+                    counts["companies"] += 1
+                    self._db.execute("INSERT OR REPLACE INTO companies VALUES (?, ?)", (cik, data.get("name")))
+                    block = data.get("filings", {}).get("recent", {})
+                batch.extend(_rows(cik, block, wanted))
+                if len(batch) >= _BATCH_ROWS:
+                    counts["filings"] += self._insert_filings(batch)
+            counts["filings"] += self._insert_filings(batch)
+            self._set_meta("submissions", {"archive": str(archive), "ingested_at": time.time(),
+                                           "forms": sorted(wanted) if wanted is not None else None, **counts})
+        return counts
+
+    def ingest_companyfacts(self, archive: Path,
+                            progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, int]:
+        """Replaces the stored company facts with those in companyfacts.zip. Returns the number of companies."""
+        companies = 0
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM facts")
+            for cik, _, raw in _read_members(archive, progress):
+                companies += 1
+                self._db.execute("INSERT OR REPLACE INTO facts VALUES (?, ?)", (cik, zlib.compress(raw)))
+            self._set_meta("companyfacts", {"archive": str(archive), "ingested_at": time.time(),
+                                            "companies": companies})
+        return {"companies": companies}
+
+    def submissions(self, cik: str) -> Optional[dict]:
+        """
+        The CIK's ingested filings shaped like its data.sec.gov submissions JSON (every filing
+        in the 'recent' block, no further pages), or None if the CIK was not in the archive.
+        """
+        with self._lock:
+            company = self._db.execute("SELECT name FROM companies WHERE cik = ?", (cik,)).fetchone()
+            if company is None:
+                return None
+            rows = self._db.execute(
+                "SELECT form, accession, filing_date, primary_document FROM filings "
+                "WHERE cik = ? ORDER BY filing_date DESC", (cik,)
+            ).fetchall()
+        columns = list(zip(*rows)) or [(), (), (), ()]
+        recent = {key: list(values) for key, values in
+                  zip(("form", "accessionNumber", "filingDate", "primaryDocument"), columns)}
+        return {"cik": cik, "name": company[0], "filings": {"recent": recent}}
+
+    def submissions_for_url(self, url: str) -> Optional[dict]:
+        """submissions() for a data.sec.gov submissions URL; None for any other URL."""
+        match = _MEMBER.search(url)
+        if not url.startswith(SUBMISSIONS_BASE) or not match or "-submissions-" in url:
+            return None
+        return self.submissions(match.group(1))
+
+    def company_facts(self, cik: str) -> Optional[dict]:
+        """The CIK's companyfacts JSON, or None if it was not ingested."""
+        with self._lock:
+            row = self._db.execute("SELECT data FROM facts WHERE cik = ?", (cik,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def fact_ciks(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT cik FROM facts ORDER BY cik")]
+
+    def meta(self, key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _insert_filings(self, batch: List[Tuple]) -> int:
+        count = len(batch)
+        self._db.executemany("INSERT INTO filings VALUES (?, ?, ?, ?, ?)", batch)
+        batch.clear()
+        return count
+
+    def _set_meta(self, key: str, value: dict) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+
+def _read_members(archive: Path, progress: Optional[Callable[[int, int], None]]) -> Iterator[Tuple[str, str, bytes]]:
+    """
+    Yields (CIK, member name, JSON bytes) for each CIK##########*.json member, decompressing
+    one member at a time from the archive rather than extracting it.
+    """
+    with zipfile.ZipFile(archive) as zf:
+        members = zf.infolist()
+        for i, info in enumerate(members, 1):
+            match = _MEMBER.search(info.filename)
+            if match and not info.is_dir():
+                with zf.open(info) as f:
+                    yield match.group(1), info.filename, f.read()
+            if progress and (i % 1000 == 0 or i == len(members)):
+                progress(i, len(members))
+
+
+def _rows(cik: str, block: dict, wanted: Optional[set]) -> Iterator[Tuple]:
+    forms = block.get("form", [])
+    columns = zip(forms, block.get("accessionNumber", []), block.get("filingDate", []),
+                  block.get("primaryDocument", []))
+    for form, accession, date, document in columns:
+        if wanted is None or form in wanted:
+            yield cik, form, accession, date, document
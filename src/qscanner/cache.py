@@ -0,0 +1,206 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_TTL = 24 * 60 * 60  # Mutable SEC endpoints are revalidated after a day
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GiB of compressed responses
+
+# Filing documents under /Archives/edgar/data/ never change once published.
+IMMUTABLE_MARKER = "/Archives/edgar/data/"
+
+
+def default_cache_dir() -> Path:
+    """Returns the root directory for qscanner's local caches."""
+    return Path(os.getenv("QSCANNER_CACHE_DIR", Path.home() / ".cache" / "qscanner"))
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    digest: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_type: Optional[str]
+    fetched_at: float
+    size: int
+    immutable: bool
+
+
+class HTTPCache:
+    """
+    Content-addressed on-disk cache for SEC HTTP responses.
+
+    Bodies are stored zlib-compressed under objects/<sha256>, and an SQLite
+    index maps each URL to its body plus the validators needed to revalidate it.
+    Immutable archive documents are served forever; everything else is served
+    until its TTL expires and then revalidated with ETag/Last-Modified.
+    The total size is capped with least-recently-used eviction.
+    """
+
+    def __init__(self, root: Optional[Path] = None, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self.root = Path(root) if root else default_cache_dir() / "http"
+        self.ttl = ttl if ttl is not None else float(os.getenv("QSCANNER_CACHE_TTL", DEFAULT_TTL))
+        if max_bytes is None:
+            max_mb = os.getenv("QSCANNER_CACHE_MAX_MB")
+            max_bytes = int(max_mb) * 1024 ** 2 if max_mb else DEFAULT_MAX_BYTES
+        self.max_bytes = max_bytes
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.root / "index.sqlite"), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                immutable INTEGER NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self._db.commit()
+
+    @staticmethod
+    def is_immutable(url: str) -> bool:
+        return IMMUTABLE_MARKER in url
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, digest, etag, last_modified, content_type, fetched_at, size, immutable "
+                "FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(*row[:7], immutable=bool(row[7]))
+        if not self._object_path(entry.digest).exists():
+            # Body was removed behind our back; treat as a miss.
+            self._delete(url)
+            return None
+        return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return entry.immutable or (time.time() - entry.fetched_at) < self.ttl
+
+    def conditional_headers(self, entry: CacheEntry) -> Dict[str, str]:
+        headers = {}
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def load(self, entry: CacheEntry) -> requests.Response:
+        """Rebuilds a `requests.Response` from a cached body."""
+        body = zlib.decompress(self._object_path(entry.digest).read_bytes())
+        with self._lock:
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), entry.url))
+            self._db.commit()
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry.url
+        response._content = body
+        response.headers = CaseInsensitiveDict()
+        if entry.content_type:
+            response.headers['Content-Type'] = entry.content_type
+        if entry.etag:
+            response.headers['ETag'] = entry.etag
+        if entry.last_modified:
+            response.headers['Last-Modified'] = entry.last_modified
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.from_cache = True
+        return response
+
+    def mark_revalidated(self, entry: CacheEntry) -> None:
+        """Records a 304 Not Modified answer so the entry is fresh for another TTL."""
+        with self._lock:
+            self._db.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), entry.url))
+            self._db.commit()
+
+    def store(self, url: str, response: requests.Response) -> None:
+        body = response.content
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+            tmp_path.write_bytes(zlib.compress(body))
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        old = self.get(url)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, digest, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 response.headers.get('Content-Type'), now, now, path.stat().st_size,
+                 int(self.is_immutable(url)))
+            )
+            self._db.commit()
+        if old and old.digest != digest:
+            self._release(old.digest)
+        self.evict()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            # Bodies shared by several URLs are only counted once.
+            row = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM entries)"
+            ).fetchone()
+        return row[0]
+
+    def evict(self) -> None:
+        """Drops least-recently-used entries until the cache fits in max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        with self._lock:
+            rows = self._db.execute("SELECT url, digest FROM entries ORDER BY accessed_at ASC").fetchall()
+        for url, digest in rows:
+            if total <= self.max_bytes:
+                break
+            self._delete(url)
+            if self._release(digest):
+                total = self.total_bytes()
+
+    def clear(self) -> None:
+        with self._lock:
+            rows = self._db.execute("SELECT DISTINCT digest FROM entries").fetchall()
+            self._db.execute("DELETE FROM entries")
+            self._db.commit()
+        for (digest,) in rows:
+            self._object_path(digest).unlink(missing_ok=True)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def _delete(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            self._db.commit()
+
+    def _release(self, digest: str) -> bool:
+        """Deletes a body once no URL references it. Returns True if it was removed."""
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if row is not None:
+            return False
+        self._object_path(digest).unlink(missing_ok=True)
+        return True
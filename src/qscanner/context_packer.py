@@ -0,0 +1,198 @@
+import math
+import re
+import threading
+from typing import Dict, Hashable, List, NamedTuple, Optional
+
+from .profiling import profiler
+
+DEFAULT_CONTEXT_TOKENS = 32000  # Filing text allowed in a single Gemini call
+CHARS_PER_TOKEN = 4.0  # Estimator used when the local tokenizer is unavailable
+HEADING_CHARS = 80  # Lines shorter than this are kept with the paragraph that follows them
+MAX_CHUNK_CHARS = 4000  # Longer paragraphs are split on sentence boundaries
+GAP_MARKER = "[...]"
+
+_NUMERIC = re.compile(r"\d")
+_SENTENCE_END = re.compile(r"(?<=[.;!?])\s+(?=[A-Z(\"“])")
+# Language signalling that a risk has materialized or a trend has moved.
+_CHANGE_TERMS = re.compile(
+    r"\b(?:has|have) (?:experienced|been|resulted|caused|incurred)\b|\bis experiencing\b|"
+    r"\b(?:increased|decreased|declined|grew|fell|rose|worsened|deteriorat\w*|impair\w*|breach\w*|"
+    r"material weakness|investigation|litigation|restructur\w*|no longer|new|first time|recently)\b"
+)
+_BOILERPLATE = re.compile(
+    r"forward-looking statements|incorporated (?:herein )?by reference|should be read in conjunction|"
+    r"table of contents|see note \d|there can be no assurance|this annual report on form 10-k"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+class TokenCounter:
+    """
+    Counts tokens with the Gemini SDK's local tokenizer when it can be loaded
+    (it needs sentencepiece and a one-time tokenizer download); otherwise estimates from length.
+    """
+
+    def __init__(self, model_id: str):
+        self.model_id = model_id
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        tokenizer = self._load()
+        if tokenizer is not None and text:
+            try:
+                return tokenizer.count_tokens(text).total_tokens
+            except Exception:
+                pass
+        return estimate_tokens(text)
+
+    def _load(self):
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    from google.genai.local_tokenizer import LocalTokenizer
+                    self._tokenizer = LocalTokenizer(model_name=self.model_id)
+                except Exception:
+                    self._tokenizer = None
+            return self._tokenizer
+
+
+def split_chunks(text: str) -> List[str]:
+    """
+    Splits section text on paragraph boundaries. Short lines (sub-headings) are
+    attached to the paragraph below them and very long paragraphs are split between sentences.
+    """
+    chunks = []
+    heading = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if len(line) < HEADING_CHARS:
+            heading.append(line)
+            continue
+        paragraph = " ".join(heading + [line])
+        heading = []
+        while len(paragraph) > MAX_CHUNK_CHARS:
+            cut = max((m.start() for m in _SENTENCE_END.finditer(paragraph, 0, MAX_CHUNK_CHARS)), default=MAX_CHUNK_CHARS)
+            chunks.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        chunks.append(paragraph)
+    if heading:
+        chunks.append(" ".join(heading))
+    return chunks
+
+
+def information_density(chunk: str) -> float:
+    """
+    Relative value of a chunk per token: figures and risk-change language score higher,
+    boilerplate and bare headings lower.
+    """
+    words = chunk.split()
+    if not words:
+        return 0.0
+    lowered = chunk.lower()
+    numeric = sum(1 for w in words if _NUMERIC.search(w))
+    score = 1.0 + 3.0 * numeric / len(words) + 0.25 * min(len(_CHANGE_TERMS.findall(lowered)), 4)
+    if _BOILERPLATE.search(lowered):
+        score *= 0.2
+    if len(words) < 12:
+        score *= 0.5
+    return score
+
+
+class _Chunk(NamedTuple):
+    key: Hashable
+    position: int
+    text: str
+    tokens: int
+    score: float
+
+
+class ContextPacker:
+    """
+    Fits several sections into one token budget.
+
+    Sections are split into paragraph chunks, verbatim repeats (boilerplate
+    carried across sections or years) are dropped, and each section gets a fair
+    share of the budget, with unused shares passed on to sections that need
+    more. Within its share a section keeps its densest chunks, emitted in
+    document order with a gap marker where text was left out.
+    """
+
+    def __init__(self, counter: TokenCounter, budget: int = DEFAULT_CONTEXT_TOKENS):
+        self.counter = counter
+        self.budget = budget
+
+    def pack(self, sections: Dict[Hashable, str], budget: Optional[int] = None) -> Dict[Hashable, str]:
+        """sections: key -> text, in priority order (earlier sections keep repeated paragraphs)."""
+        with profiler.span("prompt.pack", chars_in=sum(len(text or "") for text in sections.values())) as span:
+            packed = self._pack(sections, self.budget if budget is None else budget)
+            span.add(chars_out=sum(map(len, packed.values())))
+        return packed
+
+    def _pack(self, sections: Dict[Hashable, str], budget: int) -> Dict[Hashable, str]:
+        seen = set()
+        chunks: Dict[Hashable, List[_Chunk]] = {}
+        for key, text in sections.items():
+            chunks[key] = []
+            for position, chunk in enumerate(split_chunks(text or "")):
+                fingerprint = " ".join(chunk.lower().split())
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                chunks[key].append(_Chunk(key, position, chunk, self.counter.count(chunk), information_density(chunk)))
+
+        selected: Dict[Hashable, List[_Chunk]] = {key: [] for key in sections}
+        remaining = budget
+        for key, share in self._shares({key: sum(c.tokens for c in cs) for key, cs in chunks.items()}, budget).items():
+            remaining -= self._select(chunks[key], share, selected)
+        # Hand whatever the shares left over to the densest chunks that did not fit.
+        taken = {(c.key, c.position) for cs in selected.values() for c in cs}
+        leftovers = [c for cs in chunks.values() for c in cs if (c.key, c.position) not in taken]
+        self._select(leftovers, remaining, selected)
+
+        return {key: self._render(chunks[key], selected[key]) for key in sections}
+
+    @staticmethod
+    def _shares(needs: Dict[Hashable, int], budget: int) -> Dict[Hashable, int]:
+        """Water-filling: sections needing less than an equal share keep it all; the rest split what remains."""
+        shares = {}
+        pending = dict(needs)
+        while pending:
+            share = budget // len(pending)
+            small = {key: need for key, need in pending.items() if need <= share}
+            if not small:
+                shares.update({key: share for key in pending})
+                break
+            for key, need in small.items():
+                shares[key] = need
+                budget -= need
+                del pending[key]
+        return shares
+
+    @staticmethod
+    def _select(candidates: List[_Chunk], budget: int, selected: Dict[Hashable, List[_Chunk]]) -> int:
+        """Adds the densest candidates that fit in budget to selected. Returns the tokens used."""
+        used = 0
+        for chunk in sorted(candidates, key=lambda c: (-c.score, c.position)):
+            if used + chunk.tokens <= budget:
+                used += chunk.tokens
+                selected[chunk.key].append(chunk)
+        return used
+
+    @staticmethod
+    def _render(chunks: List[_Chunk], selected: List[_Chunk]) -> str:
+        keep = {chunk.position for chunk in selected}
+        parts = []
+        for chunk in chunks:
+            if chunk.position in keep:
+                parts.append(chunk.text)
+            elif not parts or parts[-1] != GAP_MARKER:
+                parts.append(GAP_MARKER)
+        return "\n".join(parts)
@@ -0,0 +1,494 @@
+import http.client
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+import requests
+
+from .cache import default_cache_dir
+from .llm_cache import response_key
+from .llm_executor import (DEFAULT_MAX_IN_FLIGHT, EmptyResponseError, GeminiExecutor, Generation,
+                           InvalidResponseError, LLMError, RateLimitError, RequestError, ServiceUnavailableError)
+from .replay import make_response
+from .sec_client import FILING_CHUNK_BYTES
+from .transport import TransportError
+
+DAEMON_SOCKET = "qscanner.sock"
+ERROR_HEADER = "X-Qscanner-Error"  # Set when the daemon itself could not complete an SEC request
+STATUS_TIMEOUT = 1.0  # Seconds to wait for a daemon to answer before running without it
+# Headers of the daemon's own HTTP framing, not of the SEC response it relays.
+FRAMING_HEADERS = {"connection", "content-encoding", "content-length", "date", "server", "transfer-encoding"}
+LLM_ERRORS = {cls.__name__: cls for cls in (LLMError, RateLimitError, ServiceUnavailableError, RequestError,
+                                            EmptyResponseError, InvalidResponseError)}
+
+
+def socket_path() -> Path:
+    """QSCANNER_DAEMON_SOCKET, or qscanner.sock in the cache directory."""
+    override = os.getenv("QSCANNER_DAEMON_SOCKET")
+    return Path(override) if override else default_cache_dir() / DAEMON_SOCKET
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the work and
+    every caller that arrives before it finishes gets the same result (or exception).
+    Nothing is kept once the call completes; this is not a cache.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable[[], object]):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+        try:
+            call.set_result(fn())
+        except BaseException as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result()
+
+
+class SharedDownload:
+    """
+    One streamed SEC response read by several clients at once.
+
+    Every reader gets the body from its first chunk. The response is read on demand
+    by whichever reader is furthest ahead, so a download stops as early as its last
+    reader does (see SECClient.stream_filing_content), and it is closed then. Chunks
+    are dropped once every reader has passed them, so memory is bounded by the gap
+    between the slowest and fastest reader; after the first is dropped, no one else
+    can join.
+    """
+
+    def __init__(self, response: requests.Response, on_close: Callable[["SharedDownload"], None]):
+        self.status = response.status_code
+        self.headers = dict(response.headers)
+        self._response = response
+        self._body = response.iter_content(FILING_CHUNK_BYTES)
+        self._on_close = on_close
+        self._chunks: List[bytes] = []
+        self._dropped = 0  # Chunks every reader has passed, no longer in _chunks
+        self._positions: Dict[int, int] = {}  # Next chunk of each reader
+        self._error: Optional[Exception] = None
+        self._done = False
+        self._reading = False
+        self._readers = 0
+        self._joined = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def join(self) -> int:
+        """
+        Registers a reader; returns its number (how many have joined), or 0 if the download
+        already ended or has dropped its first chunk.
+        """
+        with self._cond:
+            if self._closed or self._done or self._dropped:
+                return 0
+            self._readers += 1
+            self._joined += 1
+            self._positions[self._joined] = 0
+            return self._joined
+
+    def chunks(self, reader: int) -> Iterator[bytes]:
+        """The body for the joined reader numbered `reader`; closing the iterator leaves the download."""
+        position = 0
+        try:
+            while True:
+                with self._cond:
+                    while position >= self._dropped + len(self._chunks) and not self._done and self._reading:
+                        self._cond.wait()
+                    if position < self._dropped + len(self._chunks):
+                        chunk = self._chunks[position - self._dropped]
+                    elif self._done:
+                        if self._error:
+                            raise self._error
+                        return
+                    else:
+                        self._reading = True
+                        chunk = None
+                if chunk is None:
+                    self._read_next()
+                    continue
+                yield chunk
+                position += 1  # Passed once the reader asks for the next chunk
+                with self._cond:
+                    self._positions[reader] = position
+                    self._drop_passed()
+        finally:
+            self._leave(reader)
+
+    def _read_next(self) -> None:
+        error, chunk = None, None
+        try:
+            chunk = next(self._body, None)
+        except Exception as e:
+            error = e
+        with self._cond:
+            self._reading = False
+            if chunk:
+                self._chunks.append(chunk)
+            elif chunk is None:
+                self._done, self._error = True, error
+            self._cond.notify_all()
+
+    def _drop_passed(self) -> None:
+        """Drops the chunks every reader has passed; called holding the lock."""
+        passed = min(self._positions.values(), default=self._dropped + len(self._chunks))
+        if passed > self._dropped:
+            del self._chunks[:passed - self._dropped]
+            self._dropped = passed
+
+    def _leave(self, reader: int) -> None:
+        with self._cond:
+            self._readers -= 1
+            self._positions.pop(reader, None)
+            self._drop_passed()
+            if self._readers or self._closed:
+                return
+            self._closed = True
+        self._response.close()
+        self._on_close(self)
+
+
+class Daemon:
+    """
+    What 'qscanner serve' keeps resident for its clients: one SEC transport (its
+    connection pool and the rate limit every client shares) and one Gemini
+    executor (the client and the quota). Identical SEC requests and identical
+    model calls that are in flight at the same time are sent only once.
+    """
+
+    def __init__(self, transport, executor: GeminiExecutor):
+        self.transport = transport
+        self.executor = executor
+        self.started = time.time()
+        self.stats = {"sec_requests": 0, "sec_streams": 0, "streams_joined": 0, "llm_requests": 0}
+        self._sec_calls = SingleFlight()
+        self._stream_opens = SingleFlight()
+        self._llm_calls = SingleFlight()
+        self._downloads: Dict[str, SharedDownload] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """A complete SEC response, shared with concurrent requests for the same URL and headers."""
+        self._count("sec_requests")
+
+        def get():
+            response = self.transport.get(url, headers=headers)
+            response.content  # Read before it is shared
+            return response
+        return self._sec_calls.do((url, tuple(sorted((headers or {}).items()))), get)
+
+    def open_stream(self, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[SharedDownload, int]:
+        """
+        A SharedDownload of the URL, reusing one that is still in progress and has not dropped its
+        first chunk, and the reader number to pass to its chunks().
+        """
+        self._count("sec_streams")
+        while True:
+            with self._lock:
+                download = self._downloads.get(url)
+            if download is None:
+                download = self._stream_opens.do(url, lambda: self._start_download(url, headers))
+            reader = download.join()
+            if reader:
+                if reader > 1:
+                    self._count("streams_joined")
+                return download, reader
+            self._forget(download)  # Ended, or too far along, before this reader joined; start another
+
+    def generate(self, model: str, prompt: str, config: Optional[Dict] = None) -> str:
+        self._count("llm_requests")
+        return self._llm_calls.do(response_key(model, prompt, config),
+                                  lambda: self.executor.generate(model, prompt, config))
+
+    def stream(self, model: str, prompt: str, config: Optional[Dict] = None) -> Iterator[str]:
+        """A streamed model call; each client receives its own, so these are not coalesced."""
+        self._count("llm_requests")
+        return self.executor.stream(model, prompt, config)
+
+    def status(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["sec_coalesced"] = self._sec_calls.coalesced + stats.pop("streams_joined")
+        stats["llm_coalesced"] = self._llm_calls.coalesced
+        return {"pid": os.getpid(), "uptime": round(time.time() - self.started, 1), **stats,
+                "gemini": dict(self.executor.stats)}
+
+    def _start_download(self, url: str, headers: Optional[Dict[str, str]]) -> SharedDownload:
+        download = SharedDownload(self.transport.get(url, headers=headers, stream=True), self._forget)
+        with self._lock:
+            self._downloads[url] = download
+        return download
+
+    def _forget(self, download: SharedDownload) -> None:
+        with self._lock:
+            for url, current in list(self._downloads.items()):
+                if current is download:
+                    del self._downloads[url]
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    The daemon's HTTP API. GET /status; POST /sec {"url", "headers", "stream"} answers
+    with the SEC's status, headers and body; POST /llm {"model", "prompt", "config",
+    "stream"} answers {"text"}, or newline-delimited {"text"} pieces when streaming,
+    with {"error", "message", "status", "retry_after"} for an LLMError.
+    """
+    protocol_version = "HTTP/1.1"  # Streams use chunked encoding, so a cut-off body is detected
+    server: "DaemonServer"
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._send_json(200, self.server.daemon.status())
+        else:
+            self._send_json(404, {"error": "NotFound", "message": self.path})
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path == "/sec":
+            self._sec(request)
+        elif self.path == "/llm":
+            self._llm(request)
+        else:
+            self._send_json(404, {"error": "NotFound", "message": self.path})
+
+    def _sec(self, request: Dict) -> None:
+        daemon = self.server.daemon
+        try:
+            if request.get("stream"):
+                download, reader = daemon.open_stream(request["url"], request.get("headers"))
+                self._send_chunked(download.status, download.headers, download.chunks(reader))
+                return
+            response = daemon.fetch(request["url"], request.get("headers"))
+        except TransportError as e:
+            self._send(502, {ERROR_HEADER: str(e)}, b"")
+            return
+        self._send(response.status_code, dict(response.headers), response.content)
+
+    def _llm(self, request: Dict) -> None:
+        daemon = self.server.daemon
+        model, prompt, config = request["model"], request["prompt"], request.get("config")
+        if request.get("stream"):
+            def pieces():
+                try:
+                    for text in daemon.stream(model, prompt, config):
+                        yield json.dumps({"text": text}).encode() + b"\n"
+                except LLMError as e:
+                    yield json.dumps(_error_payload(e)).encode() + b"\n"
+            self._send_chunked(200, {"Content-Type": "application/x-ndjson"}, pieces())
+            return
+        try:
+            self._send_json(200, {"text": daemon.generate(model, prompt, config)})
+        except LLMError as e:
+            self._send_json(502, _error_payload(e))
+
+    def _send(self, status: int, headers: Dict[str, str], body: bytes) -> None:
+        self.send_response(status)
+        for key, value in headers.items():
+            if key.lower() not in FRAMING_HEADERS:
+                self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload: Dict) -> None:
+        self._send(status, {"Content-Type": "application/json"}, json.dumps(payload).encode())
+
+    def _send_chunked(self, status: int, headers: Dict[str, str], body: Iterator[bytes]) -> None:
+        """Relays body as it is produced; stops (closing body) when the client hangs up."""
+        self.send_response(status)
+        for key, value in headers.items():
+            if key.lower() not in FRAMING_HEADERS:
+                self.send_header(key, value)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        try:
+            for chunk in body:
+                self.wfile.write(b"%X\r\n%s\r\n" % (len(chunk), chunk))
+            self.wfile.write(b"0\r\n\r\n")
+        except Exception:
+            # The client hung up, or the SEC download failed; then the missing final
+            # chunk tells the client that the body is incomplete.
+            pass
+        finally:
+            body.close()
+
+    def address_string(self) -> str:
+        return "local"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a Daemon on a Unix socket, one thread per request. Only the owner may connect."""
+    daemon_threads = True
+
+    def __init__(self, path: Path, daemon: Daemon):
+        self.path = Path(path)
+        self.daemon = daemon
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()  # Left behind by a daemon that did not shut down; callers check it is not live
+        super().__init__(str(self.path), _Handler)
+        os.chmod(self.path, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.daemon.executor.shutdown()
+        if self.path.exists():
+            self.path.unlink()
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path: Path, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = str(path)
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DaemonClient:
+    """Talks to a daemon's HTTP API over its Unix socket; one connection per request."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def request(self, method: str, endpoint: str, payload: Optional[Dict] = None,
+                timeout: Optional[float] = None) -> http.client.HTTPResponse:
+        """Sends the request and returns the response with its body unread. Raises OSError if the daemon is gone."""
+        connection = _UnixConnection(self.path, timeout)
+        body = json.dumps(payload).encode() if payload is not None else None
+        connection.request(method, endpoint, body=body, headers={"Content-Type": "application/json"})
+        return connection.getresponse()
+
+    def status(self, timeout: Optional[float] = STATUS_TIMEOUT) -> Dict:
+        with self.request("GET", "/status", timeout=timeout) as reply:
+            return json.loads(reply.read())
+
+    def alive(self) -> bool:
+        if not self.path.exists():
+            return False
+        try:
+            self.status()
+        except (OSError, http.client.HTTPException, ValueError):
+            return False
+        return True
+
+
+def connect_daemon(path: Optional[Path] = None) -> Optional[DaemonClient]:
+    """
+    A client for the daemon listening at path (socket_path() by default), or None when
+    none answers or QSCANNER_DAEMON=0 opts this process out.
+    """
+    if os.getenv("QSCANNER_DAEMON", "1") == "0":
+        return None
+    client = DaemonClient(path or socket_path())
+    return client if client.alive() else None
+
+
+class DaemonTransport:
+    """
+    Drop-in for SECTransport (SECClient(transport=...)) that sends every request through
+    the daemon, so all processes share its connection pool and rate limit. Raises
+    TransportError when the daemon cannot complete a request or is no longer running.
+    """
+
+    def __init__(self, client: DaemonClient):
+        self.client = client
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        try:
+            reply = self.client.request("POST", "/sec", {"url": url, "headers": headers or {}, "stream": stream})
+        except (OSError, http.client.HTTPException) as e:
+            raise TransportError(f"qscanner daemon unavailable: {e}") from e
+        error = reply.getheader(ERROR_HEADER)
+        if error:
+            reply.close()
+            raise TransportError(error)
+        relayed = {key: value for key, value in reply.getheaders() if key.lower() not in FRAMING_HEADERS}
+        if not stream:
+            with reply:
+                return make_response(url, reply.status, reply.read(), relayed)
+        response = make_response(url, reply.status, b"", relayed, stream=True)
+        response.raw = reply
+        return response
+
+
+class DaemonBackend:
+    """Model backend for GeminiExecutor that forwards each call to the daemon's executor."""
+
+    def __init__(self, client: DaemonClient):
+        self.client = client
+
+    def generate(self, model: str, prompt: str, config: Optional[Dict] = None) -> Generation:
+        with self._post(model, prompt, config, stream=False) as reply:
+            data = json.loads(reply.read())
+        if "error" in data:
+            raise _llm_error(data)
+        return Generation(data["text"])
+
+    def stream(self, model: str, prompt: str, config: Optional[Dict] = None) -> Iterator[Generation]:
+        with self._post(model, prompt, config, stream=True) as reply:
+            for line in reply:
+                data = json.loads(line)
+                if "error" in data:
+                    raise _llm_error(data)
+                yield Generation(data["text"])
+
+    def _post(self, model: str, prompt: str, config: Optional[Dict], stream: bool) -> http.client.HTTPResponse:
+        try:
+            return self.client.request("POST", "/llm", {"model": model, "prompt": prompt, "config": config,
+                                                        "stream": stream})
+        except (OSError, http.client.HTTPException) as e:
+            raise ServiceUnavailableError(f"qscanner daemon unavailable: {e}") from e
+
+
+def daemon_executor(client: DaemonClient, max_in_flight: Optional[int] = None) -> GeminiExecutor:
+    """
+    Executor whose calls run in the daemon. Pacing and retries happen there, against the
+    quota every client shares, so this one only bounds the calls this process has in flight
+    (max_in_flight, else QSCANNER_GEMINI_MAX_IN_FLIGHT, as in build_executor).
+    """
+    max_in_flight = max_in_flight or int(os.getenv("QSCANNER_GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT))
+    return GeminiExecutor(DaemonBackend(client), max_in_flight=max_in_flight, rpm=None, tpm=None, max_retries=0)
+
+
+def _error_payload(error: LLMError) -> Dict:
+    return {"error": type(error).__name__, "message": str(error), "status": error.status,
+            "retry_after": error.retry_after}
+
+
+def _llm_error(data: Dict) -> LLMError:
+    return LLM_ERRORS.get(data["error"], LLMError)(data["message"], data.get("status"), data.get("retry_after"))
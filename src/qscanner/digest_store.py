@@ -0,0 +1,55 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .cache import default_cache_dir
+
+
+class DigestStore:
+    """
+    Per-filing digests keyed by accession number, model and digest prompt version.
+
+    A filing's digest never changes once generated, so a multi-year analysis
+    only has to digest the filings it has not seen before.
+    """
+
+    def __init__(self, path: Optional[Path] = None, force: bool = False):
+        """force: ignore stored digests (new ones are still written)."""
+        self.path = Path(path) if path else default_cache_dir() / "digests.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.force = force
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS digests (
+                accession TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                filing_date TEXT,
+                created_at REAL NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (accession, model_id, prompt_version)
+            )
+        """)
+        self._db.commit()
+
+    def get(self, accession: str, model_id: str, prompt_version: str) -> Optional[str]:
+        if self.force:
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT digest FROM digests WHERE accession = ? AND model_id = ? AND prompt_version = ?",
+                (accession, model_id, prompt_version)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, accession: str, model_id: str, prompt_version: str, digest: str,
+            filing_date: Optional[str] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?, ?)",
+                (accession, model_id, prompt_version, filing_date, time.time(), digest)
+            )
+            self._db.commit()
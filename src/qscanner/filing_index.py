@@ -0,0 +1,107 @@
+import sys
+import threading
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+SUBMISSIONS_BASE = "https://data.sec.gov/submissions/"
+ARCHIVES_BASE = "https://www.sec.gov/Archives/edgar/data/"
+
+
+class Filing(NamedTuple):
+    form: str
+    accession: str
+    date: str
+    primary_document: str
+
+    def url(self, cik: str) -> str:
+        return f"{ARCHIVES_BASE}{cik}/{self.accession.replace('-', '')}/{self.primary_document}"
+
+
+class FilingIndex:
+    """
+    Columnar index of a single CIK's EDGAR submissions.
+
+    The `recent` block of submissions/CIK##########.json is parsed once into
+    parallel form/accession/date/primaryDocument arrays. Older paged archives
+    listed under `filings.files` are only fetched when a query needs to look
+    further back than what has been loaded so far.
+    """
+
+    def __init__(self, cik: str, fetch_json: Callable[[str], Optional[dict]]):
+        """fetch_json: returns the parsed JSON at a URL, or None if unavailable."""
+        self.cik = cik
+        self.fetch_json = fetch_json
+        self.forms: List[str] = []
+        self.accessions: List[str] = []
+        self.dates: List[str] = []
+        self.primary_documents: List[str] = []
+        self._pending_pages: List[dict] = []
+        self._loaded_recent = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_recent()
+            return len(self.forms)
+
+    def filings(self, forms: Iterable[str] = ("10-K",), since: Optional[str] = None,
+                limit: Optional[int] = None) -> List[Filing]:
+        """
+        Returns matching filings, newest first.
+        forms: form types to include (e.g. ("10-K", "10-K/A")).
+        since: earliest filing date to include, as YYYY-MM-DD.
+        limit: maximum number of filings to return.
+        """
+        wanted = set(forms)
+        with self._lock:
+            self._ensure_recent()
+            while self._pending_pages:
+                count = sum(1 for i in self._matches(wanted, since))
+                if limit is not None and count >= limit:
+                    break
+                # Pages are ordered newest to oldest, so once a page ends before
+                # `since` nothing further back can match.
+                next_to = self._pending_pages[0].get('filingTo')
+                if since is not None and next_to is not None and next_to < since:
+                    break
+                self._load_next_page()
+
+            results = [self._filing(i) for i in self._matches(wanted, since)]
+        results.sort(key=lambda f: f.date, reverse=True)
+        return results[:limit] if limit is not None else results
+
+    def latest(self, form: str = "10-K") -> Optional[Filing]:
+        found = self.filings((form,), limit=1)
+        return found[0] if found else None
+
+    def _matches(self, wanted: set, since: Optional[str]) -> Iterable[int]:
+        for i, form in enumerate(self.forms):
+            if form in wanted and (since is None or self.dates[i] >= since):
+                yield i
+
+    def _filing(self, i: int) -> Filing:
+        return Filing(self.forms[i], self.accessions[i], self.dates[i], self.primary_documents[i])
+
+    def _ensure_recent(self) -> None:
+        if self._loaded_recent:
+            return
+        data = self.fetch_json(f"{SUBMISSIONS_BASE}CIK{self.cik}.json")
+        # Marked only once the fetch returns, so a failed one is retried by the next query.
+        self._loaded_recent = True
+        if not data:
+            return
+        filings = data.get('filings', {})
+        self._extend(filings.get('recent', {}))
+        self._pending_pages = [f for f in filings.get('files', []) if f.get('name')]
+
+    def _load_next_page(self) -> None:
+        data = self.fetch_json(f"{SUBMISSIONS_BASE}{self._pending_pages[0]['name']}")
+        self._pending_pages.pop(0)
+        if data:
+            self._extend(data)
+
+    def _extend(self, block: dict) -> None:
+        forms = block.get('form', [])
+        self.forms.extend(sys.intern(form) for form in forms)
+        self.accessions.extend(block.get('accessionNumber', [])[:len(forms)])
+        self.dates.extend(block.get('filingDate', [])[:len(forms)])
+        self.primary_documents.extend(block.get('primaryDocument', [])[:len(forms)])
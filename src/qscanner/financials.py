@@ -0,0 +1,205 @@
+import math
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+ANNUAL_FORMS = {"10-K", "10-K/A", "10-K405", "10-KT", "10-KT/A"}
+FLOW_DAYS = (340, 390)  # Duration of a fiscal year's flow facts (income, cash flow)
+DEFAULT_TAX_RATE = 0.21  # Used for NOPAT when the effective rate cannot be computed
+MAX_TAX_RATE = 0.5
+DEFAULT_TABLE_YEARS = 5
+
+
+class Metric(NamedTuple):
+    """A reported line item: us-gaap tags tried in order, unit, and whether it is a flow (duration) fact."""
+    tags: Tuple[str, ...]
+    unit: str
+    flow: bool
+
+
+METRICS: Dict[str, Metric] = {
+    "revenue": Metric(("Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax",
+                       "RevenueFromContractWithCustomerIncludingAssessedTax", "SalesRevenueNet"), "USD", True),
+    "net_income": Metric(("NetIncomeLoss", "ProfitLoss"), "USD", True),
+    "operating_income": Metric(("OperatingIncomeLoss",), "USD", True),
+    "pretax_income": Metric(("IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest",
+                             "IncomeLossFromContinuingOperationsBeforeIncomeTaxesMinorityInterestAndIncomeLossFromEquityMethodInvestments"),
+                            "USD", True),
+    "income_tax": Metric(("IncomeTaxExpenseBenefit",), "USD", True),
+    "sbc": Metric(("ShareBasedCompensation", "AllocatedShareBasedCompensationExpense"), "USD", True),
+    "diluted_shares": Metric(("WeightedAverageNumberOfDilutedSharesOutstanding",), "shares", True),
+    "equity": Metric(("StockholdersEquity", "StockholdersEquityIncludingPortionAttributableToNoncontrollingInterest"),
+                     "USD", False),
+    "debt": Metric(("LongTermDebt", "LongTermDebtNoncurrent"), "USD", False),
+    "cash": Metric(("CashAndCashEquivalentsAtCarryingValue",
+                    "CashCashEquivalentsRestrictedCashAndRestrictedCashEquivalents"), "USD", False),
+    "goodwill": Metric(("Goodwill",), "USD", False),
+}
+
+# Ratio rows of the prompt table: label and format ('pct', 'change' for a signed percentage, or 'x').
+RATIOS = {
+    "revenue_growth": ("Revenue growth", "change"),
+    "net_margin": ("Net margin", "pct"),
+    "roic": ("ROIC (after tax)", "pct"),
+    "debt_to_equity": ("Debt / equity", "x"),
+    "goodwill_growth": ("Goodwill growth", "change"),
+    "dilution": ("Diluted share count change", "change"),
+    "sbc_to_revenue": ("SBC / revenue", "pct"),
+    "sbc_growth": ("SBC growth", "change"),
+}
+
+
+def _annual_facts(company_facts: dict, metric: Metric) -> Iterable[Tuple[int, str, str, str, float]]:
+    """(tag priority, start, end, filed, value) of every fact of the metric's tags reported in an annual report."""
+    gaap = company_facts.get("facts", {}).get("us-gaap", {})
+    for priority, tag in enumerate(metric.tags):
+        for fact in gaap.get(tag, {}).get("units", {}).get(metric.unit, []):
+            if fact.get("form") in ANNUAL_FORMS and "end" in fact and (fact.get("start") or not metric.flow):
+                yield priority, fact.get("start") or fact["end"], fact["end"], fact.get("filed", ""), float(fact["val"])
+
+
+def _fiscal_year_points(facts: List[tuple], flow: bool) -> Tuple[np.ndarray, ...]:
+    """
+    Columns (row, fiscal year, tag priority, filing rank, value) of the facts that cover a fiscal
+    year: flows must span about a year, balances are taken at the period end. Fiscal years are
+    labeled by the calendar year in which they end.
+    """
+    if not facts:
+        empty = np.array([], dtype=int)
+        return empty, empty, empty, empty, np.array([])
+    rows, priorities, starts, ends, filed, values = zip(*facts)
+    ends_d = np.array(ends, dtype="datetime64[D]")
+    keep = np.ones(len(facts), dtype=bool)
+    if flow:
+        days = (ends_d - np.array(starts, dtype="datetime64[D]")).astype(int)
+        keep = (days >= FLOW_DAYS[0]) & (days <= FLOW_DAYS[1])
+    _, filed_rank = np.unique(np.array(filed), return_inverse=True)
+    years = ends_d.astype("datetime64[Y]").astype(int) + 1970
+    return (np.array(rows)[keep], years[keep], np.array(priorities)[keep], filed_rank[keep],
+            np.array(values, dtype=float)[keep])
+
+
+class FactTable:
+    """
+    Annual XBRL facts of many companies as NumPy matrices, one row per company and
+    one column per fiscal year (NaN where a company did not report a value).
+
+    Each metric takes the first of its us-gaap tags that a company reported for a
+    year, and the most recently filed value for a period, so restatements win. Ratios
+    are computed on the whole matrix at once, for every company and year together.
+    """
+
+    def __init__(self, ciks: List[str], years: np.ndarray, values: Dict[str, np.ndarray]):
+        self.ciks = ciks
+        self.years = years
+        self.values = values
+        self._rows = {cik: i for i, cik in enumerate(ciks)}
+        self._ratios: Optional[Dict[str, np.ndarray]] = None
+
+    @classmethod
+    def build(cls, companies: Iterable[Tuple[str, dict]]) -> "FactTable":
+        """
+        companies: (CIK, companyfacts JSON) pairs, consumed one at a time, so a whole
+        universe can be streamed from the bulk store without holding every document.
+        """
+        ciks: List[str] = []
+        facts: Dict[str, List[tuple]] = {name: [] for name in METRICS}
+        for row, (cik, company_facts) in enumerate(companies):
+            ciks.append(cik)
+            for name, metric in METRICS.items():
+                facts[name].extend((row, *fact) for fact in _annual_facts(company_facts, metric))
+
+        points = {name: _fiscal_year_points(rows, METRICS[name].flow) for name, rows in facts.items()}
+        all_years = np.concatenate([p[1] for p in points.values()] + [np.array([], dtype=int)])
+        years = np.arange(all_years.min(), all_years.max() + 1) if all_years.size else np.array([], dtype=int)
+        values = {}
+        for name, (rows, point_years, priorities, filed, point_values) in points.items():
+            matrix = np.full((len(ciks), len(years)), np.nan)
+            if rows.size:
+                columns = point_years - years[0]
+                # Best tag first, then the latest filing: the first point of each cell wins.
+                order = np.lexsort((-filed, priorities, columns, rows))
+                _, first = np.unique(rows[order] * len(years) + columns[order], return_index=True)
+                chosen = order[first]
+                matrix[rows[chosen], columns[chosen]] = point_values[chosen]
+            values[name] = matrix
+        return cls(ciks, years, values)
+
+    def ratios(self) -> Dict[str, np.ndarray]:
+        """Ratio matrices shaped like the fact matrices; NaN where an input is missing or a denominator is 0."""
+        if self._ratios is None:
+            self._ratios = self._compute_ratios()
+        return self._ratios
+
+    def _compute_ratios(self) -> Dict[str, np.ndarray]:
+        v = self.values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tax_rate = np.clip(v["income_tax"] / v["pretax_income"], 0.0, MAX_TAX_RATE)
+            tax_rate = np.where(np.isnan(tax_rate), DEFAULT_TAX_RATE, tax_rate)
+            invested = v["equity"] + np.nan_to_num(v["debt"]) - np.nan_to_num(v["cash"])
+            ratios = {
+                "revenue_growth": _growth(v["revenue"]),
+                "net_margin": v["net_income"] / v["revenue"],
+                "roic": v["operating_income"] * (1 - tax_rate) / np.where(invested > 0, invested, np.nan),
+                "debt_to_equity": v["debt"] / np.where(v["equity"] > 0, v["equity"], np.nan),
+                "goodwill_growth": _growth(v["goodwill"]),
+                "dilution": _growth(v["diluted_shares"]),
+                "sbc_to_revenue": v["sbc"] / v["revenue"],
+                "sbc_growth": _growth(v["sbc"]),
+            }
+        return {name: np.where(np.isfinite(r), r, np.nan) for name, r in ratios.items()}
+
+    def summary(self, cik: str, years: int = DEFAULT_TABLE_YEARS) -> Optional[str]:
+        """
+        A compact table of the company's last `years` reported fiscal years for the prompts,
+        or None when it reported nothing usable.
+        """
+        row = self._rows.get(cik)
+        if row is None:
+            return None
+        reported = ~np.isnan(self.values["revenue"][row]) | ~np.isnan(self.values["net_income"][row])
+        if not reported.any():
+            return None
+        last = np.flatnonzero(reported)[-1]
+        columns = np.arange(max(0, last - years + 1), last + 1)
+        header = "| Fiscal year | " + " | ".join(str(y) for y in self.years[columns]) + " |"
+        lines = [header, "|" + " --- |" * (len(columns) + 1)]
+        lines.append("| Revenue ($M) | " + " | ".join(
+            _format(x / 1e6, "m") for x in self.values["revenue"][row, columns]) + " |")
+        ratios = self.ratios()
+        for name, (label, kind) in RATIOS.items():
+            lines.append(f"| {label} | " + " | ".join(_format(x, kind) for x in ratios[name][row, columns]) + " |")
+        return "\n".join(lines)
+
+
+def _growth(matrix: np.ndarray) -> np.ndarray:
+    """Year-over-year change along the year axis (NaN for the first year)."""
+    growth = np.full_like(matrix, np.nan)
+    previous = matrix[:, :-1]
+    growth[:, 1:] = (matrix[:, 1:] - previous) / np.where(previous != 0, np.abs(previous), np.nan)
+    return growth
+
+
+def _format(value: float, kind: str) -> str:
+    if value is None or math.isnan(value):
+        return "n/a"
+    if kind == "pct":
+        return f"{value * 100:.1f}%"
+    if kind == "change":
+        return f"{value * 100:+.1f}%"
+    if kind == "x":
+        return f"{value:.2f}x"
+    return f"{value:,.0f}"
+
+
+def financial_summary(client, cik: str, years: int = DEFAULT_TABLE_YEARS) -> Optional[str]:
+    """The prompt table for one company, from its companyfacts (see SECClient.get_company_facts)."""
+    company_facts = client.get_company_facts(cik)
+    if not company_facts:
+        return None
+    return FactTable.build([(cik, company_facts)]).summary(cik, years)
+
+
+def bulk_fact_table(bulk, ciks: Iterable[str]) -> FactTable:
+    """One table for every given CIK whose facts are in the bulk store, read one company at a time."""
+    return FactTable.build((cik, facts) for cik in ciks if (facts := bulk.company_facts(cik)))
@@ -0,0 +1,303 @@
+import codecs
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+
+# Elements whose text never reaches the output.
+SKIPPED_TAGS = {"script", "style"}
+# Inline-XBRL header blocks: hidden facts and contexts that are pure noise in the text.
+HIDDEN_TAGS = {"ix:header"}
+# BeautifulSoup stores strings inside these as special string classes that get_text() ignores.
+IGNORED_STRING_TAGS = {"template", "rt", "rp"}
+PRESERVE_WHITESPACE_TAGS = {"pre", "textarea"}
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+
+_SPACES = re.compile(r' +')
+
+# Placed in the string stream where an anchor target starts; a Unicode noncharacter never
+# appears in real documents, and the separator spaces around it collapse away when cleaned.
+ANCHOR_MARK = "\ufdd0"
+TOC_ITEM_PATTERN = re.compile(r"Item\s*(\d{1,2}[A-C]?)\b", re.IGNORECASE)
+
+
+class AnchorMap:
+    """
+    Table-of-contents links gathered while streaming a filing.
+    toc maps "Item 1A" to the id its TOC link points at; offsets maps ids to
+    positions in the cleaned text.
+    """
+
+    def __init__(self):
+        self.toc: Dict[str, str] = {}
+        self.offsets: Dict[str, int] = {}
+
+    def item_offsets(self) -> Dict[str, int]:
+        return {item: self.offsets[anchor] for item, anchor in self.toc.items() if anchor in self.offsets}
+
+    def add_link(self, label: str, anchor: str) -> None:
+        m = TOC_ITEM_PATTERN.search(label)
+        if m:
+            self.toc.setdefault(f"Item {m.group(1).upper()}", anchor)
+
+
+class _TextTarget:
+    """
+    lxml parser target that turns parse events into the string sequence
+    BeautifulSoup's get_text() would produce for the cleaned tree:
+    script/style dropped, <br> replaced by a newline and a newline appended
+    to every <p>.
+    """
+
+    def __init__(self, skip_hidden: bool, anchors: Optional[AnchorMap] = None):
+        self.skipped = SKIPPED_TAGS | HIDDEN_TAGS if skip_hidden else SKIPPED_TAGS
+        self.strings: List[str] = []
+        self._data: List[str] = []
+        self._skip_depth = 0
+        self._ignore_depth = 0
+        self._preserve_depth = 0
+        # Anchor tracking (only when an AnchorMap is given)
+        self.anchors = anchors
+        self.marked: List[str] = []  # anchor ids, in the order their marks were emitted
+        self._referenced = set()
+        self._link: Optional[tuple] = None  # (anchor id, link strings)
+        self._row: Optional[tuple] = None  # (row strings, anchor ids linked from the row)
+
+    def start(self, tag, attrib):
+        self._end_data()
+        if self._skip_depth or tag in self.skipped:
+            self._skip_depth += 1
+            return
+        if self.anchors is not None:
+            self._track_anchor_start(tag, attrib)
+        if tag in IGNORED_STRING_TAGS:
+            self._ignore_depth += 1
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth += 1
+
+    def end(self, tag):
+        self._end_data()
+        if self._skip_depth:
+            self._skip_depth -= 1
+            return
+        if tag in ("br", "p"):
+            self.strings.append("\n")
+        if self.anchors is not None:
+            self._track_anchor_end(tag)
+        if tag in IGNORED_STRING_TAGS:
+            self._ignore_depth -= 1
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            self._preserve_depth -= 1
+
+    def data(self, data):
+        self._data.append(data)
+
+    def comment(self, text):
+        self._end_data()
+
+    def pi(self, target, data=None):
+        self._end_data()
+
+    def doctype(self, *args):
+        self._end_data()
+
+    def close(self):
+        self._end_data()
+
+    def _end_data(self):
+        """Closes the current string; lxml may deliver one text node in several data() calls."""
+        if not self._data:
+            return
+        text = "".join(self._data)
+        self._data = []
+        if self._skip_depth or self._ignore_depth:
+            return
+        if not self._preserve_depth and not text.strip(ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        if self.anchors is not None and ANCHOR_MARK in text:
+            text = text.replace(ANCHOR_MARK, "")
+        self.strings.append(text)
+        if self._link is not None:
+            self._link[1].append(text)
+        if self._row is not None:
+            self._row[0].append(text)
+
+    def _track_anchor_start(self, tag, attrib):
+        anchor = attrib.get("id") or attrib.get("name")
+        if anchor and anchor in self._referenced:
+            self.strings.append(ANCHOR_MARK)
+            self.marked.append(anchor)
+        if tag == "a" and attrib.get("href", "").startswith("#"):
+            self._referenced.add(attrib["href"][1:])
+            self._link = (attrib["href"][1:], [])
+        elif tag == "tr":
+            self._row = ([], [])
+
+    def _track_anchor_end(self, tag):
+        if tag == "a" and self._link is not None:
+            anchor, strings = self._link
+            self._link = None
+            if self._row is not None:
+                self._row[1].append(anchor)
+            else:
+                self.anchors.add_link(" ".join(strings), anchor)
+        elif tag == "tr" and self._row is not None:
+            strings, links = self._row
+            self._row = None
+            if links:
+                # TOC rows often split "Item 1A." and the linked title or page number into separate cells.
+                self.anchors.add_link(" ".join(strings), links[0])
+
+
+def clean_line(line: str) -> str:
+    return _SPACES.sub(' ', line.replace('\xa0', ' ')).strip()
+
+
+class CleanTextStream:
+    """
+    Incremental cleaner behind iter_clean_lines: feed() it chunks of HTML and it returns
+    the cleaned, non-empty lines completed so far.
+
+    Only the current, unfinished line is buffered, so memory stays bounded by the
+    longest line rather than the size of the document. partial() shows that line as
+    received so far, and truncate() ends the document there, for readers that stop
+    early in documents made of a few very long lines (inline XBRL is often a single one).
+    """
+
+    def __init__(self, skip_hidden: bool = True, encoding: Optional[str] = None,
+                 anchors: Optional[AnchorMap] = None):
+        """See iter_clean_lines."""
+        self.anchors = anchors
+        self._decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+        self._target = _TextTarget(skip_hidden, anchors)
+        from lxml import etree  # Deferred so that importing sections (for its constants) stays cheap
+        self._parser = etree.HTMLParser(target=self._target, recover=True, huge_tree=True)
+        self._pending = ""
+        self._first_string = True
+        self._started = False
+        self._emitted = 0  # Length of the '\n'-joined output so far
+        self._marks_seen = 0
+        self._unplaced: List[str] = []  # Anchors whose line came out empty; they point at the next line
+        self._partial = ""  # Cleaned text of _pending[:_partial_end]
+        self._partial_end = 0
+
+    def feed(self, chunk: Union[str, bytes]) -> List[str]:
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        if not chunk:
+            return []
+        if not self._started:
+            self._started = True
+            if chunk[0] == "\N{BYTE ORDER MARK}":
+                chunk = chunk[1:]
+        self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[str]:
+        """Finishes the document; returns its last lines."""
+        tail = self._decoder.decode(b"", final=True)
+        if tail:
+            self._parser.feed(tail)
+        if self._started or tail:
+            self._parser.close()
+        lines = self._drain(final=True)
+        if self.anchors is not None:
+            for anchor in self._unplaced:
+                self.anchors.offsets.setdefault(anchor, self._emitted)
+        return lines
+
+    def truncate(self) -> List[str]:
+        """Ends the document at the text received so far, without parsing further; returns the last lines."""
+        return self._drain(final=True)
+
+    def partial(self) -> str:
+        """
+        The cleaned text of the unfinished line received so far. It is a prefix of the
+        line that will eventually be emitted, and is extended incrementally.
+        """
+        tail = self._pending[self._partial_end:]
+        content = tail
+        while True:  # Stop before trailing spaces and marks; what follows them decides how they clean
+            trimmed = content.rstrip().rstrip(ANCHOR_MARK)
+            if len(trimmed) == len(content):
+                break
+            content = trimmed
+        if content:
+            piece = _SPACES.sub(' ', content.replace(ANCHOR_MARK, "").replace('\xa0', ' '))
+            self._partial += piece if self._partial else piece.lstrip()
+            self._partial_end += len(content)
+        return self._partial
+
+    def _drain(self, final: bool = False) -> List[str]:
+        target = self._target
+        if target.strings:
+            # get_text(separator=' ') puts a space between every pair of strings.
+            joined = " ".join(target.strings)
+            target.strings.clear()
+            self._pending += joined if self._first_string else " " + joined
+            self._first_string = False
+        lines = self._pending.splitlines(keepends=True)
+        # Keep the last line back unless it is terminated; the next chunk may continue it.
+        if not final and lines and len(lines[-1].splitlines()[0]) == len(lines[-1]):
+            self._pending = lines.pop()
+        else:
+            self._pending = ""
+        if lines:
+            self._partial, self._partial_end = "", 0
+        output = []
+        for line in lines:
+            if self.anchors is not None and ANCHOR_MARK in line:
+                cleaned = self._place_anchors(line)
+            else:
+                cleaned = clean_line(line)
+            if cleaned:
+                start = self._emitted + 1 if self._emitted else 0
+                for anchor in self._unplaced:
+                    self.anchors.offsets.setdefault(anchor, start)
+                self._unplaced.clear()
+                self._emitted = start + len(cleaned)
+                output.append(cleaned)
+        return output
+
+    def _place_anchors(self, line: str) -> str:
+        parts = line.split(ANCHOR_MARK)
+        cleaned = clean_line("".join(parts))
+        start = self._emitted + 1 if self._emitted else 0
+        prefix = ""
+        for part in parts[:-1]:
+            prefix += part
+            anchor = self._target.marked[self._marks_seen]
+            self._marks_seen += 1
+            if cleaned:
+                offset = min(len(_SPACES.sub(' ', prefix.replace('\xa0', ' ')).lstrip()), len(cleaned))
+                self.anchors.offsets.setdefault(anchor, start + offset)
+            else:
+                self._unplaced.append(anchor)
+        return cleaned
+
+
+def iter_clean_lines(source: Union[str, bytes, Iterable[Union[str, bytes]]], skip_hidden: bool = True,
+                     encoding: Optional[str] = None, anchors: Optional[AnchorMap] = None) -> Iterator[str]:
+    """
+    Streams the cleaned, non-empty text lines of an HTML document.
+
+    source: the whole document, or an iterable of chunks (e.g. from a streaming download).
+    skip_hidden: drop inline-XBRL <ix:header> blocks; with False the output matches
+        the BeautifulSoup-based clean_html_soup() exactly.
+    encoding: codec for bytes chunks (defaults to UTF-8).
+    anchors: if given, filled with the document's TOC links and the offsets (in the
+        '\n'-joined output) of the elements they point at.
+
+    Only the current, unfinished line is buffered, so memory stays bounded by the
+    longest line rather than the size of the document.
+    """
+    if isinstance(source, (str, bytes)):
+        source = [source]
+    stream = CleanTextStream(skip_hidden, encoding, anchors)
+    for chunk in source:
+        yield from stream.feed(chunk)
+    yield from stream.close()
+
+
+def html_to_text(source: Union[str, bytes, Iterable[Union[str, bytes]]], skip_hidden: bool = True,
+                 encoding: Optional[str] = None, anchors: Optional[AnchorMap] = None) -> str:
+    return '\n'.join(iter_clean_lines(source, skip_hidden=skip_hidden, encoding=encoding, anchors=anchors))
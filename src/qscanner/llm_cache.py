@@ -0,0 +1,264 @@
+import abc
+import hashlib
+import json
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, Optional
+
+from .cache import default_cache_dir
+
+DEFAULT_LLM_TTL = 30 * 24 * 60 * 60  # Reports for an unchanged prompt stay valid for a month
+DEFAULT_LLM_MAX_BYTES = 256 * 1024 ** 2  # 256 MiB of compressed responses
+EXPIRY_SWEEP_INTERVAL = 60 * 60  # Expired responses are purged at most hourly; get() skips them meanwhile
+
+_CREATED = struct.Struct("<d")  # Creation timestamp heading each FileResponseCache entry
+
+
+def response_key(model_id: str, prompt: str, config: Optional[Dict] = None) -> str:
+    """Cache key for a generation request: model, prompt hash and generation config."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    payload = json.dumps([model_id, prompt_hash, config or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCacheBackend(abc.ABC):
+    """Storage for cached LLM responses."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """The cached response, or None when missing or expired."""
+
+    @abc.abstractmethod
+    def put(self, key: str, response: str) -> None:
+        """Stores a response, evicting old entries past the size limit."""
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Removes every cached response."""
+
+
+class SQLiteResponseCache(ResponseCacheBackend):
+    """Responses stored zlib-compressed in a single SQLite file, with TTL and LRU size eviction."""
+
+    def __init__(self, path: Optional[Path] = None, ttl: float = DEFAULT_LLM_TTL,
+                 max_bytes: int = DEFAULT_LLM_MAX_BYTES):
+        self.path = Path(path) if path else default_cache_dir() / "llm.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._total: Optional[int] = None  # Running size of the stored responses, set by the first sweep
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                body BLOB NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT created_at, body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[0] >= self.ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                if self._total is not None:
+                    self._total -= len(row[1])
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._db.commit()
+        return zlib.decompress(row[1]).decode("utf-8")
+
+    def put(self, key: str, response: str) -> None:
+        body = zlib.compress(response.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                             (key, now, now, len(body), body))
+            self._db.commit()
+            if self._total is not None:
+                self._total += len(body) - (old[0] if old else 0)
+        self.evict()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self) -> None:
+        """
+        Drops least-recently-used responses until the store fits in max_bytes. Expired ones are
+        dropped every EXPIRY_SWEEP_INTERVAL, which also resyncs the running total with the file.
+        """
+        now = time.time()
+        with self._lock:
+            if self._total is None or now - self._swept_at >= EXPIRY_SWEEP_INTERVAL:
+                self._swept_at = now
+                self._db.execute("DELETE FROM responses WHERE created_at <= ?", (now - self.ttl,))
+                self._db.commit()
+                self._total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if self._total <= self.max_bytes:
+                return
+            stale = []
+            for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+                if self._total <= self.max_bytes:
+                    break
+                stale.append((key,))
+                self._total -= size
+            self._db.executemany("DELETE FROM responses WHERE key = ?", stale)
+            self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._total = 0
+
+
+class FileResponseCache(ResponseCacheBackend):
+    """
+    One compressed file per response. Each file starts with its creation time (for the TTL);
+    its modification time tracks recency for size eviction.
+    """
+
+    def __init__(self, root: Optional[Path] = None, ttl: float = DEFAULT_LLM_TTL,
+                 max_bytes: int = DEFAULT_LLM_MAX_BYTES):
+        self.root = Path(root) if root else default_cache_dir() / "llm"
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._total: Optional[int] = None  # Running size of the directory, set by the first sweep
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        (created_at,) = _CREATED.unpack_from(data)
+        if time.time() - created_at >= self.ttl:
+            path.unlink(missing_ok=True)
+            with self._lock:
+                if self._total is not None:
+                    self._total -= len(data)
+            return None
+        os.utime(path)
+        return zlib.decompress(data[_CREATED.size:]).decode("utf-8")
+
+    def put(self, key: str, response: str) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".tmp{threading.get_ident()}")
+        data = _CREATED.pack(time.time()) + zlib.compress(response.encode("utf-8"))
+        tmp_path.write_bytes(data)
+        with self._lock:
+            try:
+                replaced = path.stat().st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            if self._total is not None:
+                self._total += len(data) - replaced
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Drops expired responses, then least-recently-used ones until the directory fits in max_bytes.
+        The directory is only scanned every EXPIRY_SWEEP_INTERVAL or when the running total is over the limit.
+        """
+        now = time.time()
+        expiry = now - self.ttl
+        with self._lock:
+            if self._total is not None and self._total <= self.max_bytes and \
+                    now - self._swept_at < EXPIRY_SWEEP_INTERVAL:
+                return
+            self._swept_at = now
+            files = []
+            for path in self.root.glob("*.z"):
+                try:
+                    with open(path, "rb") as f:
+                        (created_at,) = _CREATED.unpack(f.read(_CREATED.size))
+                    stat = path.stat()
+                except (FileNotFoundError, struct.error):
+                    continue
+                if created_at <= expiry:
+                    path.unlink(missing_ok=True)
+                else:
+                    files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+            self._total = total
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.root.glob("*.z"):
+                path.unlink(missing_ok=True)
+            self._total = 0
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.z"
+
+
+class ResponseCache:
+    """
+    Deterministic cache of LLM responses in front of a pluggable backend.
+
+    Identical requests (same model, prompt and generation config) are answered
+    from the backend, so re-rendering a report costs no quota. Hits and misses
+    are counted for the end-of-run summary.
+    """
+
+    def __init__(self, backend: Optional[ResponseCacheBackend] = None, force: bool = False):
+        """force: never answer from the backend (fresh responses are still stored)."""
+        self.backend = backend or build_backend()
+        self.force = force
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        response = None if self.force else self.backend.get(key)
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def put(self, key: str, response: str) -> None:
+        self.backend.put(key, response)
+
+
+def build_backend() -> ResponseCacheBackend:
+    """
+    Backend selected by QSCANNER_LLM_CACHE ('sqlite', the default, or 'file'), with
+    QSCANNER_LLM_CACHE_TTL (seconds) and QSCANNER_LLM_CACHE_MAX_MB limits.
+    """
+    ttl = float(os.getenv("QSCANNER_LLM_CACHE_TTL", DEFAULT_LLM_TTL))
+    max_mb = os.getenv("QSCANNER_LLM_CACHE_MAX_MB")
+    max_bytes = int(max_mb) * 1024 ** 2 if max_mb else DEFAULT_LLM_MAX_BYTES
+    kind = os.getenv("QSCANNER_LLM_CACHE", "sqlite").lower()
+    if kind == "file":
+        return FileResponseCache(ttl=ttl, max_bytes=max_bytes)
+    if kind != "sqlite":
+        raise ValueError(f"Unknown QSCANNER_LLM_CACHE backend '{kind}' (expected 'sqlite' or 'file').")
+    return SQLiteResponseCache(ttl=ttl, max_bytes=max_bytes)
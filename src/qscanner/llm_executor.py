@@ -0,0 +1,331 @@
+import os
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .context_packer import estimate_tokens
+from .profiling import profiler
+from .transport import TokenBucket, backoff_delay
+
+DEFAULT_MODEL_ID = "gemini-2.5-flash"
+DEFAULT_MAX_IN_FLIGHT = 4
+# Gemini 2.5 Flash free-tier quota; raise through QSCANNER_GEMINI_RPM / QSCANNER_GEMINI_TPM on paid tiers.
+DEFAULT_RPM = 10
+DEFAULT_TPM = 250_000
+DEFAULT_OUTPUT_TOKENS = 2048  # Reserved against the tokens-per-minute limit for each response
+
+
+class LLMError(Exception):
+    """Raised when the model does not produce an answer."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RateLimitError(LLMError):
+    """The quota was exhausted (HTTP 429) and stayed exhausted through every retry."""
+
+
+class ServiceUnavailableError(LLMError):
+    """The service was overloaded or unreachable (HTTP 5xx, timeouts) through every retry."""
+
+
+class RequestError(LLMError):
+    """The request was rejected (bad request, permissions, unknown model); not retried."""
+
+
+class EmptyResponseError(LLMError):
+    """The model answered without any text, e.g. because the response was blocked."""
+
+
+class InvalidResponseError(LLMError):
+    """The model's answer does not match the requested response schema."""
+
+
+def error_for_status(status: Optional[int], message: str, retry_after: Optional[float] = None) -> LLMError:
+    if status == 429:
+        return RateLimitError(message, status, retry_after)
+    if status is None or status >= 500:
+        return ServiceUnavailableError(message, status, retry_after)
+    return RequestError(message, status, retry_after)
+
+
+class Generation(NamedTuple):
+    text: str
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+class GenAIBackend:
+    """Calls Gemini through the google-genai client and translates its errors into LLMError types."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate(self, model: str, prompt: str, config: Optional[Dict] = None) -> Generation:
+        with _genai_errors():
+            response = self.client.models.generate_content(model=model, contents=prompt, config=config)
+        if not response.text:
+            raise EmptyResponseError("Gemini returned an empty response.")
+        return _generation(response)
+
+    def stream(self, model: str, prompt: str, config: Optional[Dict] = None) -> Iterator[Generation]:
+        """Yields the response in pieces as Gemini produces them; the last piece carries the token usage."""
+        with _genai_errors():
+            for chunk in self.client.models.generate_content_stream(model=model, contents=prompt, config=config):
+                yield _generation(chunk)
+
+
+def _generation(response) -> Generation:
+    usage = getattr(response, "usage_metadata", None)
+    return Generation(response.text or "",
+                      getattr(usage, "prompt_token_count", None),
+                      getattr(usage, "candidates_token_count", None))
+
+
+@contextmanager
+def _genai_errors():
+    import httpx
+    from google.genai import errors
+
+    try:
+        yield
+    except errors.APIError as e:
+        raise error_for_status(e.code, str(e), _retry_delay(e.details)) from e
+    except (httpx.TransportError, OSError) as e:
+        # Timeouts and dropped connections.
+        raise ServiceUnavailableError(str(e)) from e
+
+
+def _retry_delay(details) -> Optional[float]:
+    """Reads the RetryInfo delay (e.g. '17s') that Gemini attaches to 429 responses."""
+    error = details.get("error", details) if isinstance(details, dict) else {}
+    for detail in error.get("details", []) if isinstance(error, dict) else []:
+        if isinstance(detail, dict) and str(detail.get("@type", "")).endswith("RetryInfo"):
+            match = re.match(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+            if match:
+                return float(match.group(1))
+    return None
+
+
+class FakeBackend:
+    """
+    Offline stand-in for Gemini, for tests and load tests.
+
+    Answers after `latency` seconds with responder(prompt) and, when `rpm` is
+    set, rejects requests beyond that many per trailing minute with a 429 like
+    the real quota. `errors` are raised first, one per call. Tracks how many
+    calls were in flight at once.
+    """
+
+    def __init__(self, latency: float = 0.0, responder: Optional[Callable[[str], str]] = None,
+                 rpm: Optional[int] = None, errors: Iterable[LLMError] = ()):
+        self.latency = latency
+        self.responder = responder or (lambda prompt: f"Fake analysis of a {len(prompt):,}-character prompt.")
+        self.rpm = rpm
+        self.errors = list(errors)
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._accepted: List[float] = []
+        self._lock = threading.Lock()
+
+    def generate(self, model: str, prompt: str, config: Optional[Dict] = None) -> Generation:
+        self._admit()
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            text = self.responder(prompt)
+        finally:
+            self._release()
+        return Generation(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    def stream(self, model: str, prompt: str, config: Optional[Dict] = None) -> Iterator[Generation]:
+        """The response a word at a time; `latency` is spent before the first word."""
+        self._admit()
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            text = self.responder(prompt)
+            words = re.split(r"(?<=\s)(?=\S)", text)
+            for i, word in enumerate(words):
+                last = i == len(words) - 1
+                yield Generation(word, estimate_tokens(prompt) if last else None,
+                                 estimate_tokens(text) if last else None)
+        finally:
+            self._release()
+
+    def _admit(self) -> None:
+        with self._lock:
+            self.calls += 1
+            if self.errors:
+                raise self.errors.pop(0)
+            now = time.monotonic()
+            if self.rpm is not None:
+                self._accepted = [t for t in self._accepted if now - t < 60]
+                if len(self._accepted) >= self.rpm:
+                    raise RateLimitError("Fake quota exceeded", 429, retry_after=60 - (now - self._accepted[0]))
+                self._accepted.append(now)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+
+class GeminiExecutor:
+    """
+    Runs model calls on a bounded thread pool.
+
+    At most `max_in_flight` requests are outstanding at once; optional
+    requests-per-minute and tokens-per-minute token buckets pace them under the
+    quota, and 429/5xx answers are retried with jittered exponential backoff
+    (honoring the server's retry delay) before surfacing as a typed LLMError.
+    Pass rpm=None or tpm=None to lift a limit.
+    """
+
+    def __init__(self, backend, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 rpm: Optional[float] = DEFAULT_RPM, tpm: Optional[float] = DEFAULT_TPM,
+                 max_retries: int = 5, backoff_base: float = 2.0, backoff_cap: float = 60.0,
+                 count_tokens: Callable[[str], int] = estimate_tokens,
+                 output_reserve: int = DEFAULT_OUTPUT_TOKENS):
+        self.backend = backend
+        self.max_in_flight = max_in_flight
+        self.requests = TokenBucket(rpm / 60.0) if rpm else None
+        # A minute's worth of tokens may be spent in a burst.
+        self.tokens = TokenBucket(tpm / 60.0, capacity=tpm) if tpm else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.count_tokens = count_tokens
+        self.output_reserve = output_reserve
+        self.sleep = time.sleep
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "prompt_tokens": 0, "output_tokens": 0}
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="gemini")
+
+    def submit(self, model: str, prompt: str, config: Optional[Dict] = None) -> Future:
+        """Queues a request; the future resolves to the response text or raises LLMError."""
+        return self._pool.submit(self._call, model, prompt, config)
+
+    def generate(self, model: str, prompt: str, config: Optional[Dict] = None) -> str:
+        return self.submit(model, prompt, config).result()
+
+    def stream(self, model: str, prompt: str, config: Optional[Dict] = None) -> Iterator[str]:
+        """
+        Yields the response text as it arrives. The request holds an in-flight slot and is
+        paced and retried like generate(), except that a failure after text has been yielded
+        is raised rather than retried, since a retry would repeat that text.
+        """
+        chunks: "queue.Queue[Optional[str]]" = queue.Queue()
+
+        def run():
+            try:
+                return self._call(model, prompt, config, emit=chunks.put)
+            finally:
+                chunks.put(None)
+
+        future = self._pool.submit(run)
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            yield chunk
+        future.result()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown()
+
+    def _call(self, model: str, prompt: str, config: Optional[Dict],
+              emit: Optional[Callable[[str], None]] = None) -> str:
+        with profiler.span("gemini", prompt_chars=len(prompt)) as span:
+            generation = self._attempt(model, prompt, config, emit, span)
+            span.add(prompt_tokens=generation.prompt_tokens or 0, output_tokens=generation.output_tokens or 0,
+                     response_chars=len(generation.text))
+        return generation.text
+
+    def _attempt(self, model: str, prompt: str, config: Optional[Dict],
+                 emit: Optional[Callable[[str], None]], span) -> Generation:
+        """Sends the request, retrying rate-limit and overload errors; retries are added to span."""
+        reserved = self.count_tokens(prompt) + self.output_reserve
+        for attempt in range(self.max_retries + 1):
+            with profiler.span("gemini.throttle"):
+                if self.requests:
+                    self.requests.acquire()
+                if self.tokens:
+                    self.tokens.acquire(reserved)
+            self._count("requests")
+            emitted: List[str] = []
+            try:
+                if emit is None:
+                    generation = self.backend.generate(model, prompt, config)
+                else:
+                    generation = self._receive(self.backend.stream(model, prompt, config), emit, emitted)
+            except (RateLimitError, ServiceUnavailableError) as e:
+                if attempt == self.max_retries or emitted:
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                span.add(retries=1)
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+                with profiler.span("gemini.backoff", retries=1):
+                    self.sleep(max(delay, e.retry_after or 0.0))
+                continue
+            except LLMError:
+                self._count("failures")
+                raise
+            self._count("prompt_tokens", generation.prompt_tokens or 0)
+            self._count("output_tokens", generation.output_tokens or 0)
+            used = (generation.prompt_tokens or 0) + (generation.output_tokens or 0)
+            if self.tokens and used > reserved:
+                self.tokens.acquire(used - reserved)
+            return generation
+
+    @staticmethod
+    def _receive(pieces: Iterable[Generation], emit: Callable[[str], None], emitted: List[str]) -> Generation:
+        """Forwards streamed text to emit, collecting it in emitted. Returns the whole generation."""
+        prompt_tokens = output_tokens = None
+        for piece in pieces:
+            if piece.text:
+                emitted.append(piece.text)
+                emit(piece.text)
+            prompt_tokens = piece.prompt_tokens or prompt_tokens
+            output_tokens = piece.output_tokens or output_tokens
+        if not emitted:
+            raise EmptyResponseError("Gemini returned an empty response.")
+        return Generation("".join(emitted), prompt_tokens, output_tokens)
+
+    def _count(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self.stats[key] += amount
+
+
+def build_executor(api_key: Optional[str], max_in_flight: Optional[int] = None) -> GeminiExecutor:
+    """
+    Executor configured from the environment: QSCANNER_LLM_BACKEND ('gemini', the default,
+    or 'fake' for offline runs), QSCANNER_GEMINI_MAX_IN_FLIGHT (unless max_in_flight is given),
+    QSCANNER_GEMINI_RPM and QSCANNER_GEMINI_TPM (0 lifts the limit).
+    """
+    kind = os.getenv("QSCANNER_LLM_BACKEND", "gemini").lower()
+    if kind == "fake":
+        backend = FakeBackend(latency=float(os.getenv("QSCANNER_FAKE_LLM_LATENCY", "0.5")))
+    elif kind == "gemini":
+        from google import genai
+        backend = GenAIBackend(genai.Client(api_key=api_key))
+    else:
+        raise ValueError(f"Unknown QSCANNER_LLM_BACKEND '{kind}' (expected 'gemini' or 'fake').")
+    rpm = float(os.getenv("QSCANNER_GEMINI_RPM", DEFAULT_RPM))
+    tpm = float(os.getenv("QSCANNER_GEMINI_TPM", DEFAULT_TPM))
+    return GeminiExecutor(
+        backend,
+        max_in_flight=max_in_flight or int(os.getenv("QSCANNER_GEMINI_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)),
+        rpm=rpm or None,
+        tpm=tpm or None,
+    )
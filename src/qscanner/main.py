@@ -1,15 +1,306 @@
 import typer
+import json
 import os
-from typing import Annotated
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Annotated, Callable, List, Optional
 from rich.console import Console
+from rich.live import Live
 from rich.panel import Panel
+from rich.progress import Progress
+from rich.spinner import Spinner
+from rich.table import Table
+from rich.text import Text
+from .cache import HTTPCache
 from .sec_client import SECClient
-from .analyzer import StockAnalyzer
-from .utils import clean_html, extract_section
+from .bulk_store import COMPANYFACTS_ZIP_URL, DEFAULT_FORMS, SUBMISSIONS_ZIP_URL, BulkStore
+from .context_packer import DEFAULT_CONTEXT_TOKENS
+from .daemon import DaemonTransport, connect_daemon, daemon_executor, socket_path
+from .digest_store import DigestStore
+from .llm_cache import ResponseCache
+from .llm_executor import DEFAULT_MODEL_ID, LLMError, build_executor
+from .profiling import profiler
+from .replay import RecordingTransport, ReplayTransport
+from .ratings import QUALITY_RATINGS, QUALITY_SCORES
+from .search_index import SearchError, SearchIndex
+from .section_store import SectionStore
+from .sections import ANALYZED_SECTIONS, FILING_SECTIONS, UNBOUNDED_SECTION_CHARS
+from .transport import SECTransport, TransportError
+
+# The analysis stack (google-genai via analyzer, NumPy via financials, the pydantic schemas
+# via results_store, the scanner and filing pipeline) is imported inside the commands that
+# use it, so that --help and the lookup commands start without paying for it.
+# tests/test_startup.py guards this.
+if TYPE_CHECKING:
+    from .analyzer import StockAnalyzer
 
 app = typer.Typer(rich_markup_mode="rich")
 console = Console()
 
+NoCacheOption = Annotated[
+    bool,
+    typer.Option(
+        "--no-cache",
+        help="Bypass the local caches (SEC responses and processed filings) for this run."
+    )
+]
+
+RefreshOption = Annotated[
+    bool,
+    typer.Option(
+        "--refresh",
+        help="Revalidate every cached SEC response before using it."
+    )
+]
+
+ForceOption = Annotated[
+    bool,
+    typer.Option(
+        "--force",
+        help="Ignore cached Gemini responses and request a fresh analysis."
+    )
+]
+
+TokenBudgetOption = Annotated[
+    int,
+    typer.Option(
+        "--token-budget",
+        help="Maximum tokens of filing text sent in each Gemini call; sections are packed to fit."
+    )
+]
+
+StructuredOption = Annotated[
+    bool,
+    typer.Option(
+        "--structured",
+        help="Request schema-validated ratings instead of a free-text report and save them to the results "
+             "store for 'qscanner query'. The report is printed once complete rather than streamed."
+    )
+]
+
+FinancialsOption = Annotated[
+    bool,
+    typer.Option(
+        "--financials/--no-financials",
+        help="Include ratios computed from the company's XBRL facts (ROIC, margins, leverage, goodwill, "
+             "dilution, SBC) in the prompts."
+    )
+]
+
+FullDocumentsOption = Annotated[
+    bool,
+    typer.Option(
+        "--full-documents",
+        help="Download whole filing documents. By default a download stops once Items 1, 1A and 7 are "
+             "complete, skipping the financial statements and exhibits."
+    )
+]
+
+MULTI_YEAR_MODES = ("digest", "full")
+
+ModeOption = Annotated[
+    str,
+    typer.Option(
+        "--mode", "-m",
+        help="Multi-year strategy: 'digest' condenses each filing once (cached) and compares the digests; "
+             "'full' sends every filing's text in a single prompt."
+    )
+]
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    profile: Annotated[
+        bool,
+        typer.Option(
+            "--profile",
+            help="Time each stage (SEC requests and throttling, HTML cleaning, section extraction, prompt "
+                 "assembly, Gemini calls) and print a summary table when the command finishes. "
+                 "Parsing in worker processes is not traced; use --workers 0 to include it."
+        )
+    ] = False,
+    trace: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--trace",
+            help="Write the profile as a Chrome trace (JSON, for chrome://tracing or Perfetto) with the "
+                 "counter totals to this file. Implies --profile.",
+            show_default=False
+        )
+    ] = None
+):
+    """
+    Qualitative stock analysis of SEC 10-K filings with Gemini.
+    """
+    if profile or trace:
+        profiler.enable()
+        ctx.call_on_close(lambda: report_profile(trace))
+
+def report_profile(trace: Optional[Path] = None):
+    """Prints the profiler's per-stage summary and writes the trace file if one was requested."""
+    table = Table(title="Profile")
+    table.add_column("Stage")
+    table.add_column("Calls", justify="right")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Counters")
+    for stage in profiler.summary():
+        counters = ", ".join(f"{key} {value:,.0f}" for key, value in sorted(stage.counters.items()))
+        table.add_row(stage.name, str(stage.calls), f"{stage.seconds:.2f}", counters)
+    console.print(table)
+    events = profiler.events()
+    if events:
+        console.print("[dim]" + ", ".join(f"{key} {value:,.0f}" for key, value in sorted(events.items())) + "[/dim]")
+    if trace:
+        profiler.write_trace(trace)
+        console.print(f"[dim]Trace written to {trace}.[/dim]")
+
+def check_mode(mode: str):
+    if mode not in MULTI_YEAR_MODES:
+        console.print(f"[red]Unknown mode '{mode}'. Supported: {', '.join(MULTI_YEAR_MODES)}.[/red]")
+        raise typer.Exit(code=1)
+
+def sec_user_agent() -> str:
+    return os.getenv("SEC_USER_AGENT", "qscanner/1.0 (contact@example.com)")
+
+def build_transport(user_agent: str, use_daemon: bool = True):
+    """
+    The SEC transport for this process. With QSCANNER_REPLAY_DIR set, SEC responses are served from
+    that recorded directory instead of the network; with QSCANNER_RECORD_DIR set, live responses are
+    recorded into it for later replay. Otherwise requests go through a running 'qscanner serve' daemon
+    when there is one (and use_daemon is set), or through a new SECTransport.
+    """
+    if os.getenv("QSCANNER_REPLAY_DIR"):
+        return ReplayTransport(Path(os.environ["QSCANNER_REPLAY_DIR"]))
+    if os.getenv("QSCANNER_RECORD_DIR"):
+        return RecordingTransport(SECTransport(user_agent), Path(os.environ["QSCANNER_RECORD_DIR"]))
+    daemon = connect_daemon() if use_daemon else None
+    return DaemonTransport(daemon) if daemon else SECTransport(user_agent)
+
+def build_sec_client(no_cache: bool = False, refresh: bool = False) -> SECClient:
+    """
+    Creates an SECClient honoring the cache flags, SEC_USER_AGENT and the transport settings of
+    build_transport. Filing lookups for companies in the ingested bulk archives
+    (see 'qscanner ingest') stay offline.
+    """
+    user_agent = sec_user_agent()
+    cache = None if no_cache else HTTPCache()
+    return SECClient(user_agent, cache=cache, refresh=refresh, transport=build_transport(user_agent),
+                     bulk=BulkStore.existing())
+
+def build_section_store(no_cache: bool = False) -> Optional[SectionStore]:
+    """The processed-filing store, or None when caching is disabled."""
+    return None if no_cache else SectionStore()
+
+def load_api_key(use_daemon: bool = True) -> Optional[str]:
+    """
+    GEMINI_API_KEY, required unless QSCANNER_LLM_BACKEND=fake or (with use_daemon) a daemon,
+    which holds its own key, is running.
+    """
+    if os.getenv("QSCANNER_LLM_BACKEND", "gemini").lower() == "fake" or (use_daemon and connect_daemon()):
+        return None
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        console.print("[red]Error: GEMINI_API_KEY not found in environment.[/red]")
+        raise typer.Exit(code=1)
+    return api_key
+
+def build_analyzer(api_key: Optional[str], no_cache: bool = False, force: bool = False,
+                   token_budget: int = DEFAULT_CONTEXT_TOKENS, max_in_flight: Optional[int] = None) -> "StockAnalyzer":
+    """
+    Creates a StockAnalyzer whose Gemini calls go through the rate-limited executor
+    (configured by the QSCANNER_GEMINI_* variables; max_in_flight overrides the concurrency),
+    or through a running daemon's, backed by the LLM response cache and digest store unless
+    caching is disabled.
+    """
+    from .analyzer import StockAnalyzer
+    daemon = connect_daemon()
+    try:
+        executor = daemon_executor(daemon, max_in_flight) if daemon else build_executor(api_key, max_in_flight)
+        if no_cache:
+            return StockAnalyzer(context_tokens=token_budget, executor=executor)
+        # Invalid QSCANNER_LLM_CACHE* settings raise ValueError here too.
+        return StockAnalyzer(cache=ResponseCache(force=force), digests=DigestStore(force=force),
+                             context_tokens=token_budget, executor=executor)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(code=1)
+
+def load_financials(client: SECClient, cik: str, years: int = 0) -> Optional[str]:
+    """
+    The company's table of reported financials for the prompts, covering at least `years`
+    fiscal years (DEFAULT_TABLE_YEARS by default); None (with a warning) when unavailable.
+    """
+    from .financials import DEFAULT_TABLE_YEARS, financial_summary
+    try:
+        with profiler.span("financials"):
+            summary = financial_summary(client, cik, max(years, DEFAULT_TABLE_YEARS))
+    except Exception as e:
+        console.print(f"[yellow]Warning: could not load XBRL financials: {e}[/yellow]")
+        return None
+    if summary is None:
+        console.print("[yellow]Warning: no XBRL financials found; analyzing the filing text alone.[/yellow]")
+    return summary
+
+def fail_analysis(error: LLMError):
+    """Reports an analysis Gemini could not complete and exits with an error status."""
+    console.print(f"[red]Analysis failed: {error}[/red]")
+    raise typer.Exit(code=1)
+
+def fail_sec(error):
+    """Reports an SEC request that failed after every retry and exits with an error status."""
+    console.print(f"[red]SEC request failed: {error}[/red]")
+    raise typer.Exit(code=1)
+
+@contextmanager
+def sec_errors():
+    """Turns a TransportError raised in the block into a one-line error and an error exit status."""
+    try:
+        yield
+    except TransportError as e:
+        fail_sec(e)
+
+def drop_failed(filings: List[dict]) -> List[dict]:
+    """Warns about the filings whose download failed and returns the rest."""
+    for filing in filings:
+        if "error" in filing:
+            console.print(f"[yellow]Warning: skipping the {filing['date']} filing: {filing['error']}[/yellow]")
+    return [filing for filing in filings if "error" not in filing]
+
+def stream_report(title: str, message: str, run: Callable[[Optional[Callable[[str], None]]], str]) -> str:
+    """
+    Runs an analysis and prints its report in a panel. On an interactive terminal the
+    report is rendered as it streams in; otherwise (e.g. output piped to a file) it is
+    printed once complete. Either way the final panel is the same.
+    run: called with the chunk callback to pass to the analyzer (None when not streaming).
+    """
+    if not console.is_terminal:
+        report = run(None)
+        console.print(Panel(report, title=title, expand=False))
+        return report
+
+    text = Text()
+    with Live(Spinner("dots", text=message), console=console, refresh_per_second=8,
+              vertical_overflow="visible") as live:
+        def on_chunk(chunk: str):
+            if not text:
+                live.update(Panel(text, title=title, expand=False))
+            text.append(chunk)
+
+        report = run(on_chunk)
+        live.update(Panel(report, title=title, expand=False))
+    return report
+
+def report_llm_cache(analyzer: "StockAnalyzer"):
+    """Prints the run's LLM response cache hits and misses."""
+    if analyzer.cache:
+        console.print(f"[dim]LLM cache: {analyzer.cache.hits} hits, {analyzer.cache.misses} misses[/dim]")
+
+def warn_unbounded(sections: dict, label: str):
+    """Reports sections whose end boundary was not found and were cut at a fixed length."""
+    for key in sections.get("unbounded", []):
+        console.print(f"[yellow]Warning: end of {FILING_SECTIONS[key]} not found in {label}; "
+                      f"using its first {UNBOUNDED_SECTION_CHARS:,} characters.[/yellow]")
+
 @app.command()
 def analyze(
     ticker: Annotated[
@@ -18,45 +309,63 @@ def analyze(
             help="The stock ticker symbol to analyze (e.g. AAPL).",
             show_default=False
         )
-    ]
+    ],
+    token_budget: TokenBudgetOption = DEFAULT_CONTEXT_TOKENS,
+    no_cache: NoCacheOption = False,
+    refresh: RefreshOption = False,
+    force: ForceOption = False,
+    structured: StructuredOption = False,
+    financials: FinancialsOption = True,
+    full_documents: FullDocumentsOption = False
 ):
     """
     Perform a deep qualitative analysis of the LATEST 10-K filing.
     
     Evaluates Moat, Reinvestment, Management, and Risk based on the most recent submission.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        console.print("[red]Error: GEMINI_API_KEY not found in environment.[/red]")
-        raise typer.Exit(code=1)
+    from .pipeline import FilingPipeline
+    from .results_store import ResultsStore
+    api_key = load_api_key()
 
-    user_agent = os.getenv("SEC_USER_AGENT", "qscanner/1.0 (contact@example.com)")
-    
-    with console.status(f"[bold green]Fetching data for {ticker}...") as status:
-        client = SECClient(user_agent)
+    with sec_errors(), console.status(f"[bold green]Fetching data for {ticker}...") as status:
+        client = build_sec_client(no_cache, refresh)
         cik = client.get_cik(ticker)
         if not cik:
             console.print(f"[red]Ticker {ticker} not found.[/red]")
             return
 
-        url = client.get_latest_10k_url(cik)
-        if not url:
+        filings_info = client.get_10k_urls(cik, limit=1)
+        if not filings_info:
             console.print(f"[red]Could not find latest 10-K for {ticker}.[/red]")
             return
 
-        html_content = client.fetch_filing_content(url)
-        full_text = clean_html(html_content)
-        
-        # Extract sections
-        business_section = extract_section(full_text, "Item 1", "Item 1A")
-        risk_section = extract_section(full_text, "Item 1A", "Item 1B")
-        mda_section = extract_section(full_text, "Item 7", "Item 7A")
-
-    with console.status("[bold green]Analyzing with Gemini...") as status:
-        analyzer = StockAnalyzer(api_key)
-        report = analyzer.analyze_qualitative(ticker, business_section, mda_section, risk_section)
+        pipeline = FilingPipeline(client, parse_workers=0, store=build_section_store(no_cache),
+                                  sections=None if full_documents else ANALYZED_SECTIONS)
+        with profiler.span("filings", count=1):
+            sections = pipeline.run(filings_info, cik=cik)[0]
+        if "error" in sections:
+            fail_sec(sections["error"])
+        warn_unbounded(sections, "the latest filing")
+        reported = load_financials(client, cik) if financials else None
 
-    console.print(Panel(report, title=f"Qualitative Analysis: {ticker}", expand=False))
+    analyzer = build_analyzer(api_key, no_cache, force, token_budget)
+    try:
+        with profiler.span("analysis"):
+            if structured:
+                with console.status("[bold green]Analyzing with Gemini..."):
+                    analysis = analyzer.assess_qualitative(ticker, sections["business"], sections["mda"], sections["risk"],
+                                                           financials=reported)
+                ResultsStore().put(ticker, [sections["date"]], analyzer.model_id, analysis, cik=cik)
+                console.print(Panel(analysis.render(), title=f"Qualitative Analysis: {ticker}", expand=False))
+                report_llm_cache(analyzer)
+                return
+            stream_report(f"Qualitative Analysis: {ticker}", "[bold green]Analyzing with Gemini...",
+                          lambda on_chunk: analyzer.analyze_qualitative(
+                              ticker, sections["business"], sections["mda"], sections["risk"], on_chunk=on_chunk,
+                              financials=reported))
+    except LLMError as e:
+        fail_analysis(e)
+    report_llm_cache(analyzer)
 
 @app.command()
 def check_filings(
@@ -66,21 +375,23 @@ def check_filings(
             help="The stock ticker to check for available filings (e.g. MSFT).",
             show_default=False
         )
-    ]
+    ],
+    no_cache: NoCacheOption = False,
+    refresh: RefreshOption = False
 ):
     """
     List all available 10-K filing dates for a given ticker.
     
     Useful for seeing how far back the historical data goes before running a multi-year analysis.
     """
-    user_agent = os.getenv("SEC_USER_AGENT", "qscanner/1.0 (contact@example.com)")
-    client = SECClient(user_agent)
-    cik = client.get_cik(ticker)
-    if not cik:
-        console.print(f"[red]Ticker {ticker} not found.[/red]")
-        return
+    with sec_errors():
+        client = build_sec_client(no_cache, refresh)
+        cik = client.get_cik(ticker)
+        if not cik:
+            console.print(f"[red]Ticker {ticker} not found.[/red]")
+            return
+        filing_dates = client.get_available_10ks(cik)
 
-    filing_dates = client.get_available_10ks(cik)
     if not filing_dates:
         console.print(f"[yellow]No 10-K filings found for {ticker}.[/yellow]")
         return
@@ -89,6 +400,44 @@ def check_filings(
     for date in filing_dates:
         console.print(f" - {date}")
 
+@app.command()
+def lookup(
+    query: Annotated[
+        str,
+        typer.Argument(
+            help="A ticker, a CIK, or part of a company name (e.g. 'alphabet').",
+            show_default=False
+        )
+    ],
+    limit: Annotated[
+        int,
+        typer.Option(
+            "--limit", "-n",
+            help="Maximum number of matches to show."
+        )
+    ] = 10,
+    no_cache: NoCacheOption = False,
+    refresh: RefreshOption = False
+):
+    """
+    Search the local ticker index by ticker, CIK or company name.
+    
+    Numeric queries are treated as CIKs; anything else is matched against tickers and company names.
+    """
+    with sec_errors():
+        client = build_sec_client(no_cache, refresh)
+        if query.isdigit():
+            matches = client.get_tickers_for_cik(query)
+        else:
+            matches = client.search_companies(query, limit=limit)
+
+    if not matches:
+        console.print(f"[yellow]No companies match '{query}'.[/yellow]")
+        return
+
+    for match in matches:
+        console.print(f" - [bold]{match.ticker}[/bold]  CIK {match.cik}  {match.title}")
+
 @app.command()
 def multi_analyze(
     ticker: Annotated[
@@ -104,7 +453,24 @@ def multi_analyze(
             "--years", "-y",
             help="Number of historical years to include in the analysis."
         )
-    ] = 3
+    ] = 3,
+    workers: Annotated[
+        Optional[int],
+        typer.Option(
+            "--workers", "-w",
+            help="Parallel processes for HTML parsing with --full-documents (default: number of CPU cores, 0 to "
+                 "parse in-process). Streamed filings are parsed on their download threads.",
+            show_default=False
+        )
+    ] = None,
+    mode: ModeOption = "digest",
+    token_budget: TokenBudgetOption = DEFAULT_CONTEXT_TOKENS,
+    no_cache: NoCacheOption = False,
+    refresh: RefreshOption = False,
+    force: ForceOption = False,
+    structured: StructuredOption = False,
+    financials: FinancialsOption = True,
+    full_documents: FullDocumentsOption = False
 ):
     """
     Perform a forensic, multi-year analysis to track business consistency and decay.
@@ -112,15 +478,14 @@ def multi_analyze(
     This adversarial analysis detects structural deterioration, strategy drift, 
     and management bias across multiple years of 10-K filings.
     """
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        console.print("[red]Error: GEMINI_API_KEY not found in environment.[/red]")
-        raise typer.Exit(code=1)
+    from .pipeline import FilingPipeline
+    from .results_store import ResultsStore
+    check_mode(mode)
+    api_key = load_api_key()
 
-    user_agent = os.getenv("SEC_USER_AGENT", "qscanner/1.0 (contact@example.com)")
-    client = SECClient(user_agent)
+    client = build_sec_client(no_cache, refresh)
     
-    with console.status(f"[bold green]Identifying {years} years of filings for {ticker}...") as status:
+    with sec_errors(), console.status(f"[bold green]Identifying {years} years of filings for {ticker}...") as status:
         cik = client.get_cik(ticker)
         if not cik:
             console.print(f"[red]Ticker {ticker} not found.[/red]")
@@ -131,31 +496,451 @@ def multi_analyze(
             console.print(f"[red]Could not find 10-K filings for {ticker}.[/red]")
             return
 
-    filings_content = []
-    for info in filings_info:
-        date = info['date']
-        url = info['url']
-        with console.status(f"[bold blue]Fetching and processing {date} filing...") as status:
-            html_content = client.fetch_filing_content(url)
-            full_text = clean_html(html_content)
-            
-            # Extract sections
-            business_section = extract_section(full_text, "Item 1", "Item 1A")
-            risk_section = extract_section(full_text, "Item 1A", "Item 1B")
-            mda_section = extract_section(full_text, "Item 7", "Item 7A")
-            
-            filings_content.append({
-                "date": date,
-                "business": business_section,
-                "mda": mda_section,
-                "risk": risk_section
-            })
-
-    with console.status(f"[bold green]Performing longitudinal analysis of {len(filings_content)} years...") as status:
-        analyzer = StockAnalyzer(api_key)
-        report = analyzer.analyze_multi_year(ticker, filings_content)
-
-    console.print(Panel(report, title=f"Multi-Year Quality Analysis: {ticker}", expand=False))
+    with sec_errors(), console.status(f"[bold blue]Fetching and processing {len(filings_info)} filings...") as status:
+        def show_progress(downloaded: int, parsed: int, total: int):
+            status.update(f"[bold blue]Fetched {downloaded}/{total}, processed {parsed}/{total} filings...")
+
+        pipeline = FilingPipeline(client, parse_workers=workers, store=build_section_store(no_cache),
+                                  sections=None if full_documents else ANALYZED_SECTIONS)
+        with profiler.span("filings", count=len(filings_info)):
+            filings_content = drop_failed(pipeline.run(filings_info, progress=show_progress, cik=cik))
+    if not filings_content:
+        console.print(f"[red]Could not download any 10-K filings for {ticker}.[/red]")
+        raise typer.Exit(code=1)
+    for filing in filings_content:
+        warn_unbounded(filing, f"the {filing['date']} filing")
+
+    reported = load_financials(client, cik, years) if financials else None
+    analyzer = build_analyzer(api_key, no_cache, force, token_budget)
+    analyze_years = analyzer.analyze_multi_year_incremental if mode == "digest" else analyzer.analyze_multi_year
+    try:
+        with profiler.span("analysis"):
+            if structured:
+                with console.status(f"[bold green]Performing longitudinal analysis of {len(filings_content)} years..."):
+                    verdict = analyzer.assess_multi_year(ticker, filings_content, mode, financials=reported)
+                ResultsStore().put(ticker, [f["date"] for f in filings_content], analyzer.model_id, verdict, cik=cik)
+                console.print(Panel(verdict.render(ticker), title=f"Multi-Year Quality Analysis: {ticker}", expand=False))
+                report_llm_cache(analyzer)
+                return
+            stream_report(f"Multi-Year Quality Analysis: {ticker}",
+                          f"[bold green]Performing longitudinal analysis of {len(filings_content)} years...",
+                          lambda on_chunk: analyze_years(ticker, filings_content, on_chunk=on_chunk,
+                                                        financials=reported))
+    except LLMError as e:
+        fail_analysis(e)
+    report_llm_cache(analyzer)
+
+@app.command()
+def scan(
+    watchlist: Annotated[
+        Optional[Path],
+        typer.Argument(
+            help="File with one ticker per line (or a CSV whose first column is the ticker).",
+            show_default=False
+        )
+    ] = None,
+    universe: Annotated[
+        Optional[str],
+        typer.Option(
+            "--universe", "-u",
+            help="Scan a predefined universe instead of a watchlist. Supported: 'all' (every ticker known to the SEC).",
+            show_default=False
+        )
+    ] = None,
+    output: Annotated[
+        Path,
+        typer.Option(
+            "--output", "-o",
+            help="Where to stream results; the format (JSONL or CSV) follows the file extension."
+        )
+    ] = Path("scan_results.jsonl"),
+    years: Annotated[
+        int,
+        typer.Option(
+            "--years", "-y",
+            help="Years of 10-K filings per ticker. 1 runs the single-filing analysis, more runs the multi-year analysis."
+        )
+    ] = 1,
+    sec_workers: Annotated[
+        int,
+        typer.Option(
+            "--sec-workers",
+            help="Tickers fetched from the SEC concurrently (requests stay within the 10 req/s limit)."
+        )
+    ] = 4,
+    llm_workers: Annotated[
+        int,
+        typer.Option(
+            "--llm-workers",
+            help="Concurrent Gemini requests, shared by the tickers being analyzed and their per-filing digests."
+        )
+    ] = 2,
+    restart: Annotated[
+        bool,
+        typer.Option(
+            "--restart",
+            help="Ignore the checkpoint and previous results and start the scan over."
+        )
+    ] = False,
+    mode: ModeOption = "digest",
+    token_budget: TokenBudgetOption = DEFAULT_CONTEXT_TOKENS,
+    no_cache: NoCacheOption = False,
+    refresh: RefreshOption = False,
+    force: ForceOption = False,
+    financials: FinancialsOption = True,
+    full_documents: FullDocumentsOption = False
+):
+    """
+    Screen a whole watchlist or universe in one run.
+    
+    Results are streamed to the output file as each ticker finishes, and progress is checkpointed
+    next to it so an interrupted scan resumes where it stopped. Ratings are schema-validated and
+    also saved to the results store, for screening with 'qscanner query'.
+    """
+    from .results_store import ResultsStore
+    from .scanner import BatchScanner, Checkpoint, ResultWriter, load_watchlist
+    check_mode(mode)
+    api_key = load_api_key()
+
+    client = build_sec_client(no_cache, refresh)
+    if universe:
+        if universe.lower() != "all":
+            console.print(f"[red]Unknown universe '{universe}'. Supported: all.[/red]")
+            raise typer.Exit(code=1)
+        tickers = client.tickers.all_tickers()
+    elif watchlist:
+        tickers = load_watchlist(watchlist)
+    else:
+        console.print("[red]Provide a watchlist file or --universe.[/red]")
+        raise typer.Exit(code=1)
+
+    checkpoint = Checkpoint(output.with_name(output.name + ".checkpoint"))
+    if restart:
+        checkpoint.reset()
+    resuming = bool(checkpoint.completed())
+    if resuming:
+        console.print(f"[yellow]Resuming scan: {len(checkpoint.completed())} tickers already done.[/yellow]")
+
+    analyzer = build_analyzer(api_key, no_cache, force, token_budget, max_in_flight=llm_workers)
+    scanner = BatchScanner(client, analyzer, years=years,
+                           sec_workers=sec_workers, llm_workers=llm_workers,
+                           store=build_section_store(no_cache), multi_year_mode=mode,
+                           results=ResultsStore(), financials=financials,
+                           sections=None if full_documents else ANALYZED_SECTIONS)
+    writer = ResultWriter(output, append=resuming, retain=checkpoint.completed())
+    try:
+        with Progress(console=console) as progress:
+            task = progress.add_task(f"Scanning {len(tickers)} tickers", total=len(tickers),
+                                     completed=len(checkpoint.completed() & set(tickers)))
+
+            def on_result(result):
+                color = "green" if result["status"] == "ok" else "yellow" if result["status"] != "error" else "red"
+                progress.console.print(f"[{color}]{result['ticker']}: {result['status']}[/{color}]")
+                progress.advance(task)
+                profiler.count(f"scan.{result['status']}")
+                profiler.sample()
+
+            with profiler.span("scan", tickers=len(tickers)):
+                summary = scanner.run(tickers, writer, checkpoint, on_result=on_result)
+    finally:
+        writer.close()
+
+    counts = ", ".join(f"{status}: {count}" for status, count in summary.items())
+    console.print(f"[bold green]Scan complete ({counts}). Results written to {output}.[/bold green]")
+    report_llm_cache(analyzer)
+
+@app.command()
+def ingest(
+    submissions: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--submissions",
+            help=f"Path to a downloaded submissions.zip ({SUBMISSIONS_ZIP_URL}).",
+            show_default=False
+        )
+    ] = None,
+    companyfacts: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--companyfacts",
+            help=f"Path to a downloaded companyfacts.zip ({COMPANYFACTS_ZIP_URL}).",
+            show_default=False
+        )
+    ] = None,
+    form: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--form", "-f",
+            help=f"Form types to index from submissions.zip (default: {', '.join(DEFAULT_FORMS)}). Repeatable; "
+                 "'all' keeps every form.",
+            show_default=False
+        )
+    ] = None
+):
+    """
+    Build the local filing index from EDGAR's nightly bulk archives.
+
+    The archives are read member by member straight from the zip files, without extracting them.
+    Afterwards filing lookups for every company in submissions.zip are answered locally instead of
+    one data.sec.gov request per ticker, and company facts are available offline.
+    """
+    if not submissions and not companyfacts:
+        console.print("[red]Provide --submissions and/or --companyfacts.[/red]")
+        raise typer.Exit(code=1)
+    for archive in (submissions, companyfacts):
+        if archive and not archive.is_file():
+            console.print(f"[red]Archive not found: {archive}[/red]")
+            raise typer.Exit(code=1)
+
+    forms = None if form and "all" in form else (form or DEFAULT_FORMS)
+    store = BulkStore()
+    with Progress(console=console) as progress:
+        def tracker(label: str):
+            task = progress.add_task(label, total=None)
+            return lambda done, total: progress.update(task, completed=done, total=total)
+
+        if submissions:
+            counts = store.ingest_submissions(submissions, forms, progress=tracker(f"Indexing {submissions.name}"))
+            progress.console.print(f"[green]Indexed {counts['filings']:,} filings of {counts['companies']:,} companies.[/green]")
+        if companyfacts:
+            counts = store.ingest_companyfacts(companyfacts, progress=tracker(f"Storing {companyfacts.name}"))
+            progress.console.print(f"[green]Stored facts of {counts['companies']:,} companies.[/green]")
+    console.print(f"[bold green]Bulk data saved to {store.path}.[/bold green]")
+
+@app.command()
+def serve(
+    socket: Annotated[
+        Optional[Path],
+        typer.Option(
+            "--socket",
+            help="Unix socket to listen on (default: QSCANNER_DAEMON_SOCKET, else qscanner.sock in the cache "
+                 "directory). Commands look for the daemon there.",
+            show_default=False
+        )
+    ] = None
+):
+    """
+    Run a local daemon that keeps the SEC and Gemini clients warm for the other commands.
+
+    While it is up, every qscanner process on this machine sends its SEC requests and Gemini calls
+    through it: one connection pool and one SEC rate limit, one Gemini client and quota, and identical
+    requests that are in flight at the same time (e.g. two jobs fetching the same ticker) are sent once.
+    Commands detect it on their own; set QSCANNER_DAEMON=0 to run one without it. Stop it with Ctrl+C.
+    """
+    from .daemon import Daemon, DaemonClient, DaemonServer
+    path = socket or socket_path()
+    if DaemonClient(path).alive():
+        console.print(f"[yellow]A daemon is already listening on {path}.[/yellow]")
+        raise typer.Exit(code=1)
+    api_key = load_api_key(use_daemon=False)
+    try:
+        executor = build_executor(api_key)
+    except ValueError as e:
+        console.print(f"[red]Error: {e}[/red]")
+        raise typer.Exit(code=1)
+
+    daemon = Daemon(build_transport(sec_user_agent(), use_daemon=False), executor)
+    with DaemonServer(path, daemon) as server:
+        console.print(f"[bold green]qscanner daemon listening on {path}[/bold green] [dim](Ctrl+C to stop)[/dim]")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    stats = daemon.status()
+    console.print(f"[dim]Served {stats['sec_requests'] + stats['sec_streams']:,} SEC requests "
+                  f"({stats['sec_coalesced']:,} coalesced) and {stats['llm_requests']:,} Gemini calls "
+                  f"({stats['llm_coalesced']:,} coalesced).[/dim]")
+
+@app.command()
+def query(
+    score: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--score", "-s",
+            help=f"Keep names whose latest multi-year score is one of these ({', '.join(QUALITY_SCORES)}). Repeatable.",
+            show_default=False
+        )
+    ] = None,
+    moat: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--moat",
+            help=f"Keep names whose latest moat rating is one of these ({', '.join(QUALITY_RATINGS)}). Repeatable.",
+            show_default=False
+        )
+    ] = None,
+    risk_worsened: Annotated[
+        bool,
+        typer.Option(
+            "--risk-worsened",
+            help="Keep names whose risk profile worsened: a 'Worsening' multi-year risk trend, or a worse "
+                 "single-filing risk rating than the previous filing's."
+        )
+    ] = False,
+    ticker: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--ticker", "-t",
+            help="Restrict to these tickers. Repeatable.",
+            show_default=False
+        )
+    ] = None,
+    limit: Annotated[
+        Optional[int],
+        typer.Option(
+            "--limit", "-n",
+            help="Maximum number of rows.",
+            show_default=False
+        )
+    ] = None,
+    as_json: Annotated[
+        bool,
+        typer.Option(
+            "--json",
+            help="Print one JSON object per line instead of a table."
+        )
+    ] = False
+):
+    """
+    Screen the saved structured results without calling Gemini again.
+
+    Results come from 'scan' and from 'analyze'/'multi-analyze' with --structured; each ticker shows its
+    latest ratings. Example: qscanner query -s Pristine -s High --risk-worsened
+    """
+    from .results_store import ResultsStore
+    rows = ResultsStore().screen(DEFAULT_MODEL_ID, scores=score or (), moats=moat or (),
+                                 risk_worsened=risk_worsened, tickers=ticker or (), limit=limit)
+    if as_json:
+        for row in rows:
+            print(json.dumps(row._asdict()))
+        return
+    if not rows:
+        console.print("[yellow]No saved results match.[/yellow]")
+        return
+
+    table = Table(title=f"{len(rows)} matching names")
+    for column in ("Ticker", "Filed", "Moat", "Reinvestment", "Management", "Risk", "Score", "Risk Trend"):
+        table.add_column(column)
+    for row in rows:
+        risk = row.risk_profile or ""
+        if row.previous_risk_profile and row.previous_risk_profile != row.risk_profile:
+            risk = f"{row.previous_risk_profile} → {risk}"
+        table.add_row(row.ticker, row.filing_date, row.moat or "", row.reinvestment or "", row.management or "",
+                      risk, row.score or "", row.risk_trend or "")
+    console.print(table)
+
+@app.command()
+def search(
+    query: Annotated[
+        str,
+        typer.Argument(
+            help='FTS5 query: words, "exact phrases", prefix* terms, AND/OR/NOT, and '
+                 'NEAR("customer" "concentration", 10) for words within 10 words of each other.',
+            show_default=False
+        )
+    ],
+    ticker: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--ticker", "-t",
+            help="Restrict to these tickers. Repeatable.",
+            show_default=False
+        )
+    ] = None,
+    item: Annotated[
+        Optional[List[str]],
+        typer.Option(
+            "--item", "-i",
+            help=f"Restrict to these Items, e.g. '1A' or 'risk' ({', '.join(FILING_SECTIONS)}). Repeatable.",
+            show_default=False
+        )
+    ] = None,
+    since: Annotated[
+        Optional[str],
+        typer.Option(
+            "--since",
+            help="Only filings filed on or after this date (YYYY-MM-DD).",
+            show_default=False
+        )
+    ] = None,
+    added: Annotated[
+        bool,
+        typer.Option(
+            "--added",
+            help="Only sections that match where the company's previous cached filing did not: language new "
+                 "that year."
+        )
+    ] = False,
+    limit: Annotated[
+        int,
+        typer.Option(
+            "--limit", "-n",
+            help="Maximum number of matches to show (0 for all)."
+        )
+    ] = 50,
+    rebuild: Annotated[
+        bool,
+        typer.Option(
+            "--rebuild",
+            help="Rebuild the search index from scratch instead of adding new filings to it."
+        )
+    ] = False,
+    as_json: Annotated[
+        bool,
+        typer.Option(
+            "--json",
+            help="Print one JSON object per line instead of a table."
+        )
+    ] = False
+):
+    """
+    Full-text search across the sections of every cached filing, without network or Gemini calls.
+
+    Filings processed by analyze, multi-analyze and scan since the last search are indexed first.
+    Example: qscanner search '"going concern"' --since 2024-01-01 --added
+    """
+    client = build_sec_client()
+
+    def ticker_for(cik: str) -> Optional[str]:
+        try:
+            tickers = client.get_tickers_for_cik(cik)
+        except Exception:
+            return None  # Filed under the CIK instead
+        return tickers[0].ticker if tickers else None
+
+    index = SearchIndex()
+    with console.status("[bold green]Updating the search index..."):
+        with profiler.span("search.update") as span:
+            counts = index.update(SectionStore(), ticker_for, rebuild=rebuild)
+            span.add(**counts)
+    if counts["added"] or counts["removed"]:
+        console.print(f"[dim]Indexed {counts['added']:,} new filings, dropped {counts['removed']:,}.[/dim]")
+    try:
+        with profiler.span("search.query"):
+            hits = index.search(query, tickers=ticker or (), items=item or (), since=since, added=added,
+                                limit=limit or None)
+    except SearchError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1)
+
+    if as_json:
+        for hit in hits:
+            print(json.dumps(hit._asdict()))
+        return
+    if not hits:
+        stats = index.stats()
+        console.print(f"[yellow]No sections match across {stats['filings']:,} cached filings "
+                      f"of {stats['companies']:,} companies.[/yellow]")
+        return
+
+    table = Table(title=f"{len(hits)} matching sections")
+    for column in ("Ticker", "Filed", "Item", "Excerpt"):
+        table.add_column(column)
+    for hit in hits:
+        excerpt = Text(hit.snippet.replace("\n", " "))
+        excerpt.highlight_regex(r"\[[^\]]*\]", "bold yellow")
+        table.add_row(hit.ticker, hit.filing_date, hit.item, excerpt)
+    console.print(table)
 
 if __name__ == "__main__":
     app()
@@ -0,0 +1,182 @@
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import closing
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .profiling import profiler
+from .sec_client import SECClient
+from .section_store import SectionStore
+from .sections import FILING_SECTIONS, ProcessedFiling, process_filing, process_filing_stream
+from .transport import TransportError
+
+
+def extract_filing_sections(html_content: str) -> Dict:
+    """
+    Cleans a filing's HTML and extracts every section in FILING_SECTIONS.
+    'unbounded' lists the sections whose end boundary was not found (and were cut at a fixed length).
+    """
+    return process_filing(html_content).sections()
+
+
+def fetch_and_process(client: SECClient, url: str, sections: Optional[Sequence[str]] = None) -> ProcessedFiling:
+    """
+    Downloads and processes one filing. With sections (FILING_SECTIONS keys), the document is
+    streamed and the download stops once they are complete; if any of them is missing from
+    what was read, the whole document is fetched and processed instead.
+    """
+    if sections is None:
+        return process_filing(client.fetch_filing_content(url))
+    with closing(client.stream_filing_content(url)) as chunks:
+        processed = process_filing_stream(chunks, sections)
+    if processed.covers(sections):
+        return processed
+    profiler.count("sec.stream_fallbacks")
+    return process_filing(client.fetch_filing_content(url))
+
+
+class _InlineExecutor(Executor):
+    """Runs submitted work immediately; used when parse_workers is 0."""
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class FilingPipeline:
+    """
+    Overlaps filing downloads with HTML parsing.
+
+    Downloads run on a thread pool (the shared SECTransport keeps them within
+    the SEC rate limit) and each finished document is handed straight to a
+    process pool for clean_html/extract_section, so network and CPU time
+    overlap instead of adding up.
+
+    With a SectionStore, filings processed on an earlier run are read back from
+    the store and skip both stages.
+
+    When only some sections are needed, each download is instead streamed into
+    the parser on its download thread and stops after the last of them, skipping
+    the financial statements and exhibits that make up most of a 10-K. There is
+    no process pool in that mode, since an incremental parse cannot be handed to
+    another process: parsing shares the GIL with the downloads, so a many-core
+    machine parses less in parallel than it would with whole documents.
+    """
+
+    def __init__(self, client: SECClient, download_workers: int = 4, parse_workers: Optional[int] = None,
+                 store: Optional[SectionStore] = None, sections: Optional[Sequence[str]] = None):
+        """
+        parse_workers: size of the process pool that parses whole documents (sections=None); 0 parses
+        in-process. Defaults to the CPU count, or in-process on single-core machines where a pool only
+        adds overhead. Unused when streaming sections.
+        store: processed-filing store, consulted when run() is given the filings' CIK.
+        sections: the FILING_SECTIONS keys the caller needs (see fetch_and_process); None downloads
+            whole documents and extracts every section.
+        """
+        self.client = client
+        self.store = store
+        self.sections = sections
+        self.download_workers = download_workers
+        if parse_workers is None:
+            cpus = os.cpu_count() or 1
+            parse_workers = cpus if cpus > 1 else 0
+        self.parse_workers = parse_workers
+
+    def run(self, filings_info: List[Dict[str, str]],
+            progress: Optional[Callable[[int, int, int], None]] = None,
+            cik: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Fetches and processes every filing in filings_info ({'date', 'url', 'accession'}).
+        Returns {'date', 'accession', 'business', 'mda', 'risk', ...} dicts (see extract_filing_sections), newest filing first.
+        A filing whose download failed after every retry has empty sections and an 'error' message.
+        progress: called as progress(downloaded, parsed, total) whenever a stage finishes a filing.
+        cik: the filer's CIK; required for the section store to be used.
+        """
+        total = len(filings_info)
+        counts = {"downloaded": 0, "parsed": 0}
+        use_store = self.store is not None and cik is not None
+
+        processed: List[Optional[ProcessedFiling]] = [None] * total
+        pending = []
+        for i, info in enumerate(filings_info):
+            if use_store and info.get('accession'):
+                processed[i] = self.store.get(cik, info['accession'])
+                if processed[i] is not None and not processed[i].covers(self.sections or FILING_SECTIONS):
+                    processed[i] = None  # Stored from a download that stopped before a needed section
+            if processed[i] is None:
+                pending.append(i)
+            else:
+                counts["downloaded"] += 1
+                counts["parsed"] += 1
+
+        def report():
+            if progress:
+                progress(counts["downloaded"], counts["parsed"], total)
+
+        if counts["parsed"]:
+            report()
+        errors: Dict[int, str] = {}
+        if pending:
+            errors = self._process(filings_info, pending, processed, counts, report, cik if use_store else None)
+
+        results = [{"date": info['date'], "accession": info.get('accession'), **filing.sections(),
+                    **({"error": errors[i]} if i in errors else {})}
+                   for i, (info, filing) in enumerate(zip(filings_info, processed))]
+        results.sort(key=lambda r: r['date'], reverse=True)
+        return results
+
+    def _process(self, filings_info, pending, processed, counts, report, cik) -> Dict[int, str]:
+        """
+        Downloads and parses the filings at the `pending` indices into `processed`, storing them when cik is set.
+        Returns the failed downloads' errors by index; one failure does not stop the other filings.
+        """
+        errors: Dict[int, str] = {}
+        def on_parsed(_):
+            counts["parsed"] += 1
+            report()
+
+        parse_futures: Dict[int, Future] = {}
+        download_pool = ThreadPoolExecutor(max_workers=max(1, min(self.download_workers, len(pending))))
+        if self.sections is not None:
+            # Streamed: each download thread parses the document as it arrives.
+            with download_pool:
+                parse_futures = {
+                    i: download_pool.submit(fetch_and_process, self.client, filings_info[i]['url'], self.sections)
+                    for i in pending
+                }
+                for future in as_completed(parse_futures.values()):
+                    counts["downloaded"] += 1
+                    on_parsed(future)
+        else:
+            parse_workers = min(self.parse_workers, len(pending))
+            parse_pool = ProcessPoolExecutor(max_workers=parse_workers) if parse_workers > 0 else _InlineExecutor()
+            with parse_pool, download_pool:
+                downloads = {
+                    download_pool.submit(self.client.fetch_filing_content, filings_info[i]['url']): i
+                    for i in pending
+                }
+                # Each document goes to the parse pool as soon as its download finishes.
+                for download in as_completed(downloads):
+                    i = downloads[download]
+                    counts["downloaded"] += 1
+                    report()
+                    if download.exception() is not None:
+                        parse_futures[i] = download
+                        continue
+                    parse_futures[i] = parse_pool.submit(process_filing, download.result())
+                    parse_futures[i].add_done_callback(on_parsed)
+
+        for i in pending:
+            try:
+                processed[i] = parse_futures[i].result()
+            except TransportError as e:
+                errors[i] = str(e)
+                processed[i] = ProcessedFiling("", {}, [])
+                continue
+            info = filings_info[i]
+            if cik is not None and info.get('accession') and processed[i].text:
+                self.store.put(cik, info['accession'], processed[i], filing_date=info['date'])
+        return errors
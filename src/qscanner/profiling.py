@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+
+class StageSummary(NamedTuple):
+    """Totals for every span of one name."""
+    name: str
+    calls: int
+    seconds: float
+    counters: Dict[str, float]
+
+
+class Span:
+    """
+    One timed stage. Counters (bytes, characters, tokens, cache hits, retries) are
+    attached with add() while it runs; the span is recorded when the block exits.
+    """
+
+    __slots__ = ("profiler", "name", "counters", "start", "duration", "thread")
+
+    def __init__(self, profiler: "Profiler", name: str, counters: Dict[str, float]):
+        self.profiler = profiler
+        self.name = name
+        self.counters = counters
+        self.start = 0.0
+        self.duration = 0.0
+        self.thread = 0
+
+    def add(self, **counters: float) -> None:
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def __enter__(self) -> "Span":
+        self.thread = threading.get_ident()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.duration = time.perf_counter() - self.start
+        self.profiler._record(self)
+
+
+class _NullSpan:
+    """Stands in for Span while profiling is off, so instrumented code pays next to nothing."""
+
+    def add(self, **counters: float) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler:
+    """
+    Process-wide collector of spans and counters, off until enable() is called.
+
+    Spans time the stages of a run (SEC requests and throttling, HTML cleaning,
+    section extraction, prompt assembly, Gemini calls); counters carry the
+    bytes, characters, tokens, cache hits and retries behind them. sample()
+    snapshots the running counter totals, so a batch run's trace shows how they
+    grow ticker by ticker. Spans recorded in parser worker processes are not
+    collected.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._origin = time.perf_counter()
+        self._spans: List[Span] = []
+        self._counters: Dict[str, float] = {}
+        self._events: Dict[str, float] = {}
+        self._samples: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.reset()
+        self.enabled = True
+
+    def reset(self) -> None:
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._spans, self._counters, self._events, self._samples = [], {}, {}, []
+
+    def span(self, name: str, **counters: float):
+        """Context manager timing a stage: `with profiler.span("clean_html", chars_in=n) as span: ...`."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, dict(counters))
+
+    def count(self, name: str, amount: float = 1) -> None:
+        """Adds to a counter that belongs to no particular span."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._events[name] = self._events.get(name, 0) + amount
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def sample(self) -> None:
+        """Records the current counter totals (a point on the trace's counter timeline)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._samples.append((time.perf_counter(), dict(self._counters)))
+
+    def counters(self) -> Dict[str, float]:
+        """Running totals: every span's counters, keyed 'span.counter', plus the free counters."""
+        with self._lock:
+            return dict(self._counters)
+
+    def events(self) -> Dict[str, float]:
+        """The counters added with count() alone."""
+        with self._lock:
+            return dict(self._events)
+
+    def summary(self) -> List[StageSummary]:
+        """Per-stage totals, slowest stage first."""
+        stages: Dict[str, StageSummary] = {}
+        with self._lock:
+            spans = list(self._spans)
+        for span in spans:
+            stage = stages.get(span.name) or StageSummary(span.name, 0, 0.0, {})
+            counters = dict(stage.counters)
+            for key, value in span.counters.items():
+                counters[key] = counters.get(key, 0) + value
+            stages[span.name] = StageSummary(span.name, stage.calls + 1, stage.seconds + span.duration, counters)
+        return sorted(stages.values(), key=lambda s: s.seconds, reverse=True)
+
+    def write_trace(self, path: Path) -> None:
+        """
+        Writes the spans and counter samples in the Chrome trace event format
+        (open in chrome://tracing or Perfetto), with the summary and counter totals alongside.
+        """
+        pid = os.getpid()
+        with self._lock:
+            spans, samples, origin = list(self._spans), list(self._samples), self._origin
+        events = [{"name": span.name, "ph": "X", "pid": pid, "tid": span.thread,
+                   "ts": (span.start - origin) * 1e6, "dur": span.duration * 1e6, "args": span.counters}
+                  for span in spans]
+        events += [{"name": "counters", "ph": "C", "pid": pid, "ts": (at - origin) * 1e6, "args": totals}
+                   for at, totals in samples]
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "summary": [stage._asdict() for stage in self.summary()],
+            "counters": self.counters(),
+        }
+        Path(path).write_text(json.dumps(trace))
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+            for key, value in span.counters.items():
+                name = f"{span.name}.{key}"
+                self._counters[name] = self._counters.get(name, 0) + value
+
+
+profiler = Profiler()
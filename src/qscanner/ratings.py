@@ -0,0 +1,7 @@
+# Rating scales, best first. Their order is used to tell whether a rating improved or worsened.
+# Kept apart from schemas so that the CLI can list them without building the pydantic models.
+QUALITY_RATINGS = ("Excellent", "Strong", "Adequate", "Weak", "Poor")
+RISK_RATINGS = ("Minimal", "Manageable", "Moderate", "High", "Existential")
+SEVERITIES = ("Serious", "Severe", "Existential")
+QUALITY_SCORES = ("Pristine", "High", "Moderate", "Speculative", "Deteriorating")
+RISK_TRENDS = ("Improving", "Stable", "Worsening")
@@ -0,0 +1,83 @@
+import hashlib
+import io
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .transport import SECTransport
+
+INDEX_FILE = "index.json"
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class ReplayTransport:
+    """
+    Serves recorded SEC responses from a directory instead of the network.
+
+    A drop-in for SECTransport (SECClient(transport=...)), used for offline runs,
+    tests and benchmarks. The directory holds one file per response plus an
+    index.json mapping each URL to its file, status and headers; URLs that were
+    never recorded answer 404.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.requests = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        index_path = self.directory / INDEX_FILE
+        self._index: Dict[str, Dict] = json.loads(index_path.read_text()) if index_path.exists() else {}
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        entry = self._index.get(url)
+        body = (self.directory / entry["file"]).read_bytes() if entry else b""
+        with self._lock:
+            self.requests += 1
+            self.bytes_served += len(body)
+        if entry is None:
+            return make_response(url, 404, b"", {}, stream)
+        return make_response(url, entry["status"], body, entry.get("headers", {}), stream)
+
+    def add(self, url: str, body: bytes, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        """Records a response and updates index.json."""
+        suffix = Path(urlparse(url).path).suffix or ".bin"
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + suffix
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / name).write_bytes(body)
+        kept = {key: value for key, value in (headers or {}).items() if key in KEPT_HEADERS}
+        with self._lock:
+            self._index[url] = {"file": name, "status": status, "headers": kept}
+            (self.directory / INDEX_FILE).write_text(json.dumps(self._index, indent=1, sort_keys=True))
+
+
+class RecordingTransport:
+    """Passes requests through to a live SECTransport and records every 200 response into a ReplayTransport directory."""
+
+    def __init__(self, transport: SECTransport, directory: Path):
+        self.transport = transport
+        self.replay = ReplayTransport(directory)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        response = self.transport.get(url, headers=headers)
+        if response.status_code == 200:
+            self.replay.add(url, response.content, headers=dict(response.headers))
+            return make_response(url, 200, response.content, dict(response.headers), stream)
+        return response
+
+
+def make_response(url: str, status: int, body: bytes, headers: Dict[str, str], stream: bool = False) -> requests.Response:
+    """Builds a requests.Response as the HTTP stack would, streaming from memory when stream is set."""
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers) or "utf-8"
+    response.raw = io.BytesIO(body)
+    if not stream:
+        response._content = body
+    return response
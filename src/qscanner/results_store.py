@@ -0,0 +1,134 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Union
+
+from .cache import default_cache_dir
+from .ratings import RISK_RATINGS
+from .schemas import MultiYearVerdict, QualitativeAnalysis
+
+QUALITATIVE = "qualitative"
+MULTI_YEAR = "multi_year"
+
+
+class ScreenRow(NamedTuple):
+    """A ticker's latest ratings from each kind of analysis (None where it has not been run)."""
+    ticker: str
+    filing_date: str
+    moat: Optional[str]
+    reinvestment: Optional[str]
+    management: Optional[str]
+    risk_profile: Optional[str]
+    previous_risk_profile: Optional[str]
+    score: Optional[str]
+    risk_trend: Optional[str]
+
+
+def _risk_rank(column: str) -> str:
+    """SQL expression ranking a risk rating, 0 (Minimal) to 4 (Existential)."""
+    cases = " ".join(f"WHEN '{rating}' THEN {i}" for i, rating in enumerate(RISK_RATINGS))
+    return f"CASE {column} {cases} END"
+
+
+class ResultsStore:
+    """
+    Structured analysis results, one row per ticker, filing date, model and kind of analysis.
+
+    The ratings are stored as indexed columns next to the full JSON result, so screening
+    questions ("Pristine or High names whose risk profile worsened") are a single query.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_cache_dir() / "results.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                ticker TEXT NOT NULL,
+                filing_date TEXT NOT NULL,
+                model_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                cik TEXT,
+                years INTEGER NOT NULL,
+                moat TEXT,
+                reinvestment TEXT,
+                management TEXT,
+                risk_profile TEXT,
+                score TEXT,
+                risk_trend TEXT,
+                created_at REAL NOT NULL,
+                result TEXT NOT NULL,
+                PRIMARY KEY (ticker, filing_date, model_id, kind)
+            );
+            CREATE INDEX IF NOT EXISTS results_score ON results (model_id, kind, score);
+        """)
+        self._db.commit()
+
+    def put(self, ticker: str, filing_dates: Sequence[str], model_id: str,
+            result: Union[QualitativeAnalysis, MultiYearVerdict], cik: Optional[str] = None) -> None:
+        """Stores a result under the latest of the filing dates it covers."""
+        kind = QUALITATIVE if isinstance(result, QualitativeAnalysis) else MULTI_YEAR
+        ratings = result.headline()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticker.upper(), max(filing_dates), model_id, kind, cik, len(filing_dates),
+                 ratings.get("moat"), ratings.get("reinvestment"), ratings.get("management"),
+                 ratings.get("risk_profile"), ratings.get("score"), ratings.get("risk_trend"),
+                 time.time(), result.model_dump_json())
+            )
+            self._db.commit()
+
+    def get(self, ticker: str, model_id: str, kind: str = QUALITATIVE,
+            filing_date: Optional[str] = None) -> Optional[Union[QualitativeAnalysis, MultiYearVerdict]]:
+        """The stored result for a filing date (default: the latest)."""
+        sql = "SELECT result FROM results WHERE ticker = ? AND model_id = ? AND kind = ?"
+        params: list = [ticker.upper(), model_id, kind]
+        if filing_date:
+            sql += " AND filing_date = ?"
+            params.append(filing_date)
+        with self._lock:
+            row = self._db.execute(sql + " ORDER BY filing_date DESC LIMIT 1", params).fetchone()
+        if not row:
+            return None
+        schema = QualitativeAnalysis if kind == QUALITATIVE else MultiYearVerdict
+        return schema.model_validate_json(row[0])
+
+    def screen(self, model_id: str, scores: Sequence[str] = (), moats: Sequence[str] = (),
+               risk_worsened: bool = False, tickers: Sequence[str] = (), limit: Optional[int] = None) -> List[ScreenRow]:
+        """
+        Latest ratings per ticker, filtered. The risk profile counts as worsened when the latest
+        multi-year verdict's risk trend is 'Worsening' or when the latest single-filing risk profile
+        is rated worse than the one before it.
+        """
+        where = []
+        params: list = [model_id]
+        for column, values in (("m.score", scores), ("q.moat", moats), ("t.ticker", [t.upper() for t in tickers])):
+            if values:
+                where.append(f"{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        if risk_worsened:
+            where.append(f"(m.risk_trend = 'Worsening' OR {_risk_rank('q.risk_profile')} > {_risk_rank('q.previous_risk')})")
+        sql = f"""
+            WITH latest AS (
+                SELECT ticker, kind, filing_date, moat, reinvestment, management, risk_profile, score, risk_trend,
+                       LEAD(risk_profile) OVER recent AS previous_risk,
+                       ROW_NUMBER() OVER recent AS recency
+                FROM results WHERE model_id = ?
+                WINDOW recent AS (PARTITION BY ticker, kind ORDER BY filing_date DESC)
+            )
+            SELECT t.ticker, MAX(COALESCE(q.filing_date, ''), COALESCE(m.filing_date, '')),
+                   q.moat, q.reinvestment, q.management, q.risk_profile, q.previous_risk, m.score, m.risk_trend
+            FROM (SELECT DISTINCT ticker FROM latest) t
+            LEFT JOIN latest q ON q.ticker = t.ticker AND q.kind = '{QUALITATIVE}' AND q.recency = 1
+            LEFT JOIN latest m ON m.ticker = t.ticker AND m.kind = '{MULTI_YEAR}' AND m.recency = 1
+            {"WHERE " + " AND ".join(where) if where else ""}
+            ORDER BY t.ticker
+        """
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            return [ScreenRow(*row) for row in self._db.execute(sql, params).fetchall()]
@@ -0,0 +1,277 @@
+import csv
+import json
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+from .analyzer import StockAnalyzer
+from .financials import DEFAULT_TABLE_YEARS, FactTable, bulk_fact_table, financial_summary
+from .pipeline import fetch_and_process
+from .results_store import ResultsStore
+from .sec_client import SECClient
+from .section_store import SectionStore
+from .sections import FILING_SECTIONS, process_filing
+
+RATING_FIELDS = ["moat", "reinvestment", "management", "risk_profile", "score", "risk_trend"]
+RESULT_FIELDS = ["ticker", "cik", "status", "filing_dates", *RATING_FIELDS, "report", "error"]
+
+
+def load_watchlist(path: Path) -> List[str]:
+    """
+    Reads tickers from a watchlist file.
+    Accepts one ticker per line or a CSV whose first column is the ticker; blank lines,
+    '#' comments and a 'ticker'/'symbol' header row are ignored. Order is kept, duplicates dropped.
+    """
+    tickers = []
+    seen = set()
+    for line in Path(path).read_text().splitlines():
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+        ticker = line.split(',', 1)[0].strip().strip('"').upper()
+        if not ticker or ticker in ("TICKER", "SYMBOL") or ticker in seen:
+            continue
+        seen.add(ticker)
+        tickers.append(ticker)
+    return tickers
+
+
+class ResultWriter:
+    """
+    Thread-safe, line-buffered writer that streams results to JSONL or CSV (chosen by file suffix).
+
+    When appending to a resumed scan's output, `retain` names the tickers whose rows
+    stay (the checkpointed ones); rows of tickers that will be retried, i.e. errors,
+    are dropped first so that each ticker ends up with a single row.
+    """
+
+    def __init__(self, path: Path, append: bool = False, retain: Optional[Set[str]] = None):
+        self.path = Path(path)
+        self.is_csv = self.path.suffix.lower() == ".csv"
+        if append and retain is not None and self.path.exists():
+            self._drop_rows(retain)
+        write_header = self.is_csv and not (append and self.path.exists() and self.path.stat().st_size > 0)
+        self._file = open(self.path, "a" if append else "w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._file, fieldnames=RESULT_FIELDS) if self.is_csv else None
+        self._lock = threading.Lock()
+        if write_header:
+            self._csv.writeheader()
+
+    def write(self, result: Dict) -> None:
+        with self._lock:
+            if self._csv:
+                row = {field: result.get(field, "") for field in RESULT_FIELDS}
+                row["filing_dates"] = ";".join(result.get("filing_dates", []))
+                self._csv.writerow(row)
+            else:
+                self._file.write(json.dumps(result) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _drop_rows(self, retain: Set[str]) -> None:
+        """Rewrites the existing output keeping only the rows of tickers in retain."""
+        with open(self.path, newline="", encoding="utf-8") as f:
+            if self.is_csv:
+                rows = list(csv.reader(f))
+                kept = rows[:1] + [row for row in rows[1:] if row and row[0] in retain]
+            else:
+                kept = [line for line in f if line.strip() and json.loads(line).get("ticker") in retain]
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            if self.is_csv:
+                csv.writer(f).writerows(kept)
+            else:
+                f.writelines(kept)
+        os.replace(tmp_path, self.path)
+
+
+class Checkpoint:
+    """Append-only record of finished tickers so an interrupted scan can resume."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def completed(self) -> Set[str]:
+        if not self.path.exists():
+            return set()
+        return {line.strip() for line in self.path.read_text().splitlines() if line.strip()}
+
+    def mark(self, ticker: str) -> None:
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(ticker + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def reset(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class BatchScanner:
+    """
+    Screens many tickers with one shared SECClient and StockAnalyzer.
+
+    SEC work (lookups, downloads, parsing) and Gemini calls run on separate
+    thread pools so each stage has its own concurrency limit; a ticker moves
+    to the Gemini pool as soon as its filings are ready. Filings already in the
+    SectionStore are not downloaded or parsed again.
+    """
+
+    def __init__(self, client: SECClient, analyzer: StockAnalyzer, years: int = 1,
+                 sec_workers: int = 4, llm_workers: int = 2, parse_workers: int = 0,
+                 store: Optional[SectionStore] = None, multi_year_mode: str = "digest",
+                 results: Optional[ResultsStore] = None, financials: bool = False,
+                 sections: Optional[Sequence[str]] = None):
+        """
+        multi_year_mode: 'digest' for the two-stage analysis, 'full' to send every filing's text in one prompt.
+        results: when given, analyses are requested as schema-validated ratings, which are added to
+            each result row and saved in the store.
+        financials: include each company's XBRL ratios in its prompts. With ingested company facts,
+            the ratios of every ticker are computed up front in one table.
+        sections: the FILING_SECTIONS keys needed; filings are then streamed and their download
+            stops after these sections (see pipeline.fetch_and_process).
+        """
+        self.client = client
+        self.store = store
+        self.results = results
+        self.financials = financials
+        self.sections = sections
+        self.multi_year_mode = multi_year_mode
+        self.analyzer = analyzer
+        self.years = years
+        self.sec_workers = sec_workers
+        self.llm_workers = llm_workers
+        self.parse_workers = parse_workers
+
+    def run(self, tickers: Iterable[str], writer: ResultWriter, checkpoint: Checkpoint,
+            on_result: Optional[Callable[[Dict], None]] = None) -> Dict[str, int]:
+        """
+        Scans every ticker not already in the checkpoint. Returns a count of results per status,
+        with 'skipped' counting the tickers of this list that an earlier run already finished.
+        """
+        done = checkpoint.completed()
+        tickers = list(tickers)
+        pending = [t for t in tickers if t not in done]
+        summary: Dict[str, int] = {"skipped": len(tickers) - len(pending)}
+        lock = threading.Lock()
+        facts = self._bulk_facts(pending)
+
+        def finish(result: Dict):
+            writer.write(result)
+            # Errors are not checkpointed so a resumed run retries them.
+            if result["status"] != "error":
+                checkpoint.mark(result["ticker"])
+            with lock:
+                summary[result["status"]] = summary.get(result["status"], 0) + 1
+            if on_result:
+                on_result(result)
+
+        parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers) if self.parse_workers > 0 else None
+        with ThreadPoolExecutor(max_workers=self.sec_workers) as sec_pool, \
+                ThreadPoolExecutor(max_workers=self.llm_workers) as llm_pool:
+            llm_futures: List[Future] = []
+            llm_lock = threading.Lock()
+
+            def analyze(ticker: str, cik: str, filings: List[Dict], reported: Optional[str]):
+                try:
+                    if self.results is not None:
+                        finish({"ticker": ticker, "cik": cik, "status": "ok",
+                                **self._assess(ticker, cik, filings, reported)})
+                        return
+                    if self.years == 1:
+                        f = filings[0]
+                        report = self.analyzer.analyze_qualitative(ticker, f["business"], f["mda"], f["risk"],
+                                                                   financials=reported)
+                    elif self.multi_year_mode == "digest":
+                        report = self.analyzer.analyze_multi_year_incremental(ticker, filings, financials=reported)
+                    else:
+                        report = self.analyzer.analyze_multi_year(ticker, filings, financials=reported)
+                    finish({"ticker": ticker, "cik": cik, "status": "ok",
+                            "filing_dates": [f["date"] for f in filings], "report": report})
+                except Exception as e:
+                    finish({"ticker": ticker, "cik": cik, "status": "error", "error": str(e)})
+
+            def collect(ticker: str):
+                try:
+                    cik = self.client.get_cik(ticker)
+                    if not cik:
+                        finish({"ticker": ticker, "status": "not_found", "error": "Ticker not found"})
+                        return
+                    filings = self._collect_filings(cik, parse_pool)
+                    if not filings:
+                        finish({"ticker": ticker, "cik": cik, "status": "no_filings", "error": "No 10-K filings found"})
+                        return
+                    reported = self._financials(cik, facts)
+                except Exception as e:
+                    finish({"ticker": ticker, "status": "error", "error": str(e)})
+                    return
+                with llm_lock:
+                    llm_futures.append(llm_pool.submit(analyze, ticker, cik, filings, reported))
+
+            for future in [sec_pool.submit(collect, t) for t in pending]:
+                future.result()
+            for future in llm_futures:
+                future.result()
+
+        if parse_pool:
+            parse_pool.shutdown()
+        return summary
+
+    def _assess(self, ticker: str, cik: str, filings: List[Dict], reported: Optional[str] = None) -> Dict:
+        """Structured analysis of the filings, saved to the results store. Returns the result row fields."""
+        dates = [f["date"] for f in filings]
+        if self.years == 1:
+            f = filings[0]
+            analysis = self.analyzer.assess_qualitative(ticker, f["business"], f["mda"], f["risk"], financials=reported)
+            report = analysis.render()
+        else:
+            analysis = self.analyzer.assess_multi_year(ticker, filings, self.multi_year_mode, financials=reported)
+            report = analysis.render(ticker)
+        self.results.put(ticker, dates, self.analyzer.model_id, analysis, cik=cik)
+        return {"filing_dates": dates, **analysis.headline(), "report": report}
+
+    def _bulk_facts(self, tickers: List[str]) -> Optional[FactTable]:
+        """The ratios of every ticker with ingested company facts, computed together; None without a bulk store."""
+        bulk = getattr(self.client, "bulk", None)
+        if not self.financials or not bulk or not bulk.meta("companyfacts"):
+            return None
+        ciks = [cik for cik in map(self.client.get_cik, tickers) if cik]
+        return bulk_fact_table(bulk, ciks)
+
+    def _financials(self, cik: str, facts: Optional[FactTable]) -> Optional[str]:
+        """The prompt table of reported financials, or None when disabled or the company has no XBRL facts."""
+        if not self.financials:
+            return None
+        years = max(self.years, DEFAULT_TABLE_YEARS)
+        reported = facts.summary(cik, years) if facts else None
+        if reported is None:
+            try:
+                reported = financial_summary(self.client, cik, years)
+            except Exception:
+                return None  # The filings alone can still be analyzed.
+        return reported
+
+    def _collect_filings(self, cik: str, parse_pool: Optional[ProcessPoolExecutor]) -> List[Dict]:
+        filings = []
+        for info in self.client.get_10k_urls(cik, limit=self.years):
+            processed = self.store.get(cik, info['accession']) if self.store else None
+            if processed is not None and not processed.covers(self.sections or FILING_SECTIONS):
+                processed = None
+            if processed is None:
+                if self.sections is not None:
+                    processed = fetch_and_process(self.client, info['url'], self.sections)
+                else:
+                    html_content = self.client.fetch_filing_content(info['url'])
+                    if parse_pool:
+                        processed = parse_pool.submit(process_filing, html_content).result()
+                    else:
+                        processed = process_filing(html_content)
+                if self.store and processed.text:
+                    self.store.put(cik, info['accession'], processed, filing_date=info['date'])
+            filings.append({"date": info['date'], "accession": info.get('accession'), **processed.sections()})
+        return filings
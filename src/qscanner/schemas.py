@@ -0,0 +1,92 @@
+from typing import Dict, List, Literal
+
+from pydantic import BaseModel, Field
+
+from .ratings import QUALITY_RATINGS, QUALITY_SCORES, RISK_RATINGS, RISK_TRENDS, SEVERITIES
+
+# Subscripting Literal with a tuple gives the type of its values, so the scales are listed once.
+QualityRating = Literal[QUALITY_RATINGS]
+RiskRating = Literal[RISK_RATINGS]
+Severity = Literal[SEVERITIES]
+QualityScore = Literal[QUALITY_SCORES]
+RiskTrend = Literal[RISK_TRENDS]
+
+
+class QualityAssessment(BaseModel):
+    rating: QualityRating
+    justification: str
+
+
+class RiskAssessment(BaseModel):
+    rating: RiskRating
+    justification: str
+
+
+class ThesisBreakingScenario(BaseModel):
+    trigger: str = Field(description="The triggering condition.")
+    mechanism: str = Field(description="How the business would be damaged.")
+    management_preparedness: str = Field(description="Whether management appears aware of and prepared for it.")
+    severity: Severity
+
+
+class QualitativeAnalysis(BaseModel):
+    """Ratings from the single-filing analysis (analyze_qualitative)."""
+    moat: QualityAssessment = Field(description="Durable Competitive Advantages.")
+    reinvestment: QualityAssessment = Field(description="Reinvestment Opportunities.")
+    management: QualityAssessment = Field(description="Management Capability.")
+    risk_profile: RiskAssessment
+    scenarios: List[ThesisBreakingScenario] = Field(description="Exactly three thesis-breaking scenarios.")
+
+    def headline(self) -> Dict[str, str]:
+        """The ratings alone, as stored in the results table."""
+        return {"moat": self.moat.rating, "reinvestment": self.reinvestment.rating,
+                "management": self.management.rating, "risk_profile": self.risk_profile.rating}
+
+    def render(self) -> str:
+        """The report in the layout of the free-text OUTPUT FORMAT."""
+        parts = []
+        for i, (label, assessment) in enumerate([
+            ("Durable Competitive Advantages", self.moat),
+            ("Reinvestment Opportunities", self.reinvestment),
+            ("Management Capability", self.management),
+            ("Risk Profile", self.risk_profile),
+        ], 1):
+            parts.append(f"{i}. {label}: {assessment.rating}\nJustification: {assessment.justification}")
+        scenarios = [
+            f"Scenario {i}:\nTrigger: {s.trigger}\nMechanism: {s.mechanism}\n"
+            f"Management Preparedness: {s.management_preparedness}\nSeverity: {s.severity}"
+            for i, s in enumerate(self.scenarios, 1)
+        ]
+        parts.append("5. Thesis-Breaking Scenarios:\n" + "\n\n".join(scenarios))
+        return "\n\n".join(parts)
+
+
+class MultiYearVerdict(BaseModel):
+    """Findings and final score from the multi-year analyses."""
+    moat_durability: str
+    strategic_discipline: str
+    risk_escalation: str
+    risk_trend: RiskTrend = Field(description="Direction of the risk profile across the filings.")
+    management_credibility: str
+    capital_allocation: str
+    score: QualityScore
+    rationale: str
+
+    def headline(self) -> Dict[str, str]:
+        return {"score": self.score, "risk_trend": self.risk_trend}
+
+    def render(self, ticker: str) -> str:
+        return "\n\n".join([
+            f"# Multi-Year Forensic Analysis: {ticker}",
+            f"## Moat Durability\n{self.moat_durability}",
+            f"## Strategic Discipline\n{self.strategic_discipline}",
+            f"## Risk Escalation\n{self.risk_escalation}\nTrend: {self.risk_trend}",
+            f"## Management Credibility\n{self.management_credibility}",
+            f"## Capital Allocation Quality\n{self.capital_allocation}",
+            f"## Final Quality Score\nScore: {self.score}\nRationale: {self.rationale}",
+        ])
+
+
+def structured_config(model: type) -> Dict:
+    """Generation config constraining the response to JSON matching the pydantic model."""
+    return {"response_mime_type": "application/json", "response_json_schema": model.model_json_schema()}
@@ -0,0 +1,156 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from .cache import default_cache_dir
+from .section_store import SectionStore
+from .sections import FILING_SECTIONS
+
+SEARCH_FILE = "search.sqlite"
+SNIPPET_TOKENS = 24
+
+
+class SearchHit(NamedTuple):
+    ticker: str
+    cik: str
+    filing_date: str
+    item: str  # e.g. "Item 1A"
+    accession: str
+    snippet: str  # Matched terms wrapped in [ ]
+    score: float  # bm25; lower is more relevant
+
+
+class SearchError(ValueError):
+    """A query FTS5 cannot parse."""
+
+
+def normalize_item(value: str) -> str:
+    """'risk', '1A', 'item 1a' and 'Item 1A' all name Item 1A."""
+    if value.lower() in FILING_SECTIONS:
+        return FILING_SECTIONS[value.lower()]
+    number = value.strip().upper().removeprefix("ITEM").strip()
+    return f"Item {number}"
+
+
+class SearchIndex:
+    """
+    Full-text index (SQLite FTS5) over the sections of every filing in the SectionStore.
+
+    Each extracted section is one document, keyed by ticker, CIK, filing date and
+    Item. Queries use the FTS5 syntax: words, "exact phrases", prefix* terms,
+    AND/OR/NOT and NEAR("customer" "concentration", 10) proximity groups; words
+    are matched through the Porter stemmer, so 'concentrations' finds 'concentration'.
+
+    update() brings the index in line with the store incrementally: only filings
+    stored since the last update are read, filings that left the store are
+    dropped, and a new extractor version rebuilds it.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_cache_dir() / SEARCH_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+                text, ticker UNINDEXED, cik UNINDEXED, filing_date UNINDEXED, item UNINDEXED,
+                accession UNINDEXED, tokenize = 'porter unicode61'
+            );
+            CREATE TABLE IF NOT EXISTS filings (
+                cik TEXT NOT NULL,
+                accession TEXT NOT NULL,
+                ticker TEXT NOT NULL,
+                filing_date TEXT NOT NULL,
+                PRIMARY KEY (cik, accession)
+            );
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        self._db.commit()
+
+    def update(self, store: SectionStore, ticker_for: Callable[[str], Optional[str]] = lambda cik: None,
+               rebuild: bool = False) -> Dict[str, int]:
+        """
+        Indexes the store's filings that are not indexed yet and drops those no longer stored.
+        ticker_for: the ticker to file a CIK's sections under (the CIK itself when it returns None).
+        Returns the number of filings added and removed.
+        """
+        stored = {(cik, accession): date for cik, accession, date in store.keys()}
+        tickers: Dict[str, str] = {}
+        with self._lock, self._db:
+            version = self._db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if rebuild or version is None or version[0] != store.version:
+                self._db.execute("DELETE FROM sections")
+                self._db.execute("DELETE FROM filings")
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (store.version,))
+            indexed = set(self._db.execute("SELECT cik, accession FROM filings").fetchall())
+
+            removed = indexed - stored.keys()
+            for cik, accession in removed:
+                self._db.execute("DELETE FROM sections WHERE cik = ? AND accession = ?", (cik, accession))
+                self._db.execute("DELETE FROM filings WHERE cik = ? AND accession = ?", (cik, accession))
+
+            added = 0
+            for cik, accession in stored.keys() - indexed:
+                filing = store.get(cik, accession)
+                if filing is None:
+                    continue
+                if cik not in tickers:
+                    tickers[cik] = (ticker_for(cik) or cik).upper()
+                date = stored[cik, accession] or ""
+                self._db.executemany(
+                    "INSERT INTO sections VALUES (?, ?, ?, ?, ?, ?)",
+                    [(filing.text[start:end], tickers[cik], cik, date, FILING_SECTIONS[key], accession)
+                     for key, (start, end) in filing.spans.items()]
+                )
+                self._db.execute("INSERT INTO filings VALUES (?, ?, ?, ?)", (cik, accession, tickers[cik], date))
+                added += 1
+        return {"added": added, "removed": len(removed)}
+
+    def search(self, query: str, tickers: Sequence[str] = (), items: Sequence[str] = (),
+               since: Optional[str] = None, added: bool = False, limit: Optional[int] = 50) -> List[SearchHit]:
+        """
+        Sections matching the FTS5 query, most relevant first.
+        items: 'Item 1A', '1A' or 'risk' style names. since: earliest filing date (YYYY-MM-DD).
+        added: keep only sections whose company's previous indexed filing did not match in the same Item,
+            i.e. language that is new in that filing.
+        """
+        where, params = ["sections MATCH ?"], [query]
+        if tickers:
+            where.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+            params.extend(t.upper() for t in tickers)
+        if items:
+            where.append(f"item IN ({', '.join('?' * len(items))})")
+            params.extend(normalize_item(i) for i in items)
+        if since and not added:
+            where.append("filing_date >= ?")
+            params.append(since)
+        sql = (f"SELECT ticker, cik, filing_date, item, accession, "
+               f"snippet(sections, 0, '[', ']', '…', {SNIPPET_TOKENS}), bm25(sections) "
+               f"FROM sections WHERE {' AND '.join(where)} ORDER BY rank")
+        try:
+            with self._lock:
+                hits = [SearchHit(*row) for row in self._db.execute(sql, params)]
+                previous = self._previous_filings() if added else {}
+        except sqlite3.OperationalError as e:
+            raise SearchError(f"Invalid search query {query!r}: {e}") from e
+
+        if added:
+            # Before the date filter, so a match in a filing older than `since` still counts as not new.
+            matched = {(hit.cik, hit.accession, hit.item) for hit in hits}
+            hits = [hit for hit in hits if (hit.cik, hit.accession) in previous
+                    and (hit.cik, previous[hit.cik, hit.accession], hit.item) not in matched
+                    and (not since or hit.filing_date >= since)]
+        return hits[:limit] if limit else hits
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            filings, companies = self._db.execute("SELECT COUNT(*), COUNT(DISTINCT cik) FROM filings").fetchone()
+            sections = self._db.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+        return {"filings": filings, "companies": companies, "sections": sections}
+
+    def _previous_filings(self) -> Dict[tuple, str]:
+        """(CIK, accession) -> accession of the same company's previous indexed filing."""
+        rows = self._db.execute("SELECT cik, accession FROM filings ORDER BY cik, filing_date").fetchall()
+        return {(cik, accession): prev_accession
+                for (prev_cik, prev_accession), (cik, accession) in zip(rows, rows[1:]) if cik == prev_cik}
@@ -1,145 +1,131 @@
 import requests
+from requests.utils import stream_decode_response_unicode
 import json
-import time
-from typing import Dict, Optional
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
 from rich.console import Console
+from .bulk_store import BulkStore
+from .cache import HTTPCache, default_cache_dir
+from .filing_index import FilingIndex
+from .profiling import profiler
+from .transport import SECTransport
+from .ticker_index import INDEX_VERSION, TICKERS_URL, TickerIndex, TickerRecord
 
 console = Console()
 
+COMPANYFACTS_BASE = "https://data.sec.gov/api/xbrl/companyfacts/"
+FILING_CHUNK_BYTES = 64 * 1024
+
 class SECClient:
-    def __init__(self, user_agent: str):
-        self.headers = {'User-Agent': user_agent}
-        self.ticker_map: Dict[str, str] = {}
-        self._last_request_time = 0.0
-        self._min_delay = 0.11  # 10 requests per second limit (0.1s), using 0.11s for safety
-        self._load_ticker_map()
+    def __init__(self, user_agent: str, cache: Optional[HTTPCache] = None, refresh: bool = False,
+                 data_dir: Optional[Path] = None, transport: Optional[SECTransport] = None,
+                 bulk: Optional[BulkStore] = None):
+        """
+        cache: optional on-disk response cache; None disables caching.
+        refresh: revalidate every cached response (and the ticker index) before using it.
+        data_dir: where local indexes live; defaults to the qscanner cache directory.
+        transport: shared rate-limited HTTP transport; one is created if omitted.
+        bulk: ingested bulk archives; submissions of the CIKs they cover are read from it
+            instead of data.sec.gov (unless refresh is set).
+        """
+        self.cache = cache
+        self.refresh = refresh
+        self.transport = transport or SECTransport(user_agent)
+        self.bulk = bulk
+        data_dir = Path(data_dir) if data_dir else default_cache_dir()
+        self.tickers = TickerIndex(data_dir / f"tickers-v{INDEX_VERSION}.sqlite", fetch=self._fetch_ticker_data)
+        self._tickers_refreshed = False
+        self._filing_indexes: Dict[str, FilingIndex] = {}
 
     def _make_request(self, url: str) -> requests.Response:
+        """GET request served from the local cache when possible, otherwise from the SEC."""
+        if self.cache is None:
+            return self._fetch(url)
+
+        entry = self.cache.get(url)
+        if entry and not self.refresh and self.cache.is_fresh(entry):
+            profiler.count("sec.cache_hits")
+            return self.cache.load(entry)
+
+        headers = self.cache.conditional_headers(entry) if entry else {}
+        response = self._fetch(url, headers)
+        if response.status_code == 304 and entry:
+            profiler.count("sec.cache_revalidated")
+            self.cache.mark_revalidated(entry)
+            return self.cache.load(entry)
+        if response.status_code == 200:
+            self.cache.store(url, response)
+        return response
+
+    def _fetch(self, url: str, extra_headers: Optional[Dict[str, str]] = None) -> requests.Response:
         """Throttled GET request to comply with SEC rate limits."""
-        now = time.time()
-        elapsed = now - self._last_request_time
-        if elapsed < self._min_delay:
-            time.sleep(self._min_delay - elapsed)
-        
-        response = requests.get(url, headers=self.headers)
-        self._last_request_time = time.time()
-        
-        if response.status_code == 429:
-            console.print("[yellow]SEC Rate limit hit. Retrying after delay...[/yellow]")
-            time.sleep(10)  # Standard cool-off
-            return self._make_request(url)
-            
+        with profiler.span("sec.request") as span:
+            response = self.transport.get(url, headers=extra_headers)
+            span.add(bytes=len(response.content))
         return response
 
-    def _load_ticker_map(self):
-        """Loads ticker to CIK mapping from SEC."""
-        url = "https://www.sec.gov/files/company_tickers.json"
-        response = self._make_request(url)
+    def _fetch_ticker_data(self) -> Dict:
+        """Downloads the SEC's ticker to CIK mapping used to build the local index."""
+        response = self._make_request(TICKERS_URL)
         if response.status_code == 200:
-            data = response.json()
-            # The JSON format is like {"0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."}, ...}
-            for entry in data.values():
-                ticker = entry['ticker'].upper()
-                # Pad CIK to 10 digits
-                cik = str(entry['cik_str']).zfill(10)
-                self.ticker_map[ticker] = cik
-        else:
-            raise Exception(f"Failed to fetch ticker map: {response.status_code}")
+            return response.json()
+        raise Exception(f"Failed to fetch ticker map: {response.status_code}")
+
+    def _ticker_index(self) -> TickerIndex:
+        if self.refresh and not self._tickers_refreshed:
+            self._tickers_refreshed = True
+            self.tickers.refresh()
+        return self.tickers
 
     def get_cik(self, ticker: str) -> Optional[str]:
-        return self.ticker_map.get(ticker.upper())
+        return self._ticker_index().get_cik(ticker)
+
+    def get_tickers_for_cik(self, cik: str) -> List[TickerRecord]:
+        return self._ticker_index().lookup_cik(cik)
+
+    def search_companies(self, query: str, limit: int = 10) -> List[TickerRecord]:
+        return self._ticker_index().search(query, limit)
+
+    def _fetch_json(self, url: str) -> Optional[dict]:
+        if self.bulk and not self.refresh:
+            data = self.bulk.submissions_for_url(url)
+            if data is not None:
+                profiler.count("sec.bulk_hits")
+                return data
+        response = self._make_request(url)
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def get_filing_index(self, cik: str) -> FilingIndex:
+        """Returns the (lazily populated) submissions index for a CIK, shared across calls."""
+        index = self._filing_indexes.get(cik)
+        if index is None:
+            index = self._filing_indexes.setdefault(cik, FilingIndex(cik, self._fetch_json))
+        return index
+
+    def get_company_facts(self, cik: str) -> Optional[dict]:
+        """The CIK's XBRL companyfacts JSON, from the ingested bulk archive when present. None if unavailable."""
+        if self.bulk and not self.refresh:
+            facts = self.bulk.company_facts(cik)
+            if facts is not None:
+                profiler.count("sec.bulk_hits")
+                return facts
+        return self._fetch_json(f"{COMPANYFACTS_BASE}CIK{cik}.json")
 
     def get_available_10ks(self, cik: str) -> list[str]:
         """Returns a list of filing dates for all available 10-K filings."""
-        submissions_url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-        response = self._make_request(submissions_url)
-        if response.status_code != 200:
-            return []
-
-        data = response.json()
-        filings = data.get('filings', {})
-        recent_filings = filings.get('recent', {})
-        
-        filing_dates = []
-        
-        def extract_from_dict(d):
-            for i, form in enumerate(d.get('form', [])):
-                if form == '10-K':
-                    filing_dates.append(d['filingDate'][i])
-
-        # Extract from recent
-        extract_from_dict(recent_filings)
-        
-        # Extract from older files if they exist
-        older_files = filings.get('files', [])
-        for file_info in older_files:
-            file_name = file_info.get('name')
-            if file_name:
-                file_url = f"https://data.sec.gov/submissions/{file_name}"
-                file_response = self._make_request(file_url)
-                if file_response.status_code == 200:
-                    extract_from_dict(file_response.json())
-        
-        # Sort dates descending
-        filing_dates.sort(reverse=True)
-        return filing_dates
+        return [f.date for f in self.get_filing_index(cik).filings(("10-K",))]
 
     def get_10k_urls(self, cik: str, limit: int = 3) -> list[Dict[str, str]]:
         """Returns a list of URLs and dates for the most recent 10-K filings up to the limit."""
-        submissions_url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-        response = self._make_request(submissions_url)
-        if response.status_code != 200:
-            return []
-
-        data = response.json()
-        filings_data = []
-        
-        def extract_filings(d):
-            for i, form in enumerate(d.get('form', [])):
-                if form == '10-K':
-                    accession_number = d['accessionNumber'][i].replace('-', '')
-                    primary_document = d['primaryDocument'][i]
-                    date = d['filingDate'][i]
-                    url = f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_number}/{primary_document}"
-                    filings_data.append({"date": date, "url": url})
-
-        # Recent filings
-        extract_filings(data.get('filings', {}).get('recent', {}))
-        
-        # Older filings if needed
-        if len(filings_data) < limit:
-            older_files = data.get('filings', {}).get('files', [])
-            for file_info in older_files:
-                if len(filings_data) >= limit: break
-                file_name = file_info.get('name')
-                if file_name:
-                    file_url = f"https://data.sec.gov/submissions/{file_name}"
-                    file_res = self._make_request(file_url)
-                    if file_res.status_code == 200:
-                        extract_filings(file_res.json())
-
-        # Sort by date descending and take the limit
-        filings_data.sort(key=lambda x: x['date'], reverse=True)
-        return filings_data[:limit]
+        filings = self.get_filing_index(cik).filings(("10-K",), limit=limit)
+        return [{"date": f.date, "url": f.url(cik), "accession": f.accession} for f in filings]
 
     def get_latest_10k_url(self, cik: str) -> Optional[str]:
         """Gets the URL for the most recent 10-K filing."""
-        submissions_url = f"https://data.sec.gov/submissions/CIK{cik}.json"
-        response = self._make_request(submissions_url)
-        if response.status_code != 200:
-            return None
-
-        data = response.json()
-        recent_filings = data.get('filings', {}).get('recent', {})
-        
-        # Loop through filings to find the latest '10-K'
-        for i, form in enumerate(recent_filings.get('form', [])):
-            if form == '10-K':
-                accession_number = recent_filings['accessionNumber'][i].replace('-', '')
-                primary_document = recent_filings['primaryDocument'][i]
-                return f"https://www.sec.gov/Archives/edgar/data/{cik}/{accession_number}/{primary_document}"
-        
-        return None
+        latest = self.get_filing_index(cik).latest("10-K")
+        return latest.url(cik) if latest else None
 
     def fetch_filing_content(self, url: str) -> str:
         response = self._make_request(url)
@@ -147,3 +133,41 @@ class SECClient:
             return response.text
         console.print("Filing content empty")
         return ""
+
+    def stream_filing_content(self, url: str) -> Iterator[str]:
+        """
+        The filing document in chunks, for processing that may stop reading part way.
+        A cached document is yielded whole. Otherwise it is streamed from the SEC, and cached
+        only if the reader consumes it to the end. Close the iterator when stopping early to
+        drop the connection.
+        """
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry and not self.refresh and self.cache.is_fresh(entry):
+            profiler.count("sec.cache_hits")
+            yield self.cache.load(entry).text
+            return
+
+        with profiler.span("sec.request", streamed=1):
+            response = self.transport.get(url, stream=True)
+        try:
+            if response.status_code != 200:
+                console.print("Filing content empty")
+                return
+            body: List[bytes] = []
+
+            def read():
+                for chunk in response.iter_content(FILING_CHUNK_BYTES):
+                    if self.cache is not None:
+                        body.append(chunk)
+                    yield chunk
+            yield from stream_decode_response_unicode(read(), response)
+            if self.cache is not None:
+                # Read to the end, so this is the whole document and as good to cache as a plain GET.
+                response._content = b"".join(body)
+                self.cache.store(url, response)
+        finally:
+            try:
+                profiler.count("sec.streamed_bytes", response.raw.tell())  # Bytes off the wire
+            except (AttributeError, OSError):
+                pass
+            response.close()
@@ -0,0 +1,169 @@
+import hashlib
+import re
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from .profiling import profiler
+
+# Sections compared between consecutive filings, keyed as in FILING_SECTIONS.
+DIFFED_SECTIONS = {"risk": "Item 1A", "mda": "Item 7"}
+
+MIN_PARAGRAPH_CHARS = 40  # Shorter lines (page headers, sub-headings) are not diffed
+SHINGLE_WORDS = 3
+NUM_PERMUTATIONS = 64
+BANDS = 32  # LSH bands of NUM_PERMUTATIONS // BANDS rows each; catches pairs down to ~0.3 similarity
+UNCHANGED_SIMILARITY = 0.8  # At or above: the paragraph is carried over as-is
+MATCH_SIMILARITY = 0.3  # Below: the paragraphs are unrelated (one removed, one added)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_PERMUTATIONS = [
+    (int.from_bytes(hashlib.blake2b(b"a%d" % i, digest_size=8).digest(), "big") % _MERSENNE_PRIME | 1,
+     int.from_bytes(hashlib.blake2b(b"b%d" % i, digest_size=8).digest(), "big") % _MERSENNE_PRIME)
+    for i in range(NUM_PERMUTATIONS)
+]
+_WORD = re.compile(r"[a-z0-9$%]+(?:[.,'][a-z0-9]+)*")
+_YEAR = re.compile(r"^(?:19|20)\d\d$")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    """Cleaned section text is one block per line; lines shorter than MIN_PARAGRAPH_CHARS are dropped."""
+    return [line.strip() for line in text.splitlines() if len(line.strip()) >= MIN_PARAGRAPH_CHARS]
+
+
+def shingles(paragraph: str) -> Set[int]:
+    """
+    Hashed word 3-grams of a paragraph. Four-digit years are normalized so that rolling
+    "fiscal 2023" forward to "fiscal 2024" does not count as a rewording.
+    """
+    words = ["#year" if _YEAR.match(w) else w for w in _WORD.findall(paragraph.lower())]
+    if len(words) < SHINGLE_WORDS:
+        words += [""] * (SHINGLE_WORDS - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_WORDS]).encode(), digest_size=8).digest(), "big")
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+
+
+def minhash(shingle_set: Set[int]) -> Tuple[int, ...]:
+    return tuple(min((a * h + b) % _MERSENNE_PRIME for h in shingle_set) for a, b in _PERMUTATIONS)
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class Reworded(NamedTuple):
+    old: str
+    new: str
+    similarity: float
+
+
+class SectionDiff(NamedTuple):
+    """How one section changed between an older and a newer filing."""
+    section: str
+    added: List[str]
+    removed: List[str]
+    reworded: List[Reworded]
+    unchanged: int
+
+    @property
+    def changed(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.reworded)
+
+    def summary(self) -> str:
+        return (f"{DIFFED_SECTIONS.get(self.section, self.section)}: {len(self.added)} added, "
+                f"{len(self.removed)} removed, {len(self.reworded)} materially reworded, "
+                f"{self.unchanged} unchanged paragraphs")
+
+    def changes(self) -> str:
+        """The changed paragraphs, one per line and tagged, added first."""
+        lines = [f"[ADDED] {p}" for p in self.added]
+        lines += [f"[REWORDED] {r.new} (previously: {r.old})" for r in self.reworded]
+        lines += [f"[REMOVED] {p}" for p in self.removed]
+        return "\n".join(lines)
+
+
+def diff_section(old_text: str, new_text: str, section: str = "") -> SectionDiff:
+    """
+    Aligns the paragraphs of two versions of a section and classifies each one.
+
+    Identical paragraphs are paired first. The rest are paired through MinHash
+    LSH candidates, best Jaccard similarity first; pairs at or above
+    UNCHANGED_SIMILARITY count as unchanged, pairs above MATCH_SIMILARITY as
+    materially reworded, and anything left over as added or removed.
+    """
+    old_paragraphs = split_paragraphs(old_text)
+    new_paragraphs = split_paragraphs(new_text)
+
+    old_exact: Dict[str, List[int]] = {}
+    for i, p in enumerate(old_paragraphs):
+        old_exact.setdefault(" ".join(p.lower().split()), []).append(i)
+    unchanged = 0
+    old_left = set(range(len(old_paragraphs)))
+    new_left = []
+    for j, p in enumerate(new_paragraphs):
+        same = old_exact.get(" ".join(p.lower().split()))
+        if same:
+            old_left.discard(same.pop())
+            unchanged += 1
+        else:
+            new_left.append(j)
+
+    old_shingles = {i: shingles(old_paragraphs[i]) for i in old_left}
+    new_shingles = {j: shingles(new_paragraphs[j]) for j in new_left}
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+    rows = NUM_PERMUTATIONS // BANDS
+    for i, shingle_set in old_shingles.items():
+        signature = minhash(shingle_set)
+        for band in range(BANDS):
+            buckets.setdefault((band, signature[band * rows:(band + 1) * rows]), []).append(i)
+
+    candidates = set()
+    for j, shingle_set in new_shingles.items():
+        signature = minhash(shingle_set)
+        for band in range(BANDS):
+            for i in buckets.get((band, signature[band * rows:(band + 1) * rows]), ()):
+                candidates.add((i, j))
+
+    scored = sorted(((jaccard(old_shingles[i], new_shingles[j]), i, j) for i, j in candidates), reverse=True)
+    reworded = []
+    matched_new = set()
+    for similarity, i, j in scored:
+        if similarity < MATCH_SIMILARITY:
+            break
+        if i not in old_left or j in matched_new:
+            continue
+        old_left.discard(i)
+        matched_new.add(j)
+        if similarity >= UNCHANGED_SIMILARITY:
+            unchanged += 1
+        else:
+            reworded.append((j, Reworded(old_paragraphs[i], new_paragraphs[j], round(similarity, 2))))
+
+    return SectionDiff(
+        section=section,
+        added=[new_paragraphs[j] for j in new_left if j not in matched_new],
+        removed=[old_paragraphs[i] for i in sorted(old_left)],
+        reworded=[r for _, r in sorted(reworded)],
+        unchanged=unchanged,
+    )
+
+
+def year_over_year(filings_content: List[Dict]) -> Dict[str, Dict[str, SectionDiff]]:
+    """
+    Diffs DIFFED_SECTIONS between each filing and the one filed before it.
+    Returns {newer filing date: {section key: SectionDiff}}; the oldest filing has no entry.
+    """
+    ordered = sorted(filings_content, key=lambda f: f['date'])
+    diffs = {}
+    with profiler.span("prompt.diff", filings=len(ordered)):
+        for older, newer in zip(ordered, ordered[1:]):
+            diffs[newer['date']] = {
+                key: diff_section(older.get(key, ""), newer.get(key, ""), key) for key in DIFFED_SECTIONS
+            }
+    return diffs
+
+
+def previous_dates(filings_content: List[Dict]) -> Dict[str, Optional[str]]:
+    """Maps each filing date to the date of the filing before it (None for the oldest)."""
+    dates = sorted(f['date'] for f in filings_content)
+    return dict(zip(dates, [None] + dates[:-1]))
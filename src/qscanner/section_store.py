@@ -0,0 +1,94 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .cache import default_cache_dir
+from .sections import ProcessedFiling
+
+# Modules whose code determines the cleaned text and section boundaries.
+EXTRACTOR_MODULES = ("html_text.py", "sections.py")
+
+
+def extractor_version() -> str:
+    """Fingerprint of the extraction code; any edit to it invalidates stored filings."""
+    digest = hashlib.sha256()
+    for name in EXTRACTOR_MODULES:
+        digest.update((Path(__file__).parent / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class SectionStore:
+    """
+    Local store of processed filings keyed by CIK, accession number and extractor version.
+
+    Filings are immutable once published, so their cleaned text and section
+    offsets only need to be computed once per version of the extraction code.
+    Text is stored zlib-compressed. Rows written by other extractor versions are
+    ignored, and kept until prune() so that processes running different versions
+    (e.g. a resident 'qscanner serve' and a newer checkout) can share the file.
+    """
+
+    def __init__(self, path: Optional[Path] = None, version: Optional[str] = None):
+        self.path = Path(path) if path else default_cache_dir() / "sections.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.version = version or extractor_version()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS filings (
+                cik TEXT NOT NULL,
+                accession TEXT NOT NULL,
+                version TEXT NOT NULL,
+                filing_date TEXT,
+                stored_at REAL NOT NULL,
+                text BLOB NOT NULL,
+                spans TEXT NOT NULL,
+                PRIMARY KEY (cik, accession, version)
+            )
+        """)
+        self._db.commit()
+
+    def get(self, cik: str, accession: str) -> Optional[ProcessedFiling]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT text, spans FROM filings WHERE cik = ? AND accession = ? AND version = ?",
+                (cik, accession, self.version)
+            ).fetchone()
+        if row is None:
+            return None
+        spans = json.loads(row[1])
+        return ProcessedFiling(
+            zlib.decompress(row[0]).decode("utf-8"),
+            {key: tuple(span) for key, span in spans["spans"].items()},
+            spans["unbounded"],
+            spans.get("truncated", False),
+        )
+
+    def keys(self) -> List[Tuple[str, str, Optional[str]]]:
+        """(CIK, accession, filing date) of every filing stored by the current extractor version."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT cik, accession, filing_date FROM filings WHERE version = ?", (self.version,)
+            ).fetchall()
+
+    def prune(self) -> int:
+        """Deletes the filings stored by other extractor versions; returns how many were removed."""
+        with self._lock:
+            removed = self._db.execute("DELETE FROM filings WHERE version != ?", (self.version,)).rowcount
+            self._db.commit()
+        return removed
+
+    def put(self, cik: str, accession: str, filing: ProcessedFiling, filing_date: Optional[str] = None) -> None:
+        spans = json.dumps({"spans": filing.spans, "unbounded": filing.unbounded, "truncated": filing.truncated})
+        text = zlib.compress(filing.text.encode("utf-8"))
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO filings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cik, accession, self.version, filing_date, time.time(), text, spans)
+            )
+            self._db.commit()
@@ -0,0 +1,352 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .html_text import AnchorMap, CleanTextStream, html_to_text
+from .profiling import profiler
+
+# 10-K Items in filing order, with the heading title each one must carry.
+# Requiring the title keeps cross-references ("see Item 7") from looking like headings.
+ITEM_TITLES = [
+    ("Item 1", r"Business"),
+    ("Item 1A", r"Risk\s+Factors"),
+    ("Item 1B", r"Unresolved\s+Staff\s+Comments"),
+    ("Item 1C", r"Cybersecurity"),
+    ("Item 2", r"Properties"),
+    ("Item 3", r"Legal\s+Proceedings"),
+    ("Item 4", r"Mine\s+Safety|Submission\s+of\s+Matters|\(?Removed\s+and\s+Reserved|\[?Reserved"),
+    ("Item 5", r"Market\s+for"),
+    ("Item 6", r"\[?Reserved|Selected\s+(?:Consolidated\s+)?Financial\s+Data"),
+    ("Item 7", r"Management"),
+    ("Item 7A", r"Quantitative"),
+    ("Item 8", r"Financial\s+Statements"),
+    ("Item 9", r"Changes\s+in\s+and\s+Disagreements"),
+    ("Item 9A", r"Controls\s+and\s+Procedures"),
+    ("Item 9B", r"Other\s+Information"),
+    ("Item 9C", r"Disclosure\s+Regarding\s+Foreign"),
+    ("Item 10", r"Directors"),
+    ("Item 11", r"Executive\s+Compensation"),
+    ("Item 12", r"Security\s+Ownership"),
+    ("Item 13", r"Certain\s+Relationships"),
+    ("Item 14", r"Principal\s+Account"),
+    ("Item 15", r"Exhibits"),
+]
+ITEM_ORDER = {item: i for i, (item, _) in enumerate(ITEM_TITLES)}
+
+# Sections extracted from every filing, keyed by the names the analyzer uses.
+FILING_SECTIONS = {
+    "business": "Item 1",
+    "risk": "Item 1A",
+    "properties": "Item 2",
+    "legal": "Item 3",
+    "market": "Item 5",
+    "mda": "Item 7",
+    "controls": "Item 9A",
+}
+# The sections the analysis prompts use; all of them end before Item 8's financial statements.
+ANALYZED_SECTIONS = ("business", "risk", "mda")
+
+UNBOUNDED_SECTION_CHARS = 30000  # How much text to keep when a section's end cannot be found
+MIN_SECTION_CHARS = 50  # The next heading must be at least this far past the start
+# When streaming, the last requested section must be at least this long before a later heading
+# may end the download; table-of-contents entries without page numbers are closer together.
+MIN_STREAMED_SECTION_CHARS = 2000
+TOC_LINE_CHARS = 100  # How far past a heading a line without a break is checked for a page number
+
+
+def _group_name(item: str) -> str:
+    return "i" + item.split()[1]
+
+
+def _build_heading_pattern() -> re.Pattern:
+    # Longer numbers first so "Item 1" never shadows "Item 10"-"Item 15" or "Item 1A".
+    branches = sorted(ITEM_TITLES, key=lambda it: (-len(it[0]), it[0]))
+    alternation = "|".join(
+        rf"(?P<{_group_name(item)}>{re.escape(item.split()[1])}[\s.:–—-]+(?:{title}))"
+        for item, title in branches
+    )
+    return re.compile(rf"Item\s+(?:{alternation})", re.IGNORECASE)
+
+
+HEADING_PATTERN = _build_heading_pattern()
+GROUP_ITEMS = {_group_name(item): item for item, _ in ITEM_TITLES}
+PART_I_PATTERN = re.compile(r"PART\s+I\b", re.IGNORECASE)
+
+
+class Heading(NamedTuple):
+    item: str
+    start: int
+    end: int
+    is_toc: bool
+
+
+class SectionSpan(NamedTuple):
+    item: str
+    start: int
+    end: Optional[int]  # None when no following heading was found
+
+    @property
+    def bounded(self) -> bool:
+        return self.end is not None
+
+
+def is_toc_heading(text: str, start: int, end: int) -> bool:
+    """
+    True when the rest of the heading's line looks like a table-of-contents entry
+    (ends with a page number or contains dot leaders). Scans in place without slicing.
+    """
+    line_end = text.find('\n', end)
+    if line_end == -1:
+        line_end = min(len(text), end + TOC_LINE_CHARS)
+    if text.find('....', end, line_end) != -1 or text.find('····', end, line_end) != -1:
+        return True
+    j = line_end - 1
+    while j >= end and text[j].isspace():
+        j -= 1
+    return j >= end and text[j].isdecimal()
+
+
+class SectionIndex:
+    """
+    Locates every 10-K Item heading with a single scan of the cleaned text.
+
+    All Items 1-15 are matched by one compiled alternation, TOC entries are
+    flagged, and each Item's span runs up to the next real heading of a later
+    Item. Sections are then cheap slices of the original text.
+
+    When the filing's hyperlinked table of contents has been resolved to text
+    offsets (see html_text.AnchorMap), those positions are used for the Items
+    they cover and the regex headings only fill in the rest.
+    """
+
+    def __init__(self, text: str, anchors: Optional[Dict[str, int]] = None):
+        """anchors: Item -> offset in text of the element its TOC link points at."""
+        self.text = text
+        self.anchors = self._ordered_anchors(anchors or {})
+        self.headings: List[Heading] = []
+        self._by_item: Dict[str, List[Heading]] = {}
+        for m in HEADING_PATTERN.finditer(text):
+            heading = Heading(GROUP_ITEMS[m.lastgroup], m.start(), m.end(),
+                              is_toc_heading(text, m.start(), m.end()))
+            self.headings.append(heading)
+            self._by_item.setdefault(heading.item, []).append(heading)
+        part_i = PART_I_PATTERN.search(text)
+        self._part_i_start = part_i.start() if part_i else None
+
+    def span(self, item: str, until: Optional[str] = None) -> Optional[SectionSpan]:
+        """
+        Returns where `item` starts and ends, or None if it has no heading.
+        until: end at this Item's heading; by default the section ends at the next heading of any later Item.
+        """
+        order = ITEM_ORDER.get(item, -1)
+        if item in self.anchors:
+            start = self.anchors[item]
+            if until in self.anchors and self.anchors[until] > start:
+                return SectionSpan(item, start, self.anchors[until])
+            # End at the next linked Item, unless a real heading of a later Item comes first
+            # (e.g. an Item the TOC did not link).
+            candidates = [offset for offset in self.anchors.values() if offset > start]
+            heading = self._first_heading_after(start, lambda h: ITEM_ORDER[h.item] > order)
+            if heading is not None:
+                candidates.append(heading)
+            return SectionSpan(item, start, min(candidates) if candidates else None)
+
+        start = self._start_of(item)
+        if start is None:
+            return None
+        end = None
+        if until is not None:
+            end = self._first_heading_after(start, lambda h: h.item == until)
+        if end is None:
+            end = self._first_heading_after(start, lambda h: ITEM_ORDER[h.item] > order)
+        return SectionSpan(item, start, end)
+
+    def spans(self) -> Dict[str, SectionSpan]:
+        """Spans for every Item that has a heading or a TOC anchor in the text."""
+        items = sorted(set(self._by_item) | set(self.anchors), key=ITEM_ORDER.get)
+        return {item: self.span(item) for item in items}
+
+    def section(self, item: str, until: Optional[str] = None,
+                unbounded_chars: int = UNBOUNDED_SECTION_CHARS) -> str:
+        """Section text; when the end boundary is missing only the first unbounded_chars are returned."""
+        span = self.span(item, until)
+        if span is None:
+            return ""
+        end = span.end if span.bounded else span.start + unbounded_chars
+        return self.text[span.start:end]
+
+    def _ordered_anchors(self, anchors: Dict[str, int]) -> Dict[str, int]:
+        """Keeps only anchors that appear in filing order; out-of-order links are left to the regex path."""
+        kept = {}
+        last = -1
+        for item, _ in ITEM_TITLES:
+            offset = anchors.get(item)
+            if offset is not None and last < offset < len(self.text):
+                kept[item] = offset
+                last = offset
+        return kept
+
+    def _start_of(self, item: str) -> Optional[int]:
+        headings = self._by_item.get(item)
+        if not headings:
+            return None
+        actual = [h for h in headings if not h.is_toc]
+        if not actual:
+            # Fallback if filtering was too aggressive
+            return headings[-1].start
+        if item == "Item 1" and self._part_i_start is not None:
+            # For Item 1, prefer the first heading after PART I
+            for h in actual:
+                if h.start > self._part_i_start:
+                    return h.start
+        return actual[-1].start
+
+    def _first_heading_after(self, start: int, accept) -> Optional[int]:
+        minimum = start + MIN_SECTION_CHARS
+        for h in self.headings:
+            if h.start >= minimum and not h.is_toc and accept(h):
+                return h.start
+        return None
+
+
+class SectionWatch:
+    """
+    Follows the cleaned lines of a filing as they stream in and tells when the requested
+    Items are complete: each has a real (non-TOC) heading, in filing order, and the last of
+    them is closed by the heading of a later Item at least MIN_STREAMED_SECTION_CHARS on.
+
+    Each line is scanned together with the previous one, so headings broken across two
+    lines are still found. A long line can also be scanned while it is still arriving
+    (feed_partial); scanning resumes where it left off.
+    """
+
+    # A heading this close to the end of a partial line may still be incomplete.
+    LOOKBACK_CHARS = 200
+
+    def __init__(self, items: Iterable[str]):
+        self.items = sorted(set(items), key=ITEM_ORDER.get)
+        self.last = ITEM_ORDER[self.items[-1]]
+        self.starts: Dict[str, int] = {}  # Latest real heading of each requested Item
+        self._offset = 0  # Start of the current line in the '\n'-joined text
+        self._previous = ""
+        self._resume = 0  # Where scanning of the current line's window resumes
+
+    def feed(self, line: str) -> bool:
+        """Adds the next complete line; True once the requested Items are complete."""
+        done = self._scan(line, final=True)
+        self._previous = line
+        self._offset += len(line) + 1
+        self._resume = 0
+        return done
+
+    def feed_partial(self, line: str) -> bool:
+        """Scans the current line as received so far (a prefix of what feed() will be given)."""
+        return self._scan(line, final=False)
+
+    def _scan(self, line: str, final: bool) -> bool:
+        window = f"{self._previous}\n{line}" if self._previous else line
+        head = len(window) - len(line)  # Where the line starts in the window
+        for m in HEADING_PATTERN.finditer(window, self._resume):
+            if not final and m.end() + TOC_LINE_CHARS > len(window):
+                self._resume = m.start()  # Whether it is a TOC entry depends on text not received yet
+                return False
+            if m.end() < head or is_toc_heading(window, m.start(), m.end()):
+                continue  # Seen with the previous line, or a TOC entry
+            item = GROUP_ITEMS[m.lastgroup]
+            start = self._offset - head + m.start()
+            if item in self.items:
+                self.starts[item] = start
+            elif ITEM_ORDER[item] > self.last and self._complete(start):
+                return True
+        if not final:
+            self._resume = max(self._resume, len(window) - self.LOOKBACK_CHARS)
+        return False
+
+    def _complete(self, end: int) -> bool:
+        starts = [self.starts.get(item) for item in self.items]
+        return (None not in starts and starts == sorted(starts)
+                and end - starts[-1] >= MIN_STREAMED_SECTION_CHARS)
+
+
+class ProcessedFiling(NamedTuple):
+    """A filing's cleaned text plus the (start, end) offsets of each extracted section."""
+    text: str
+    spans: Dict[str, Tuple[int, int]]
+    unbounded: List[str]  # Sections whose end was not found and were cut at UNBOUNDED_SECTION_CHARS
+    truncated: bool = False  # Download stopped after the requested sections; later sections are missing
+
+    def sections(self) -> Dict:
+        """Section texts keyed as in FILING_SECTIONS, plus the 'unbounded' list."""
+        sections: Dict = {key: "" for key in FILING_SECTIONS}
+        for key, (start, end) in self.spans.items():
+            sections[key] = self.text[start:end]
+        sections["unbounded"] = list(self.unbounded)
+        return sections
+
+    def covers(self, sections: Iterable[str]) -> bool:
+        """Whether the sections (FILING_SECTIONS keys) can be taken from this filing."""
+        return not self.truncated or all(key in self.spans and key not in self.unbounded for key in sections)
+
+
+def process_filing(html_content: str) -> ProcessedFiling:
+    """
+    Cleans a filing's HTML and locates every section in FILING_SECTIONS.
+    Sections linked from the filing's table of contents are located through their anchors;
+    the rest come from a single heading scan.
+    """
+    anchors = AnchorMap()
+    with profiler.span("clean_html", chars_in=len(html_content)) as stage:
+        text = html_to_text(html_content, anchors=anchors)
+        stage.add(chars_out=len(text))
+    return _locate_sections(text, anchors)
+
+
+def process_filing_stream(chunks: Iterable[Union[str, bytes]], sections: Iterable[str],
+                          encoding: Optional[str] = None) -> ProcessedFiling:
+    """
+    process_filing for a document arriving in chunks (e.g. a streaming download). Cleaning runs
+    as the chunks arrive and stops reading once the requested sections (FILING_SECTIONS keys)
+    are complete (see SectionWatch), leaving the rest of the document unread; the result is
+    then marked truncated. The caller closes `chunks`.
+    """
+    anchors = AnchorMap()
+    watch = SectionWatch(FILING_SECTIONS[key] for key in sections)
+    stream = CleanTextStream(encoding=encoding, anchors=anchors)
+    lines: List[str] = []
+    read = 0
+    truncated = False
+    with profiler.span("clean_html") as stage:
+        for chunk in chunks:
+            read += len(chunk)
+            for line in stream.feed(chunk):
+                lines.append(line)
+                if watch.feed(line):
+                    truncated = True
+                    break
+            if not truncated and watch.feed_partial(stream.partial()):
+                lines.extend(stream.truncate())
+                truncated = True
+            if truncated:
+                break
+        else:
+            lines.extend(stream.close())
+        text = "\n".join(lines)
+        stage.add(chars_in=read, chars_out=len(text))
+    return _locate_sections(text, anchors, truncated)
+
+
+def _locate_sections(text: str, anchors: AnchorMap, truncated: bool = False) -> ProcessedFiling:
+    with profiler.span("extract_section", chars_in=len(text)) as stage:
+        index = SectionIndex(text, anchors=anchors.item_offsets())
+        spans = {}
+        unbounded = []
+        for key, item in FILING_SECTIONS.items():
+            span = index.span(item)
+            if span is None:
+                continue
+            if span.bounded:
+                spans[key] = (span.start, span.end)
+            else:
+                spans[key] = (span.start, min(len(text), span.start + UNBOUNDED_SECTION_CHARS))
+                unbounded.append(key)
+        stage.add(chars_out=sum(end - start for start, end in spans.values()))
+    return ProcessedFiling(text, spans, unbounded, truncated)
@@ -0,0 +1,213 @@
+import difflib
+import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+INDEX_VERSION = 1
+DEFAULT_MAX_AGE = 7 * 24 * 60 * 60  # company_tickers.json changes slowly; rebuild weekly
+# Past this age the index is rebuilt before use instead of in the background, so a stale
+# index cannot survive indefinitely in processes that exit before the background rebuild lands.
+MAX_STALE_AGE = 30 * 24 * 60 * 60
+# Temp files of a rebuild older than this were left by a process killed mid-build.
+ABANDONED_TMP_AGE = 60 * 60
+
+logger = logging.getLogger(__name__)
+
+TICKERS_URL = "https://www.sec.gov/files/company_tickers.json"
+
+
+class TickerRecord(NamedTuple):
+    ticker: str
+    cik: str
+    title: str
+
+
+def _name_key(name: str) -> str:
+    return re.sub(r'[^a-z0-9 ]+', ' ', name.lower()).strip()
+
+
+class TickerIndex:
+    """
+    Local SQLite index of SEC tickers, CIKs and company names.
+
+    The index file is only opened on the first lookup and is memory-mapped by
+    SQLite, so resolving a ticker costs a single B-tree probe instead of a
+    download of company_tickers.json. A missing or very stale index is built
+    synchronously; a stale one keeps serving lookups while it is rebuilt in the background.
+    """
+
+    def __init__(self, path: Path, fetch: Callable[[], Dict], max_age: float = DEFAULT_MAX_AGE,
+                 max_stale_age: float = MAX_STALE_AGE):
+        """fetch: returns the parsed company_tickers.json payload."""
+        self.path = Path(path)
+        self.fetch = fetch
+        self.max_age = max_age
+        self.max_stale_age = max_stale_age
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._replaced = False
+
+    def get_cik(self, ticker: str) -> Optional[str]:
+        row = self._query("SELECT cik FROM tickers WHERE ticker = ?", (ticker.upper(),))
+        return str(row[0][0]).zfill(10) if row else None
+
+    def lookup_cik(self, cik: str) -> List[TickerRecord]:
+        """Reverse lookup: every ticker registered to a CIK."""
+        rows = self._query("SELECT ticker, cik, title FROM tickers WHERE cik = ? ORDER BY ticker", (int(cik),))
+        return [TickerRecord(t, str(c).zfill(10), title) for t, c, title in rows]
+
+    def all_tickers(self) -> List[str]:
+        return [row[0] for row in self._query("SELECT ticker FROM tickers ORDER BY ticker")]
+
+    def search(self, query: str, limit: int = 10) -> List[TickerRecord]:
+        """Fuzzy company-name search, best matches first."""
+        key = _name_key(query)
+        if not key:
+            return []
+        tokens = key.split()
+        where = " AND ".join("name_key LIKE ?" for _ in tokens)
+        rows = self._query(
+            f"SELECT ticker, cik, title, name_key FROM tickers WHERE {where}",
+            tuple(f"%{token}%" for token in tokens)
+        )
+        if not rows:
+            # No substring hit; fall back to edit-distance matching over every name.
+            rows = self._query("SELECT ticker, cik, title, name_key FROM tickers")
+            close = set(difflib.get_close_matches(key, [r[3] for r in rows], n=limit, cutoff=0.6))
+            rows = [r for r in rows if r[3] in close]
+
+        def score(row):
+            return difflib.SequenceMatcher(None, key, row[3]).ratio() + (row[0] == query.upper())
+
+        rows.sort(key=score, reverse=True)
+        return [TickerRecord(t, str(c).zfill(10), title) for t, c, title, _ in rows[:limit]]
+
+    def is_stale(self, max_age: Optional[float] = None) -> bool:
+        """True once the index is older than max_age (default: the index's max_age)."""
+        built_at = self._built_at()
+        return built_at is None or (time.time() - built_at) > (self.max_age if max_age is None else max_age)
+
+    def refresh(self) -> None:
+        """Rebuilds the index from the SEC and swaps it in atomically."""
+        with self._refresh_lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._remove_abandoned_builds()
+            # A unique name: other processes sharing the cache directory may be rebuilding at the same time.
+            fd, name = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.stem + ".", suffix=".tmp")
+            os.close(fd)
+            tmp_path = Path(name)
+            try:
+                self._build(self.fetch(), tmp_path)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+        with self._lock:
+            self._replaced = True
+
+    def _remove_abandoned_builds(self) -> None:
+        """Deletes temp files of rebuilds killed before their swap; recent ones may still be in progress."""
+        for tmp_path in self.path.parent.glob(self.path.stem + ".*.tmp"):
+            try:
+                if time.time() - tmp_path.stat().st_mtime > ABANDONED_TMP_AGE:
+                    tmp_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _build(data: Dict, tmp_path: Path) -> None:
+        db = sqlite3.connect(str(tmp_path))
+        db.executescript("""
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE tickers (
+                ticker TEXT PRIMARY KEY,
+                cik INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                name_key TEXT NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        # The JSON format is like {"0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."}, ...}
+        db.executemany(
+            "INSERT OR REPLACE INTO tickers VALUES (?, ?, ?, ?)",
+            ((e['ticker'].upper(), int(e['cik_str']), e['title'], _name_key(e['title'])) for e in data.values())
+        )
+        db.execute("CREATE INDEX tickers_cik ON tickers (cik)")
+        db.executemany("INSERT INTO meta VALUES (?, ?)",
+                       [("version", str(INDEX_VERSION)), ("built_at", str(time.time()))])
+        db.commit()
+        db.close()
+
+    def refresh_in_background(self) -> None:
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self._background_refresh, daemon=True)
+        self._refresh_thread.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            # Keep serving the existing index; the next run will try again.
+            logger.warning("Background rebuild of the ticker index %s failed", self.path, exc_info=True)
+
+    def _connection(self) -> sqlite3.Connection:
+        """The open index, reopened after a rebuild. Callers must hold _open_lock."""
+        with self._lock:
+            if self._db is not None and not self._replaced:
+                return self._db
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+        if not self.path.exists() or self._version() != INDEX_VERSION:
+            self.refresh()
+        elif self.is_stale(self.max_stale_age):
+            try:
+                self.refresh()
+            except Exception:
+                logger.warning("Rebuilding the stale ticker index %s failed; using it as is", self.path,
+                               exc_info=True)
+        elif self.is_stale():
+            self.refresh_in_background()
+
+        with self._lock:
+            self._replaced = False
+            self._db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._db.execute("PRAGMA mmap_size = 268435456")
+            return self._db
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        # One lock around open and execute: first use builds the index only once, and a
+        # rebuild swapped in by another thread cannot close the connection mid-query.
+        with self._open_lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    def _meta(self, key: str) -> Optional[str]:
+        if not self.path.exists():
+            return None
+        try:
+            db = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            finally:
+                db.close()
+        except sqlite3.DatabaseError:
+            return None
+        return row[0] if row else None
+
+    def _version(self) -> Optional[int]:
+        value = self._meta("version")
+        return int(value) if value else None
+
+    def _built_at(self) -> Optional[float]:
+        value = self._meta("built_at")
+        return float(value) if value else None
@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from rich.console import Console
+
+from .profiling import profiler
+
+console = Console()
+
+SEC_MAX_RATE = 10.0  # SEC fair-access policy: at most 10 requests per second
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TransportError(Exception):
+    """Raised when a request cannot be completed after all retries."""
+
+
+class CircuitOpenError(TransportError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+
+    Callers reserve tokens up front (the balance may go negative) and then sleep
+    outside the lock until their reservation matures, so concurrent threads are
+    spaced exactly 1/rate apart without drifting.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Blocks until `tokens` are available. Returns the time spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and half-opens after `reset_timeout` seconds."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # Half-open: let the next request through as a probe.
+                self._opened_at = None
+                self._failures = self.failure_threshold - 1
+                return False
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parses a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class SECTransport:
+    """
+    Pooled HTTP transport for SEC endpoints.
+
+    One keep-alive `requests.Session` is shared by every caller, requests are
+    paced by a shared token bucket, and transient failures (429/5xx, timeouts,
+    connection errors) are retried with jittered exponential backoff that honors
+    Retry-After, up to `max_retries` times. A circuit breaker stops hammering
+    the SEC once failures pile up.
+    """
+
+    def __init__(self, user_agent: str, rate: float = SEC_MAX_RATE, timeout: tuple = (5.0, 60.0),
+                 max_retries: int = 5, backoff_base: float = 1.0, backoff_cap: float = 60.0,
+                 pool_size: int = 16, breaker: Optional[CircuitBreaker] = None,
+                 session: Optional[requests.Session] = None):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.bucket = TokenBucket(rate)
+        self.breaker = breaker or CircuitBreaker()
+        self.sleep = time.sleep
+        self.session = session or requests.Session()
+        if session is None:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+        self.session.headers.update({'User-Agent': user_agent, 'Accept-Encoding': 'gzip, deflate'})
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        """
+        Rate-limited GET with bounded retries.
+        Returns the final response (which may still be a 429/5xx once retries are exhausted);
+        raises TransportError if the request never got a response.
+        """
+        for attempt in range(self.max_retries + 1):
+            if self.breaker.is_open:
+                raise CircuitOpenError(f"SEC circuit breaker open; not requesting {url}")
+            with profiler.span("sec.throttle"):
+                self.bucket.acquire()
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise TransportError(f"Request to {url} failed after {attempt + 1} attempts: {e}") from e
+                with profiler.span("sec.backoff", retries=1):
+                    self.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_cap))
+                continue
+
+            if response.status_code not in RETRY_STATUSES:
+                self.breaker.record_success()
+                return response
+
+            self.breaker.record_failure()
+            if attempt == self.max_retries:
+                return response
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+            if delay is None:
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_cap)
+            if response.status_code == 429:
+                console.print(f"[yellow]SEC Rate limit hit. Retrying in {delay:.1f}s...[/yellow]")
+            response.close()
+            with profiler.span("sec.backoff", retries=1):
+                self.sleep(min(delay, self.backoff_cap))
+        return response
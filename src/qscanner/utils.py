@@ -1,8 +1,23 @@
 import re
-from bs4 import BeautifulSoup
+from typing import Optional
+from .html_text import html_to_text
+from .profiling import profiler
+from .sections import SectionIndex
 
-def clean_html(html_content: str) -> str:
-    """Removes script/style and returns clean text with preserved structure."""
+def clean_html(html_content: str, skip_hidden: bool = True) -> str:
+    """
+    Removes script/style and returns clean text with preserved structure.
+    Streams the document through lxml parser events instead of building a tree;
+    skip_hidden also drops inline-XBRL <ix:header> blocks.
+    """
+    with profiler.span("clean_html", chars_in=len(html_content)) as span:
+        text = html_to_text(html_content, skip_hidden=skip_hidden)
+        span.add(chars_out=len(text))
+    return text
+
+def clean_html_soup(html_content: str) -> str:
+    """Reference BeautifulSoup implementation of clean_html(skip_hidden=False), kept for tests and benchmarks."""
+    from bs4 import BeautifulSoup  # Only this reference implementation needs it
     soup = BeautifulSoup(html_content, 'lxml')
     for script_or_style in soup(["script", "style"]):
         script_or_style.decompose()
@@ -21,70 +36,12 @@ def clean_html(html_content: str) -> str:
     lines = [line.strip() for line in text.splitlines()]
     return '\n'.join(line for line in lines if line)
 
-def is_toc_entry(match, text):
-    """Checks if a match is likely a TOC entry (e.g., followed by dots or a page number on the same line)."""
-    # Look at the rest of the line
-    start = match.end()
-    line_end = text.find('\n', start)
-    if line_end == -1: line_end = start + 100
-    line_snippet = text[start : line_end].strip()
-    
-    # If line ends with a digit or contains many dots, it's TOC
-    if re.search(r'\d+$', line_snippet) or '....' in line_snippet or '····' in line_snippet:
-        return True
-    return False
-
-def extract_section(text: str, section_name: str, next_section_name: str) -> str:
+def extract_section(text: str, section_name: str, next_section_name: Optional[str] = None) -> str:
     """
-    Improved section extraction with TOC filtering.
+    Extracts one Item's text, ending at next_section_name (or the next later Item).
+    Prefer building a SectionIndex once when several sections are needed from the same text.
     """
-    if section_name == "Item 1":
-        pattern = r"Item\s+1[.\s]+Business"
-    elif section_name == "Item 7":
-        pattern = r"Item\s+7[.\s]+Management"
-    elif section_name == "Item 1A":
-        pattern = r"Item\s+1A[.\s]+Risk\s+Factors"
-    elif section_name == "Item 7A":
-        pattern = r"Item\s+7A[.\s]+Quantitative"
-    else:
-        pattern = rf"{section_name}"
-
-    matches = list(re.finditer(pattern, text, re.IGNORECASE))
-    if not matches:
-        return ""
-
-    # Filter out TOC entries
-    actual_matches = [m for m in matches if not is_toc_entry(m, text)]
-    
-    if not actual_matches:
-        # Fallback if filtering was too aggressive
-        start_index = matches[-1].start()
-    else:
-        # For Item 1, prefer the one after PART I
-        if section_name == "Item 1":
-            part_i_match = re.search(r"PART\s+I\b", text, re.IGNORECASE)
-            if part_i_match:
-                for m in actual_matches:
-                    if m.start() > part_i_match.start():
-                        return extract_until_next(m.start(), next_section_name, text)
-        
-        start_index = actual_matches[-1].start()
-
-    return extract_until_next(start_index, next_section_name, text)
-
-def extract_until_next(start_index, next_section_name, text):
-    if next_section_name == "Item 1A":
-        next_pattern = r"Item\s+1A[.\s]+Risk\s+Factors"
-    elif next_section_name == "Item 7A":
-        next_pattern = r"Item\s+7A[.\s]+Quantitative"
-    else:
-        next_pattern = rf"{next_section_name}"
-
-    # Search for next section, filtering TOC
-    next_matches = list(re.finditer(next_pattern, text[start_index+50:], re.IGNORECASE))
-    for nm in next_matches:
-        actual_nm_start = start_index + 50 + nm.start()
-        if not is_toc_entry(nm, text[start_index+50:]):
-            return text[start_index : actual_nm_start]
-            
-    return text[start_index : start_index + 30000]
+    with profiler.span("extract_section", chars_in=len(text)) as span:
+        section = SectionIndex(text).section(section_name, until=next_section_name)
+        span.add(chars_out=len(section))
+    return section
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import tracemalloc
+
+from src.qscanner.cache import HTTPCache
+from src.qscanner.sec_client import SECClient
+from src.qscanner.utils import clean_html, clean_html_soup
+
+
+def measure(fn, html):
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = fn(html)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return text, elapsed, peak
+
+
+def load_filings(targets):
+    """Yields (name, html) for local files, or for the latest 10-K of each ticker."""
+    client = None
+    for target in targets:
+        if os.path.exists(target):
+            with open(target, encoding="utf-8", errors="replace") as f:
+                yield target, f.read()
+            continue
+        if client is None:
+            user_agent = os.getenv("SEC_USER_AGENT", "qscanner/1.0 (contact@example.com)")
+            client = SECClient(user_agent, cache=HTTPCache())
+        url = client.get_latest_10k_url(client.get_cik(target))
+        yield target, client.fetch_filing_content(url)
+
+
+def bench_clean_html(targets):
+    print(f"{'filing':<12} {'size':>8} {'soup s':>8} {'stream s':>9} {'speedup':>8} {'soup MB':>8} {'stream MB':>10} same")
+    for name, html in load_filings(targets):
+        soup_text, soup_time, soup_peak = measure(clean_html_soup, html)
+        stream_text, stream_time, stream_peak = measure(lambda h: clean_html(h, skip_hidden=False), html)
+        print(f"{name[-12:]:<12} {len(html) / 1e6:>7.1f}M {soup_time:>8.2f} {stream_time:>9.2f} "
+              f"{soup_time / stream_time:>7.1f}x {soup_peak / 1e6:>8.1f} {stream_peak / 1e6:>10.1f} "
+              f"{soup_text == stream_text}")
+
+
+if __name__ == "__main__":
+    bench_clean_html(sys.argv[1:] or ["AAPL", "MSFT", "JPM"])
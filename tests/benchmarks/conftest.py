@@ -0,0 +1,126 @@
+"""
+Fixtures for the benchmark suite (python -m pytest tests/benchmarks).
+
+Each benchmark reports throughput in MB/s of input and its traced peak memory
+in benchmark extra_info, and compares both against baseline.json. Throughput
+may drop by THROUGHPUT_TOLERANCE and peak memory grow by PEAK_TOLERANCE before
+the test fails. Import benchmarks record the CLI's import time in a fresh
+interpreter (python -X importtime), which may grow by IMPORT_TOLERANCE. Run with
+QSCANNER_BENCH_UPDATE_BASELINE=1 to rewrite the baseline after an intended change;
+point QSCANNER_BENCH_CORPUS at a recorded directory to benchmark real filings
+instead (no baseline check then).
+"""
+import json
+import os
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from src.qscanner.filing_index import ARCHIVES_BASE, SUBMISSIONS_BASE
+from src.qscanner.replay import INDEX_FILE, ReplayTransport
+from src.qscanner.ticker_index import TICKERS_URL
+
+from .corpus import build_corpus
+
+BASELINE = Path(__file__).with_name("baseline.json")
+THROUGHPUT_TOLERANCE = 0.5
+PEAK_TOLERANCE = 0.25
+IMPORT_TOLERANCE = 1.0  # Import times are noisy; catch a heavy dependency creeping back in
+ROUNDS = 3
+
+
+@pytest.fixture(scope="session")
+def corpus_dir(tmp_path_factory) -> Path:
+    recorded = os.getenv("QSCANNER_BENCH_CORPUS")
+    if recorded:
+        return Path(recorded)
+    directory = tmp_path_factory.mktemp("corpus")
+    build_corpus(directory)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def documents(corpus_dir) -> Dict[str, str]:
+    """Every recorded filing document by URL."""
+    replay = ReplayTransport(corpus_dir)
+    urls = json.loads((corpus_dir / INDEX_FILE).read_text())
+    return {url: replay.get(url).text for url in sorted(urls) if url.startswith(ARCHIVES_BASE)}
+
+
+@pytest.fixture(scope="session")
+def tickers(corpus_dir) -> List[str]:
+    """Tickers whose submissions were recorded (a real recording's ticker map lists every SEC filer)."""
+    replay = ReplayTransport(corpus_dir)
+    urls = json.loads((corpus_dir / INDEX_FILE).read_text())
+    return [row["ticker"] for row in replay.get(TICKERS_URL).json().values()
+            if f"{SUBMISSIONS_BASE}CIK{str(row['cik_str']).zfill(10)}.json" in urls]
+
+
+class Baseline:
+    def __init__(self, enforce: bool):
+        self.enforce = enforce
+        self.update = os.getenv("QSCANNER_BENCH_UPDATE_BASELINE") == "1"
+        self.recorded = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+        self.measured: Dict[str, Dict[str, float]] = {}
+
+    def check(self, name: str, mb_per_s: float, peak_mb: float) -> None:
+        self.measured[name] = {"mb_per_s": round(mb_per_s, 2), "peak_mb": round(peak_mb, 2)}
+        expected = self.recorded.get(name)
+        if self.update or not self.enforce or expected is None:
+            return
+        assert mb_per_s >= expected["mb_per_s"] * (1 - THROUGHPUT_TOLERANCE), (
+            f"{name}: {mb_per_s:.2f} MB/s, baseline {expected['mb_per_s']} MB/s")
+        assert peak_mb <= expected["peak_mb"] * (1 + PEAK_TOLERANCE), (
+            f"{name}: peak {peak_mb:.2f} MB, baseline {expected['peak_mb']} MB")
+
+    def check_import(self, name: str, import_ms: float) -> None:
+        self.measured[name] = {"import_ms": round(import_ms, 1)}
+        expected = self.recorded.get(name)
+        if self.update or not self.enforce or expected is None:
+            return
+        assert import_ms <= expected["import_ms"] * (1 + IMPORT_TOLERANCE), (
+            f"{name}: {import_ms:.1f} ms to import, baseline {expected['import_ms']} ms")
+
+    def save(self) -> None:
+        BASELINE.write_text(json.dumps({**self.recorded, **self.measured}, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    tracker = Baseline(enforce=not os.getenv("QSCANNER_BENCH_CORPUS"))
+    yield tracker
+    if tracker.update and tracker.enforce:
+        tracker.save()
+
+
+def traced_peak(fn: Callable[[], object]) -> float:
+    """Peak memory allocated while running fn, in MB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.fixture
+def measure(benchmark, baseline):
+    """
+    measure(name, fn, input_bytes): benchmarks fn, then records its throughput over
+    input_bytes and its peak memory (from one extra traced run) and checks them against the baseline.
+    """
+    def run(name: str, fn: Callable[[], object], input_bytes: int):
+        result = benchmark.pedantic(fn, rounds=ROUNDS, iterations=1, warmup_rounds=1)
+        if benchmark.disabled:
+            return result
+        mb_per_s = input_bytes / 1e6 / benchmark.stats.stats.median
+        peak_mb = traced_peak(fn)
+        benchmark.extra_info.update({"input_mb": round(input_bytes / 1e6, 2),
+                                     "mb_per_s": round(mb_per_s, 2), "peak_mb": round(peak_mb, 2)})
+        baseline.check(name, mb_per_s, peak_mb)
+        return result
+    return run
@@ -0,0 +1,204 @@
+"""
+Synthetic EDGAR corpus for the benchmarks, recorded in ReplayTransport format.
+
+Filings are assembled from the paragraphs of debug_full_text.txt (the cleaned
+text of a real 10-K) in three filer sizes and three HTML layouts seen on
+EDGAR: plain paragraphs with a linked table of contents, inline XBRL with
+styled divs and a hidden ix:header, and legacy <font>/<table> markup. Each
+filer has three annual filings whose paragraphs drift from year to year.
+Generation is deterministic, so timings and peak memory are comparable
+between runs.
+"""
+import json
+import random
+import re
+from pathlib import Path
+from typing import Dict, List, NamedTuple
+
+from src.qscanner.filing_index import ARCHIVES_BASE, SUBMISSIONS_BASE
+from src.qscanner.replay import ReplayTransport
+from src.qscanner.ticker_index import TICKERS_URL
+
+SEED = Path(__file__).resolve().parents[2] / "debug_full_text.txt"
+YEARS = (2022, 2023, 2024)
+
+# Item, heading title and share of the document's narrative text.
+ITEMS = [
+    ("1", "Business", 0.2),
+    ("1A", "Risk Factors", 0.3),
+    ("1B", "Unresolved Staff Comments", 0.01),
+    ("1C", "Cybersecurity", 0.02),
+    ("2", "Properties", 0.01),
+    ("3", "Legal Proceedings", 0.02),
+    ("4", "Mine Safety Disclosures", 0.005),
+    ("5", "Market for Registrant's Common Equity", 0.02),
+    ("7", "Management's Discussion and Analysis of Financial Condition and Results of Operations", 0.25),
+    ("7A", "Quantitative and Qualitative Disclosures About Market Risk", 0.03),
+    ("8", "Financial Statements and Supplementary Data", 0.05),
+    ("9A", "Controls and Procedures", 0.03),
+    ("15", "Exhibit and Financial Statement Schedules", 0.01),
+]
+
+
+class Filer(NamedTuple):
+    ticker: str
+    cik: int
+    title: str
+    layout: str
+    narrative_chars: int  # Text in Items 1-15
+    table_rows: int  # Rows of financial statement tables in Item 8
+
+
+FILERS = [
+    Filer("WIDG", 101, "Widget Holdings Inc.", "classic", 60_000, 200),
+    Filer("GADG", 102, "Gadget Platforms Corp", "inline_xbrl", 250_000, 2_000),
+    Filer("MEGA", 103, "Megacorp Industries", "legacy", 600_000, 8_000),
+]
+
+
+def seed_sentences() -> List[str]:
+    lines = SEED.read_text(encoding="utf-8").splitlines()[6:]  # Past the XBRL header and cover page
+    return [s for line in lines for s in re.split(r"(?<=\.)\s+(?=[A-Z])", line) if len(s) > 40]
+
+
+def entities(text: str) -> str:
+    """Non-ASCII characters as numeric entities, the way EDGAR documents usually carry them."""
+    return "".join(c if ord(c) < 128 else f"&#{ord(c)};" for c in text)
+
+
+def paragraphs(rng: random.Random, sentences: List[str], chars: int) -> List[str]:
+    result, total = [], 0
+    while total < chars:
+        start = rng.randrange(len(sentences))
+        paragraph = " ".join(sentences[start:start + rng.randint(3, 6)])
+        result.append(paragraph)
+        total += len(paragraph)
+    return result
+
+
+def narrative(filer: Filer, sentences: List[str]) -> Dict[str, Dict[int, List[str]]]:
+    """Per item, per year paragraphs: each year drops a tenth of the previous year's and adds new ones."""
+    rng = random.Random(filer.ticker)
+    by_item = {}
+    for item, _, share in ITEMS:
+        current = paragraphs(rng, sentences, int(filer.narrative_chars * share))
+        years = {}
+        for year in YEARS:
+            current = [re.sub(r"\b20\d\d\b", str(year), p) for p in current]
+            years[year] = current
+            keep = [p for p in current if rng.random() > 0.1]
+            current = keep + paragraphs(rng, sentences, sum(map(len, current)) - sum(map(len, keep)))
+        by_item[item] = years
+    return by_item
+
+
+def statement_rows(filer: Filer, year: int) -> List[List[str]]:
+    rng = random.Random(f"{filer.ticker}{year}")
+    labels = ["Net sales", "Cost of sales", "Gross margin", "Research and development", "Operating income",
+              "Goodwill", "Total assets", "Long-term debt", "Stock-based compensation", "Shares outstanding"]
+    return [[f"{labels[i % len(labels)]} ({i // len(labels) + 1})",
+             f"{rng.randint(1, 999_999):,}", f"{rng.randint(1, 999_999):,}"] for i in range(filer.table_rows)]
+
+
+def render(filer: Filer, year: int, text: Dict[str, Dict[int, List[str]]], xbrl_header: str) -> str:
+    return {"classic": _classic, "inline_xbrl": _inline_xbrl, "legacy": _legacy}[filer.layout](
+        filer, year, text, xbrl_header)
+
+
+def _cover(filer: Filer, year: int) -> str:
+    return (f"UNITED STATES SECURITIES AND EXCHANGE COMMISSION Washington, D.C. 20549 FORM 10-K "
+            f"ANNUAL REPORT for the fiscal year ended December 31, {year}. {filer.title}")
+
+
+def _classic(filer, year, text, _):
+    out = [f"<html><head><title>{filer.ticker.lower()}-{year}1231.htm</title>"
+           "<style>p { margin: 0 }</style></head><body>", f"<p>{_cover(filer, year)}</p>",
+           "<p><b>TABLE OF CONTENTS</b></p><table>"]
+    for item, title, _ in ITEMS:
+        out.append(f'<tr><td><a href="#i{item}">Item {item}.</a></td><td><a href="#i{item}">{title}</a></td>'
+                   f"<td>{len(out)}</td></tr>")
+    out.append("</table><p><b>PART I</b></p>")
+    for item, title, _ in ITEMS:
+        out.append(f'<p id="i{item}"><b>Item {item}. {title}</b></p>')
+        out.extend(f"<p>{entities(p)}</p>" for p in text[item][year])
+        if item == "8":
+            out.append("<table>")
+            out.extend(f"<tr><td>{a}</td><td>$</td><td>{b}</td><td>$</td><td>{c}</td></tr>"
+                       for a, b, c in statement_rows(filer, year))
+            out.append("</table>")
+    out.append("</body></html>")
+    return "\n".join(out)
+
+
+def _inline_xbrl(filer, year, text, xbrl_header):
+    span = '<span style="color:#000000;font-family:\'Helvetica\',sans-serif;font-size:9pt;font-weight:{w}">{t}</span>'
+    out = ['<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL"><body>',
+           f'<div style="display:none"><ix:header>{xbrl_header}</ix:header></div>',
+           f'<div>{span.format(w=400, t=_cover(filer, year))}</div>']
+    for item, title, _ in ITEMS:
+        out.append(f'<div style="margin-top:12pt" id="item{item.lower()}">'
+                   f'{span.format(w=700, t=f"Item {item}.&#160;&#160;&#160;&#160;{title}")}</div>')
+        out.extend(f'<div style="text-indent:18pt">{span.format(w=400, t=entities(p))}</div>'
+                   for p in text[item][year])
+        if item == "8":
+            out.append('<table style="border-collapse:collapse;width:100%">')
+            for a, b, c in statement_rows(filer, year):
+                cells = "".join(
+                    f'<td style="padding:0 1pt"><ix:nonFraction name="us-gaap:Revenues" contextRef="c-{i}" '
+                    f'unitRef="usd" decimals="-6" scale="6" format="ixt:num-dot-decimal">{v}</ix:nonFraction></td>'
+                    for i, v in enumerate((b, c)))
+                out.append(f'<tr><td style="padding:0 1pt">{span.format(w=400, t=a)}</td>{cells}</tr>')
+            out.append("</table>")
+    out.append("</body></html>")
+    return "".join(out)
+
+
+def _legacy(filer, year, text, _):
+    out = ["<HTML><BODY>", f"<FONT SIZE=2>{_cover(filer, year)}</FONT><BR>"]
+    for item, title, _ in ITEMS:
+        out.append(f"<TABLE><TR><TD><FONT SIZE=2><B>Item&nbsp;{item}.</B></FONT></TD>"
+                   f"<TD><FONT SIZE=2><B>{title}</B></FONT></TD></TR></TABLE>")
+        out.extend(f"<P><FONT SIZE=2>{entities(p)}</FONT></P>" for p in text[item][year])
+        if item == "8":
+            out.append("<TABLE>")
+            out.extend(f"<TR><TD><FONT SIZE=1>{a}</FONT></TD><TD ALIGN=RIGHT><FONT SIZE=1>{b}</FONT></TD>"
+                       f"<TD ALIGN=RIGHT><FONT SIZE=1>{c}</FONT></TD></TR>" for a, b, c in statement_rows(filer, year))
+            out.append("</TABLE>")
+    out.append("</BODY></HTML>")
+    return "\n".join(out)
+
+
+def build_corpus(directory: Path) -> Dict[str, Dict]:
+    """
+    Writes the corpus into directory (ReplayTransport format).
+    Returns {ticker: {"cik", "layout", "urls": [newest first]}}.
+    """
+    replay = ReplayTransport(directory)
+    sentences = seed_sentences()
+    xbrl_header = entities(SEED.read_text(encoding="utf-8").splitlines()[0])
+    tickers, manifest = {}, {}
+    for n, filer in enumerate(FILERS):
+        cik = str(filer.cik).zfill(10)
+        tickers[str(n)] = {"cik_str": filer.cik, "ticker": filer.ticker, "title": filer.title}
+        text = narrative(filer, sentences)
+        recent = {"form": [], "accessionNumber": [], "filingDate": [], "primaryDocument": []}
+        urls = []
+        for year in sorted(YEARS, reverse=True):
+            accession = f"{cik}-{year % 100 + 1:02d}-{filer.cik:06d}"
+            document = f"{filer.ticker.lower()}-{year}1231.htm"
+            # Interleave 10-Qs, as real submissions do.
+            for form, date in (("10-Q", f"{year + 1}-05-01"), ("10-K", f"{year + 1}-02-15")):
+                recent["form"].append(form)
+                recent["accessionNumber"].append(accession if form == "10-K" else accession + "q")
+                recent["filingDate"].append(date)
+                recent["primaryDocument"].append(document)
+            url = f"{ARCHIVES_BASE}{cik}/{accession.replace('-', '')}/{document}"
+            replay.add(url, render(filer, year, text, xbrl_header).encode("ascii"),
+                       headers={"Content-Type": "text/html"})
+            urls.append(url)
+        submissions = {"cik": cik, "name": filer.title, "tickers": [filer.ticker], "filings": {"recent": recent}}
+        replay.add(f"{SUBMISSIONS_BASE}CIK{cik}.json", json.dumps(submissions).encode(),
+                   headers={"Content-Type": "application/json"})
+        manifest[filer.ticker] = {"cik": cik, "layout": filer.layout, "urls": urls}
+    replay.add(TICKERS_URL, json.dumps(tickers).encode(), headers={"Content-Type": "application/json"})
+    return manifest
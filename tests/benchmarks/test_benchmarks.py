@@ -0,0 +1,112 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from typer.testing import CliRunner
+
+from src.qscanner.analyzer import StockAnalyzer
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor
+from src.qscanner.main import app
+from src.qscanner.sec_client import FILING_CHUNK_BYTES
+from src.qscanner.sections import ANALYZED_SECTIONS, FILING_SECTIONS, process_filing, process_filing_stream
+from src.qscanner.utils import clean_html, extract_section
+
+from .corpus import FILERS
+
+# One case per synthetic filer (size and layout), plus the whole corpus.
+CASES = [filer.ticker for filer in FILERS] + ["all"]
+# Modules whose import time is tracked: what every command pays, and what the analysis commands add.
+IMPORTS = {"cli": "src.qscanner.main", "analysis": "src.qscanner.scanner"}
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def select(documents, case):
+    if case == "all":
+        return list(documents.values())
+    chosen = [html for url, html in documents.items() if f"/{case.lower()}-" in url]
+    if not chosen:
+        pytest.skip(f"No {case} filings in this corpus")
+    return chosen
+
+
+def size(texts) -> int:
+    return sum(len(t.encode("utf-8")) for t in texts)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_clean_html(measure, documents, case):
+    docs = select(documents, case)
+    texts = measure(f"clean_html[{case}]", lambda: [clean_html(html) for html in docs], size(docs))
+    assert all(texts)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_extract_section(measure, documents, case):
+    texts = [clean_html(html) for html in select(documents, case)]
+    sections = measure(f"extract_section[{case}]",
+                       lambda: [extract_section(text, item) for text in texts for item in FILING_SECTIONS.values()],
+                       size(texts))
+    assert all(sections)
+
+
+@pytest.mark.parametrize("case", CASES)
+def test_streamed_filing(measure, documents, case):
+    """Streamed processing that stops after the analyzed sections; throughput is over the whole documents."""
+    docs = select(documents, case)
+
+    def chunks(html):
+        for i in range(0, len(html), FILING_CHUNK_BYTES):
+            yield html[i:i + FILING_CHUNK_BYTES]
+
+    filings = measure(f"streamed_filing[{case}]",
+                      lambda: [process_filing_stream(chunks(html), ANALYZED_SECTIONS) for html in docs], size(docs))
+    assert all(f.covers(ANALYZED_SECTIONS) for f in filings)
+
+
+def test_prompt_assembly(measure, documents):
+    prompts = []
+    backend = FakeBackend(responder=lambda prompt: prompts.append(prompt) or "ok")
+    analyzer = StockAnalyzer(executor=GeminiExecutor(backend, rpm=None, tpm=None))
+    filings = [{"date": url, **process_filing(html).sections()} for url, html in documents.items()]
+    section_text = [f[key] for f in filings for key in ("business", "risk", "mda")]
+    measure("prompt_assembly", lambda: analyzer.analyze_multi_year("ALL", filings), size(section_text))
+    assert prompts
+
+
+def test_multi_analyze_end_to_end(measure, documents, tickers, corpus_dir, tmp_path, monkeypatch):
+    """multi_analyze for every ticker: replayed EDGAR responses, parsing, digests and a fake, instant LLM."""
+    monkeypatch.setenv("QSCANNER_REPLAY_DIR", str(corpus_dir))
+    monkeypatch.setenv("QSCANNER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("QSCANNER_LLM_BACKEND", "fake")
+    monkeypatch.setenv("QSCANNER_FAKE_LLM_LATENCY", "0")
+    monkeypatch.setenv("QSCANNER_GEMINI_RPM", "0")
+    monkeypatch.setenv("QSCANNER_GEMINI_TPM", "0")
+    runner = CliRunner()
+
+    def run_all():
+        return [runner.invoke(app, ["multi-analyze", ticker, "--years", "3", "--workers", "0", "--no-cache"])
+                for ticker in tickers]
+
+    results = measure("multi_analyze", run_all, size(documents.values()))
+    for result in results:
+        assert result.exit_code == 0, result.output
+        assert "Fake analysis" in result.output
+
+
+def import_ms(module: str) -> float:
+    """Cumulative import time of module in a fresh interpreter, from its -X importtime line."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in result.stderr.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise AssertionError(f"{module} not in the import trace")
+
+
+@pytest.mark.parametrize("case", IMPORTS)
+def test_import_time(baseline, case):
+    """Best of several cold imports: the CLI's startup cost, which schedulers pay on every spawn."""
+    import_ms(IMPORTS[case])  # Compiles any stale bytecode first
+    baseline.check_import(f"import[{case}]", min(import_ms(IMPORTS[case]) for _ in range(5)))
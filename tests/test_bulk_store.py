@@ -0,0 +1,79 @@
+import json
+import zipfile
+
+from typer.testing import CliRunner
+
+from src.qscanner.bulk_store import BulkStore
+from src.qscanner.main import app
+from src.qscanner.sec_client import SECClient
+
+
+def submissions(name, forms, dates, files=()):
+    return {
+        "cik": "320193", "name": name,
+        "filings": {
+            "recent": {
+                "form": forms,
+                "accessionNumber": [f"0000320193-{d[2:4]}-00{i}" for i, d in enumerate(dates)],
+                "filingDate": dates,
+                "primaryDocument": [f"doc{i}.htm" for i in range(len(forms))],
+            },
+            "files": list(files),
+        },
+    }
+
+
+def write_fixture_zips(tmp_path):
+    """A submissions.zip with a paged company and a companyfacts.zip, laid out like the SEC's."""
+    subs = tmp_path / "submissions.zip"
+    with zipfile.ZipFile(subs, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("CIK0000320193.json", json.dumps(submissions(
+            "Apple Inc.", ["10-Q", "10-K", "8-K", "10-K"], ["2024-05-03", "2023-11-03", "2023-08-01", "2022-10-28"],
+            files=[{"name": "CIK0000320193-submissions-001.json", "filingTo": "2010-12-31"}])))
+        zf.writestr("CIK0000320193-submissions-001.json", json.dumps({
+            "form": ["10-K", "10-Q"], "accessionNumber": ["0000320193-10-000001", "0000320193-10-000002"],
+            "filingDate": ["2010-10-27", "2010-07-21"], "primaryDocument": ["d10k.htm", "d10q.htm"],
+        }))
+        zf.writestr("CIK0000789019.json", json.dumps(submissions("Microsoft Corp", ["10-K"], ["2024-07-30"])))
+    facts = tmp_path / "companyfacts.zip"
+    with zipfile.ZipFile(facts, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("CIK0000320193.json", json.dumps({"cik": 320193, "facts": {"us-gaap": {}}}))
+    return subs, facts
+
+
+class OfflineTransport:
+    def get(self, url, headers=None, stream=False):
+        raise AssertionError(f"unexpected request to {url}")
+
+
+def test_ingested_submissions_answer_filing_lookups_offline(tmp_path):
+    subs, facts = write_fixture_zips(tmp_path)
+    store = BulkStore(tmp_path / "bulk.sqlite")
+    assert store.ingest_submissions(subs) == {"companies": 2, "filings": 4}
+    assert store.ingest_companyfacts(facts) == {"companies": 1}
+
+    client = SECClient("test agent", data_dir=tmp_path, transport=OfflineTransport(), bulk=store)
+    assert client.get_available_10ks("0000320193") == ["2023-11-03", "2022-10-28", "2010-10-27"]
+    [latest] = client.get_10k_urls("0000789019", limit=1)
+    assert latest["url"].endswith("/0000789019/000032019324000/doc0.htm")
+    assert store.company_facts("0000320193")["facts"] == {"us-gaap": {}}
+    assert store.company_facts("0000789019") is None
+
+
+def test_ingest_replaces_the_previous_index(tmp_path):
+    subs, _ = write_fixture_zips(tmp_path)
+    store = BulkStore(tmp_path / "bulk.sqlite")
+    store.ingest_submissions(subs, forms=None)
+    assert len(store.submissions("0000320193")["filings"]["recent"]["form"]) == 6
+    store.ingest_submissions(subs)
+    assert store.submissions("0000320193")["filings"]["recent"]["form"] == ["10-K", "10-K", "10-K"]
+    assert store.submissions("0000000001") is None
+
+
+def test_ingest_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("QSCANNER_CACHE_DIR", str(tmp_path / "cache"))
+    subs, facts = write_fixture_zips(tmp_path)
+    result = CliRunner().invoke(app, ["ingest", "--submissions", str(subs), "--companyfacts", str(facts)])
+    assert result.exit_code == 0, result.output
+    assert "Indexed 4 filings of 2 companies" in result.output
+    assert BulkStore.existing().meta("companyfacts")["companies"] == 1
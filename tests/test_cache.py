@@ -0,0 +1,85 @@
+import time
+
+import requests
+
+from src.qscanner.cache import HTTPCache
+from src.qscanner.sec_client import SECClient
+
+ARCHIVE_URL = "https://www.sec.gov/Archives/edgar/data/320193/000032019325000079/aapl-20250927.htm"
+SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK0000320193.json"
+
+
+def make_response(body: bytes, status: int = 200, **headers) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers)
+    return response
+
+
+def make_client(cache, responses):
+    """SECClient whose network layer replays `responses` and records request headers."""
+    client = SECClient("test agent", cache=cache, data_dir=cache.root)
+    client.sent = []
+
+    def fake_fetch(url, extra_headers=None):
+        client.sent.append(extra_headers or {})
+        return responses.pop(0)
+
+    client._fetch = fake_fetch
+    return client
+
+
+def test_immutable_documents_are_served_from_disk(tmp_path):
+    cache = HTTPCache(tmp_path, ttl=0)
+    client = make_client(cache, [make_response(b"<html>10-K</html>")])
+
+    assert client._make_request(ARCHIVE_URL).content == b"<html>10-K</html>"
+    cached = client._make_request(ARCHIVE_URL)
+
+    assert cached.content == b"<html>10-K</html>"
+    assert getattr(cached, "from_cache", False)
+    assert len(client.sent) == 1
+
+
+def test_stale_submissions_are_revalidated(tmp_path):
+    cache = HTTPCache(tmp_path, ttl=0)
+    client = make_client(cache, [
+        make_response(b'{"cik": 1}', ETag='"v1"'),
+        make_response(b"", status=304),
+    ])
+
+    client._make_request(SUBMISSIONS_URL)
+    revalidated = client._make_request(SUBMISSIONS_URL)
+
+    assert revalidated.json() == {"cik": 1}
+    assert client.sent[1] == {"If-None-Match": '"v1"'}
+
+
+def test_refresh_revalidates_fresh_entries(tmp_path):
+    cache = HTTPCache(tmp_path, ttl=3600)
+    client = make_client(cache, [
+        make_response(b"old", ETag='"v1"'),
+        make_response(b"new", ETag='"v2"'),
+    ])
+
+    client._make_request(SUBMISSIONS_URL)
+    client.refresh = True
+
+    assert client._make_request(SUBMISSIONS_URL).content == b"new"
+    assert cache.get(SUBMISSIONS_URL).etag == '"v2"'
+
+
+def test_lru_eviction_respects_size_cap(tmp_path):
+    cache = HTTPCache(tmp_path, max_bytes=10 ** 9)
+    for i in range(3):
+        cache.store(f"{ARCHIVE_URL}?{i}", make_response(bytes([i]) * 50_000))
+        time.sleep(0.01)
+    cache.load(cache.get(f"{ARCHIVE_URL}?0"))
+
+    cache.max_bytes = cache.total_bytes() - 1
+    cache.evict()
+
+    assert cache.get(f"{ARCHIVE_URL}?0") is not None
+    assert cache.get(f"{ARCHIVE_URL}?1") is None
+    assert cache.get(f"{ARCHIVE_URL}?2") is not None
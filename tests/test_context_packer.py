@@ -0,0 +1,44 @@
+from src.qscanner.context_packer import GAP_MARKER, ContextPacker, estimate_tokens, split_chunks
+
+
+class EstimatingCounter:
+    def count(self, text):
+        return estimate_tokens(text)
+
+
+BOILERPLATE = ("This Annual Report on Form 10-K contains forward-looking statements that involve risks "
+               "and uncertainties, and actual results could differ materially from those anticipated.")
+FILLER = "We continue to focus on serving our customers and building long term relationships with partners."
+FIGURES = "Revenue increased 12% to $4.2 billion in fiscal 2024, and operating margin rose to 31% from 27%."
+
+
+def test_long_paragraphs_split_on_sentences_and_headings_stay_attached():
+    text = "Competition\n" + " ".join(["Widgets are sold in a competitive market."] * 200)
+
+    chunks = split_chunks(text)
+
+    assert chunks[0].startswith("Competition Widgets are sold")
+    assert all(len(c) <= 4000 for c in chunks)
+    assert all(c.endswith("market.") for c in chunks)
+
+
+def test_dense_paragraphs_are_kept_in_document_order():
+    text = "\n".join([BOILERPLATE, FILLER, FIGURES])
+    budget = estimate_tokens(FIGURES) + estimate_tokens(FILLER)
+
+    packed = ContextPacker(EstimatingCounter(), budget).pack({"mda": text})["mda"]
+
+    assert packed.splitlines() == [GAP_MARKER, FILLER, FIGURES]
+
+
+def test_short_sections_donate_unused_budget_and_repeats_are_dropped():
+    long_text = "\n".join(f"{FILLER} Item {i}." for i in range(100))
+    sections = {"2024": BOILERPLATE + "\n" + FIGURES, "2023": BOILERPLATE + "\n" + long_text}
+    budget = 1000
+
+    packed = ContextPacker(EstimatingCounter(), budget).pack(sections)
+
+    assert packed["2024"] == BOILERPLATE + "\n" + FIGURES
+    assert BOILERPLATE not in packed["2023"]
+    assert sum(estimate_tokens(t) for t in packed.values()) <= budget + 100  # Gap markers aside
+    assert packed["2023"].count("\n") > 20
@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from typer.testing import CliRunner
+
+from src.qscanner.daemon import (Daemon, DaemonServer, DaemonTransport, SharedDownload, SingleFlight,
+                                 connect_daemon, daemon_executor)
+from src.qscanner.filing_index import SUBMISSIONS_BASE
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor, RequestError
+from src.qscanner.main import app
+from src.qscanner.replay import ReplayTransport, make_response
+from src.qscanner.sec_client import FILING_CHUNK_BYTES
+from src.qscanner.ticker_index import TICKERS_URL
+
+DOC_URL = "https://www.sec.gov/Archives/edgar/data/101/000010125000001/widg-20241231.htm"
+SUBMISSIONS_URL = f"{SUBMISSIONS_BASE}CIK0000000101.json"
+DOCUMENT = b"<p>" + b"Widgets. " * (FILING_CHUNK_BYTES // 2) + b"</p>"
+
+
+class SlowTransport(ReplayTransport):
+    """Replays with a delay before answering, so that concurrent requests overlap."""
+
+    def get(self, url, headers=None, stream=False):
+        time.sleep(0.2)
+        return super().get(url, headers, stream)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    replay = SlowTransport(tmp_path / "replay")
+    replay.add(TICKERS_URL, json.dumps({"0": {"cik_str": 101, "ticker": "WIDG", "title": "Widgets"}}).encode())
+    recent = {"form": ["10-K"], "accessionNumber": ["acc-1"], "filingDate": ["2025-02-01"],
+              "primaryDocument": ["widg-20241231.htm"]}
+    replay.add(SUBMISSIONS_URL, json.dumps({"cik": "101", "filings": {"recent": recent}}).encode(),
+               headers={"Content-Type": "application/json"})
+    replay.add(DOC_URL, DOCUMENT, headers={"Content-Type": "text/html; charset=utf-8"})
+    backend = FakeBackend(latency=0.2)
+    server = DaemonServer(tmp_path / "d.sock", Daemon(replay, GeminiExecutor(backend, rpm=None, tpm=None)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, replay, backend
+    server.shutdown()
+    server.server_close()
+
+
+def test_single_flight_shares_one_call_and_its_errors():
+    flight, calls = SingleFlight(), []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.2)
+        return len(calls)
+    with ThreadPoolExecutor(4) as pool:
+        assert list(pool.map(lambda _: flight.do("key", work), range(4))) == [1] * 4
+    assert flight.coalesced == 3
+    assert flight.do("key", work) == 2  # Completed calls are not remembered
+
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: int("x"))
+
+
+def test_shared_download_drops_chunks_every_reader_has_passed():
+    closed = []
+    download = SharedDownload(make_response(DOC_URL, 200, DOCUMENT, {}, stream=True), closed.append)
+    first, second = download.chunks(download.join()), download.chunks(download.join())
+
+    assert next(first) == next(second) == DOCUMENT[:FILING_CHUNK_BYTES]
+    next(first), next(second)
+    assert download.join() == 0  # Its first chunk is gone, so a new reader could not get the whole body
+    next(first), next(first)
+    assert len(download._chunks) == 3  # Only from the chunk the slower reader is on
+    second.close()
+    assert len(download._chunks) == 1
+    assert b"".join(first) == DOCUMENT[4 * FILING_CHUNK_BYTES:] and closed == [download]
+
+
+def test_concurrent_requests_reach_the_sec_once(daemon):
+    server, replay, _ = daemon
+    transport = DaemonTransport(connect_daemon(server.path))
+
+    with ThreadPoolExecutor(3) as pool:
+        responses = list(pool.map(lambda _: transport.get(SUBMISSIONS_URL), range(3)))
+    assert {r.json()["cik"] for r in responses} == {"101"} and replay.requests == 1
+    assert responses[0].headers["Content-Type"] == "application/json"
+    assert transport.get(f"{SUBMISSIONS_BASE}CIK0000000999.json").status_code == 404
+
+    def read(limit):
+        response = transport.get(DOC_URL, stream=True)
+        body = b"".join(chunk for _, chunk in zip(range(limit), response.iter_content(FILING_CHUNK_BYTES)))
+        response.close()
+        return body
+    with ThreadPoolExecutor(2) as pool:
+        partial, whole = pool.map(read, [1, 100])
+    # One download served both readers, and the one that stopped early did not cut off the other.
+    assert whole == DOCUMENT and DOCUMENT.startswith(partial) and replay.requests == 3
+    status = server.daemon.status()
+    assert status["sec_coalesced"] == 3
+
+
+def test_model_calls_run_in_the_daemon(daemon):
+    server, _, backend = daemon
+    executor = daemon_executor(connect_daemon(server.path), max_in_flight=4)
+
+    with ThreadPoolExecutor(3) as pool:
+        texts = list(pool.map(lambda _: executor.generate("model", "Same prompt."), range(3)))
+    assert len(set(texts)) == 1 and backend.calls == 1
+    assert "".join(executor.stream("model", "Another prompt.")) == backend.responder("Another prompt.")
+
+    backend.errors.append(RequestError("Unknown model", 404))
+    with pytest.raises(RequestError, match="Unknown model"):
+        executor.generate("model", "A third prompt.")
+
+
+def test_commands_use_a_running_daemon(daemon, tmp_path, monkeypatch):
+    server, replay, _ = daemon
+    monkeypatch.setenv("QSCANNER_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("QSCANNER_DAEMON_SOCKET", str(server.path))
+    monkeypatch.delenv("QSCANNER_REPLAY_DIR", raising=False)
+
+    result = CliRunner().invoke(app, ["check-filings", "WIDG"])
+    assert result.exit_code == 0, result.output
+    assert "2025-02-01" in result.output and replay.requests == 2
+
+    result = CliRunner().invoke(app, ["serve", "--socket", str(server.path)])
+    assert result.exit_code == 1 and "already listening" in result.output
+
+    monkeypatch.setenv("QSCANNER_DAEMON", "0")
+    assert connect_daemon() is None
@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.qscanner.analyzer import StockAnalyzer
+from src.qscanner.digest_store import DigestStore
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor
+
+
+def respond(prompt):
+    if "Extract a factual digest" in prompt:
+        date = prompt.split("dated ", 1)[1].split(".", 1)[0]
+        return f"digest of {date}"
+    return "verdict"
+
+
+def filing(year):
+    return {"date": f"{year}-02-01", "accession": f"acc-{year}",
+            "business": f"business {year}", "mda": f"mda {year}", "risk": f"risk {year}"}
+
+
+def make_analyzer(store):
+    """Returns the analyzer and the list of prompts its fake backend received."""
+    prompts = []
+    backend = FakeBackend(responder=lambda prompt: prompts.append(prompt) or respond(prompt))
+    return StockAnalyzer(digests=store, executor=GeminiExecutor(backend, rpm=None, tpm=None)), prompts
+
+
+def test_new_year_costs_one_digest_and_one_synthesis(tmp_path):
+    store = DigestStore(tmp_path / "digests.sqlite")
+    history = [filing(year) for year in (2023, 2022, 2021)]
+
+    first, first_prompts = make_analyzer(store)
+    assert first.analyze_multi_year_incremental("WIDG", history) == "verdict"
+    assert len(first_prompts) == 4
+
+    second, prompts = make_analyzer(store)
+    second.analyze_multi_year_incremental("WIDG", [filing(2024)] + history)
+
+    assert len(prompts) == 2
+    synthesis = prompts[-1]
+    assert "4 10-K filings" in synthesis
+    assert all(f"digest of {year}-02-01" in synthesis for year in (2024, 2023, 2022, 2021))
+    assert "business 2023" not in synthesis
+
+
+def test_forced_store_regenerates_digests(tmp_path):
+    make_analyzer(DigestStore(tmp_path / "digests.sqlite"))[0].digest_filing("WIDG", filing(2023))
+
+    forced, prompts = make_analyzer(DigestStore(tmp_path / "digests.sqlite", force=True))
+    forced.digest_filing("WIDG", filing(2023))
+
+    assert len(prompts) == 1
+
+
+def test_concurrent_analyses_share_the_gemini_limit(tmp_path):
+    backend = FakeBackend(latency=0.02, responder=respond)
+    analyzer = StockAnalyzer(digests=DigestStore(tmp_path / "digests.sqlite"), digest_workers=4,
+                             executor=GeminiExecutor(backend, max_in_flight=2, rpm=None, tpm=None))
+    histories = {ticker: [dict(filing(year), accession=f"{ticker}-{year}") for year in range(2021, 2025)]
+                 for ticker in ("WIDG", "GADG")}
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda t: analyzer.analyze_multi_year_incremental(t, histories[t]), histories))
+
+    assert backend.calls == 10
+    assert backend.max_in_flight == 2
@@ -0,0 +1,88 @@
+import pytest
+
+from src.qscanner.filing_index import FilingIndex
+from src.qscanner.transport import TransportError
+
+RECENT = {
+    "filings": {
+        "recent": {
+            "form": ["10-Q", "10-K", "8-K", "10-K/A", "10-K"],
+            "accessionNumber": ["0001-24-000005", "0001-24-000004", "0001-24-000003",
+                                "0001-23-000002", "0001-23-000001"],
+            "filingDate": ["2024-08-01", "2024-02-01", "2023-11-01", "2023-06-01", "2023-02-01"],
+            "primaryDocument": ["q.htm", "k24.htm", "8k.htm", "ka.htm", "k23.htm"],
+        },
+        "files": [
+            {"name": "CIK0000000001-submissions-001.json", "filingFrom": "2016-01-01", "filingTo": "2022-12-31"},
+            {"name": "CIK0000000001-submissions-002.json", "filingFrom": "2005-01-01", "filingTo": "2015-12-31"},
+        ],
+    }
+}
+PAGES = {
+    "CIK0000000001-submissions-001.json": {
+        "form": ["10-K", "10-K"], "accessionNumber": ["0001-22-000001", "0001-16-000001"],
+        "filingDate": ["2022-02-01", "2016-02-01"], "primaryDocument": ["k22.htm", "k16.htm"],
+    },
+    "CIK0000000001-submissions-002.json": {
+        "form": ["10-K"], "accessionNumber": ["0001-10-000001"],
+        "filingDate": ["2010-02-01"], "primaryDocument": ["k10.htm"],
+    },
+}
+
+
+def make_index():
+    fetched = []
+
+    def fetch_json(url):
+        fetched.append(url)
+        name = url.rsplit("/", 1)[-1]
+        return RECENT if name == "CIK0000000001.json" else PAGES.get(name)
+
+    return FilingIndex("0000000001", fetch_json), fetched
+
+
+def test_last_n_only_loads_needed_pages():
+    index, fetched = make_index()
+
+    filings = index.filings(("10-K",), limit=3)
+
+    assert [f.date for f in filings] == ["2024-02-01", "2023-02-01", "2022-02-01"]
+    assert len(fetched) == 2
+    assert filings[0].url("0000000001") == \
+        "https://www.sec.gov/Archives/edgar/data/0000000001/000124000004/k24.htm"
+
+
+def test_since_stops_at_page_boundary_and_queries_reuse_data():
+    index, fetched = make_index()
+
+    dates = [f.date for f in index.filings(("10-K", "10-K/A"), since="2016-01-01")]
+    assert dates == ["2024-02-01", "2023-06-01", "2023-02-01", "2022-02-01", "2016-02-01"]
+    assert len(fetched) == 2
+
+    assert index.latest("8-K").accession == "0001-24-000003"
+    assert len(fetched) == 2
+
+
+def test_full_history_fetches_every_page_once():
+    index, fetched = make_index()
+
+    assert len(index.filings(("10-K",))) == 5
+    assert len(index.filings(("10-K",))) == 5
+    assert len(fetched) == 3
+
+
+def test_failed_fetch_is_retried_by_the_next_query():
+    failures = ["CIK0000000001.json", "CIK0000000001-submissions-001.json"]
+
+    def fetch_json(url):
+        name = url.rsplit("/", 1)[-1]
+        if name in failures:
+            failures.remove(name)
+            raise TransportError(f"GET {url} failed")
+        return RECENT if name == "CIK0000000001.json" else PAGES.get(name)
+    index = FilingIndex("0000000001", fetch_json)
+
+    for _ in range(2):
+        with pytest.raises(TransportError):
+            index.filings(("10-K",))
+    assert len(index.filings(("10-K",))) == 5
@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+
+from src.qscanner.analyzer import FINANCIALS_HEADING, StockAnalyzer
+from src.qscanner.financials import FactTable, financial_summary
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor
+
+
+def fact(end, val, filed, start=None, form="10-K"):
+    entry = {"end": end, "val": val, "filed": filed, "form": form}
+    if start:
+        entry["start"] = start
+    return entry
+
+
+def flow(year, val, filed=None, form="10-K"):
+    return fact(f"{year}-12-31", val, filed or f"{year + 1}-02-15", start=f"{year}-01-01", form=form)
+
+
+def company(**tags):
+    return {"facts": {"us-gaap": {tag: {"units": {"shares" if "Shares" in tag else "USD": facts}}
+                                  for tag, facts in tags.items()}}}
+
+
+WIDGETS = company(
+    # The older tag covers 2021; the preferred tag wins from 2022. The 2023 value was restated in 2024.
+    SalesRevenueNet=[flow(2021, 800.0), flow(2022, 1.0)],
+    Revenues=[flow(2022, 1000.0), flow(2023, 1100.0), flow(2023, 1200.0, filed="2025-02-15"),
+              fact("2023-12-31", 300.0, "2024-02-15", start="2023-10-01"),  # A quarter: not a fiscal year
+              flow(2024, 9999.0, form="10-Q")],
+    NetIncomeLoss=[flow(2022, 100.0), flow(2023, 120.0)],
+    OperatingIncomeLoss=[flow(2023, 200.0)],
+    IncomeLossFromContinuingOperationsBeforeIncomeTaxesExtraordinaryItemsNoncontrollingInterest=[flow(2023, 160.0)],
+    IncomeTaxExpenseBenefit=[flow(2023, 40.0)],
+    StockholdersEquity=[fact("2022-12-31", 500.0, "2023-02-15"), fact("2023-12-31", 600.0, "2024-02-15")],
+    LongTermDebt=[fact("2023-12-31", 300.0, "2024-02-15")],
+    CashAndCashEquivalentsAtCarryingValue=[fact("2023-12-31", 100.0, "2024-02-15")],
+    WeightedAverageNumberOfDilutedSharesOutstanding=[flow(2022, 50.0), flow(2023, 52.0)],
+)
+
+
+def test_fact_table_prefers_restatements_and_annual_periods():
+    table = FactTable.build([("0000000001", WIDGETS)])
+    assert list(table.years) == [2021, 2022, 2023]
+    assert list(table.values["revenue"][0]) == [800.0, 1000.0, 1200.0]
+
+    ratios = table.ratios()
+    assert math.isclose(ratios["revenue_growth"][0, 2], 0.2)
+    assert math.isclose(ratios["net_margin"][0, 2], 0.1)
+    # NOPAT 200 * (1 - 0.25) over invested capital 600 + 300 - 100
+    assert math.isclose(ratios["roic"][0, 2], 150 / 800)
+    assert math.isclose(ratios["debt_to_equity"][0, 2], 0.5)
+    assert math.isclose(ratios["dilution"][0, 2], 0.04)
+    assert np.isnan(ratios["roic"][0, 1])
+
+
+def test_companies_share_one_table_and_summary_rows():
+    other = company(Revenues=[flow(2023, 50.0), flow(2024, 25.0)])
+    table = FactTable.build([("0000000001", WIDGETS), ("0000000002", other), ("0000000003", company())])
+    assert table.values["revenue"].shape == (3, 4)
+    assert math.isclose(table.ratios()["revenue_growth"][1, 3], -0.5)
+    assert np.isnan(table.values["revenue"][0, 3])
+    assert table.summary("0000000003") is None
+    assert table.summary("0000000009") is None
+
+    summary = table.summary("0000000001", years=2)
+    assert summary.splitlines()[0] == "| Fiscal year | 2022 | 2023 |"
+    assert "| Revenue growth | +25.0% | +20.0% |" in summary
+    assert "| Debt / equity | n/a | 0.50x |" in summary
+
+
+class FactsClient:
+    def get_company_facts(self, cik):
+        return WIDGETS if cik == "0000000001" else None
+
+
+def test_reported_financials_are_added_to_the_prompt():
+    prompts = []
+    backend = FakeBackend(responder=lambda prompt: prompts.append(prompt) or "report")
+    analyzer = StockAnalyzer(executor=GeminiExecutor(backend, rpm=None, tpm=None))
+    reported = financial_summary(FactsClient(), "0000000001")
+    assert financial_summary(FactsClient(), "0000000002") is None
+
+    analyzer.analyze_qualitative("WIDG", "Widgets.", "Sales rose.", "Risks.", financials=reported)
+    analyzer.analyze_qualitative("WIDG", "Widgets.", "Sales rose.", "Risks.")
+    assert FINANCIALS_HEADING in prompts[0] and reported in prompts[0]
+    assert FINANCIALS_HEADING not in prompts[1]
@@ -0,0 +1,46 @@
+import pytest
+
+from src.qscanner.html_text import html_to_text, iter_clean_lines
+from src.qscanner.utils import clean_html, clean_html_soup
+
+DOCUMENTS = [
+    "",
+    "<p>a<br>b</p><p>c</p>",
+    "<div>foo<!-- comment -->bar</div>",
+    "<div>\t\t</div>x<div>  \n </div>y<span>\t</span>z",
+    "<pre>  keep\t\tthis  </pre><textarea> \t </textarea>",
+    "<template><p>tpl</p>hidden</template><ruby>kan<rt>ji</rt><rp>(</rp></ruby>",
+    "<script>var a = 1;</script><style>p {}</style><p>after&nbsp;&nbsp;nbsp</p>",
+    "<p>unclosed <b>bold <i>italic</p> tail",
+    "<p>x\r\ny\x0bz\x0c w\x85</p>\n\n<p>two</p>\t<p> three </p>",
+    "<?xml version='1.0' encoding='ASCII'?><!DOCTYPE html><html><head><title>10-K</title></head><body>"
+    "<div style='display:none'><ix:header><ix:hidden>aapl-20250927 false 2025 FY</ix:hidden></ix:header></div>"
+    "<table><tr><td>Item 1.</td><td>Business</td></tr></table><p>Apple designs smartphones.</p></body></html>",
+]
+
+
+@pytest.mark.parametrize("html", DOCUMENTS)
+def test_matches_beautifulsoup_output(html):
+    assert clean_html(html, skip_hidden=False) == clean_html_soup(html)
+
+
+@pytest.mark.parametrize("size", [1, 13, 4096])
+def test_chunked_input_matches_whole_document(size):
+    html = "".join(DOCUMENTS)
+    chunks = [html[i:i + size].encode("utf-8") for i in range(0, len(html), size)]
+    assert html_to_text(chunks, skip_hidden=False) == clean_html_soup(html)
+
+
+def test_hidden_inline_xbrl_header_is_skipped():
+    text = clean_html(DOCUMENTS[-1])
+    assert "aapl-20250927" not in text
+    assert "Apple designs smartphones." in text
+
+
+def test_lines_are_emitted_before_the_document_ends():
+    def chunks():
+        yield "<p>first line</p>"
+        yield "<p>second line"
+        raise AssertionError("read past the first chunk")
+
+    assert next(iter_clean_lines(chunks())) == "first line"
@@ -0,0 +1,134 @@
+import hashlib
+import time
+import zlib
+
+import pytest
+import typer
+
+from src.qscanner import llm_cache, main
+from src.qscanner.analyzer import StockAnalyzer
+from src.qscanner.llm_cache import (
+    FileResponseCache,
+    ResponseCache,
+    ResponseCacheBackend,
+    SQLiteResponseCache,
+    response_key,
+)
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor
+
+
+def make_analyzer(cache):
+    calls = []
+
+    def respond(prompt):
+        calls.append(prompt)
+        return f"report #{len(calls)}"
+
+    executor = GeminiExecutor(FakeBackend(responder=respond), rpm=None, tpm=None)
+    return StockAnalyzer(cache=cache, executor=executor)
+
+
+@pytest.fixture(params=["sqlite", "file"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return lambda **kw: SQLiteResponseCache(tmp_path / "llm.sqlite", **kw)
+    return lambda **kw: FileResponseCache(tmp_path / "llm", **kw)
+
+
+def test_identical_prompt_is_answered_from_cache(backend):
+    cache = ResponseCache(backend())
+    analyzer = make_analyzer(cache)
+
+    first = analyzer.analyze_qualitative("WIDG", "business", "mda", "risk")
+    second = analyzer.analyze_qualitative("WIDG", "business", "mda", "risk")
+    changed = analyzer.analyze_qualitative("WIDG", "business", "mda", "new risk")
+
+    assert first == second == "report #1"
+    assert changed == "report #2"
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_force_refreshes_the_cached_response(backend):
+    make_analyzer(ResponseCache(backend())).analyze_qualitative("WIDG", "b", "m", "r")
+
+    forced = make_analyzer(ResponseCache(backend(), force=True)).analyze_qualitative("WIDG", "b", "m", "r")
+    cache = ResponseCache(backend())
+    again = make_analyzer(cache).analyze_qualitative("WIDG", "b", "m", "r")
+
+    assert forced == again == "report #1"  # Each fake backend numbers its own calls
+    assert cache.hits == 1
+
+
+def test_key_covers_model_and_generation_config():
+    assert response_key("gemini-2.5-flash", "p") != response_key("gemini-2.5-pro", "p")
+    assert response_key("gemini-2.5-flash", "p") != response_key("gemini-2.5-flash", "p", {"temperature": 0})
+    assert response_key("m", "p", {"a": 1, "b": 2}) == response_key("m", "p", {"b": 2, "a": 1})
+
+
+def test_expired_and_oversized_entries_are_evicted(backend):
+    store = backend(ttl=60)
+    store.put("old", "stale")
+    assert store.get("old") == "stale"
+    store.ttl = 0
+    assert store.get("old") is None
+
+    # Incompressible bodies of equal size; the limit holds two of them but not three.
+    bodies = {key: "".join(hashlib.sha256(f"{key}{i}".encode()).hexdigest() for i in range(40)) for key in "abc"}
+    size = len(zlib.compress(bodies["a"].encode()))
+    store = backend(max_bytes=int(size * 2.5))
+    store.put("a", bodies["a"])
+    time.sleep(0.01)
+    store.put("b", bodies["b"])
+    time.sleep(0.01)
+    store.get("a")
+    store.put("c", bodies["c"])
+
+    assert store.get("b") is None  # Least recently used
+    assert store.get("a") == bodies["a"] and store.get("c") == bodies["c"]
+
+
+def test_expired_entries_are_swept_occasionally(backend, monkeypatch):
+    store = backend(ttl=0.2)
+    stored = (lambda: len(list(store.root.glob("*.z")))) if isinstance(store, FileResponseCache) else \
+        (lambda: store._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0])
+    store.put("a", "first")
+    time.sleep(0.3)
+    store.put("b", "second")
+    assert stored() == 2  # Expired, but not swept again so soon
+
+    monkeypatch.setattr(llm_cache, "EXPIRY_SWEEP_INTERVAL", 0)
+    store.put("c", "third")
+    assert stored() == 2 and store.get("a") is None and store.get("c") == "third"
+
+
+def test_backends_must_implement_the_interface():
+    class Incomplete(ResponseCacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_streamed_and_cached_reports_are_identical(backend):
+    cache = ResponseCache(backend())
+    analyzer = make_analyzer(cache)
+    chunks = []
+
+    streamed = analyzer.analyze_qualitative("WIDG", "b", "m", "r", on_chunk=chunks.append)
+    replayed = []
+    cached = analyzer.analyze_qualitative("WIDG", "b", "m", "r", on_chunk=replayed.append)
+
+    assert len(chunks) > 1 and "".join(chunks) == streamed == "report #1"
+    assert replayed == [cached] and cached == streamed
+    assert analyzer.analyze_qualitative("WIDG", "b", "m", "r") == streamed
+
+
+def test_unknown_cache_backend_is_a_clean_cli_error(tmp_path, monkeypatch):
+    monkeypatch.setenv("QSCANNER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("QSCANNER_DAEMON", "0")
+    monkeypatch.setenv("QSCANNER_LLM_CACHE", "redis")
+    monkeypatch.setattr(main, "build_executor", lambda *args: GeminiExecutor(FakeBackend(), rpm=None, tpm=None))
+
+    with pytest.raises(typer.Exit):
+        main.build_analyzer("key")
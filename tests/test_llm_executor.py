@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+from google.genai import errors
+
+from src.qscanner.llm_executor import (
+    FakeBackend,
+    GeminiExecutor,
+    GenAIBackend,
+    RateLimitError,
+    RequestError,
+    ServiceUnavailableError,
+    error_for_status,
+)
+
+
+def unlimited(backend, **kwargs):
+    executor = GeminiExecutor(backend, rpm=None, tpm=None, **kwargs)
+    executor.sleeps = []
+    executor.sleep = executor.sleeps.append
+    return executor
+
+
+def test_rate_limits_and_outages_are_retried_with_backoff():
+    backend = FakeBackend(errors=[RateLimitError("quota", 429, retry_after=17.0),
+                                  ServiceUnavailableError("overloaded", 503)])
+    executor = unlimited(backend, backoff_base=1.0, backoff_cap=4.0)
+
+    assert executor.generate("m", "prompt").startswith("Fake analysis")
+    assert backend.calls == 3
+    assert executor.sleeps[0] == 17.0  # The server's retry delay outranks a shorter backoff
+    assert 0 <= executor.sleeps[1] <= 2.0
+    assert executor.stats["retries"] == 2 and executor.stats["failures"] == 0
+
+
+def test_retries_give_up_and_bad_requests_fail_fast():
+    executor = unlimited(FakeBackend(errors=[ServiceUnavailableError("down")] * 3), max_retries=2)
+    with pytest.raises(ServiceUnavailableError):
+        executor.generate("m", "prompt")
+    assert len(executor.sleeps) == 2
+
+    backend = FakeBackend(errors=[RequestError("bad model", 404)])
+    executor = unlimited(backend)
+    with pytest.raises(RequestError):
+        executor.generate("m", "prompt")
+    assert backend.calls == 1 and executor.sleeps == []
+
+
+def test_in_flight_requests_are_capped():
+    backend = FakeBackend(latency=0.05)
+    executor = unlimited(backend, max_in_flight=2)
+
+    futures = [executor.submit("m", f"prompt {i}") for i in range(6)]
+    # Callers on their own threads (like the scan's LLM workers) share the same cap.
+    threads = [threading.Thread(target=executor.generate, args=("m", "p")) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(f.result() for f in futures)
+    assert backend.calls == 9 and backend.max_in_flight == 2
+
+
+def test_requests_per_minute_are_paced():
+    executor = GeminiExecutor(FakeBackend(), rpm=1200, tpm=None)  # One request every 50ms
+
+    start = time.monotonic()
+    for _ in range(5):
+        executor.generate("m", "prompt")
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_tokens_per_minute_are_reserved_before_sending():
+    # 600 tokens per minute: a full-budget prompt drains the bucket, the next waits for a refill.
+    executor = GeminiExecutor(FakeBackend(), rpm=None, tpm=600, count_tokens=len, output_reserve=0)
+
+    executor.generate("m", "x" * 600)
+    start = time.monotonic()
+    executor.generate("m", "xx")
+
+    assert time.monotonic() - start >= 0.15
+
+
+def test_errors_map_to_types():
+    assert isinstance(error_for_status(429, "quota"), RateLimitError)
+    assert isinstance(error_for_status(503, "overloaded"), ServiceUnavailableError)
+    assert isinstance(error_for_status(None, "timeout"), ServiceUnavailableError)
+    assert isinstance(error_for_status(400, "bad request"), RequestError)
+
+
+def test_genai_errors_carry_the_retry_delay():
+    class QuotaModels:
+        def generate_content(self, model, contents, config=None):
+            raise errors.ClientError(429, {"error": {"code": 429, "message": "quota", "details": [
+                {"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": "17s"}]}})
+
+    class QuotaClient:
+        models = QuotaModels()
+
+    with pytest.raises(RateLimitError) as raised:
+        GenAIBackend(QuotaClient()).generate("m", "prompt")
+    assert raised.value.status == 429 and raised.value.retry_after == 17.0
+
+
+def test_streams_arrive_in_pieces_and_retry_only_before_the_first():
+    backend = FakeBackend(responder=lambda prompt: "Moat: Strong. Risk: Moderate.",
+                          errors=[ServiceUnavailableError("overloaded", 503)])
+    executor = unlimited(backend)
+
+    chunks = list(executor.stream("m", "prompt"))
+
+    assert len(chunks) > 1 and "".join(chunks) == "Moat: Strong. Risk: Moderate."
+    assert backend.calls == 2 and len(executor.sleeps) == 1
+
+
+def test_stream_failing_midway_is_not_replayed():
+    class DroppedStream(FakeBackend):
+        def stream(self, model, prompt, config=None):
+            yield from list(super().stream(model, prompt, config))[:2]
+            raise ServiceUnavailableError("connection reset")
+
+    backend = DroppedStream()
+    received = []
+    with pytest.raises(ServiceUnavailableError):
+        for chunk in unlimited(backend).stream("m", "prompt"):
+            received.append(chunk)
+
+    assert backend.calls == 1 and len(received) == 2
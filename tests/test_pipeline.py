@@ -0,0 +1,48 @@
+import time
+
+from src.qscanner.pipeline import FilingPipeline
+from src.qscanner.transport import TransportError
+
+FILING_HTML = """
+<html><body>
+<p>PART I</p>
+<p>Item 1. Business</p><p>We sell widgets made in {year}.</p>
+<p>Item 1A. Risk Factors</p><p>Widgets may fall out of fashion.</p>
+<p>Item 1B. Unresolved Staff Comments</p><p>None.</p>
+<p>Item 7. Management's Discussion and Analysis</p><p>Revenue grew in {year}.</p>
+<p>Item 7A. Quantitative and Qualitative Disclosures</p>
+</body></html>
+"""
+
+
+class FakeClient:
+    def fetch_filing_content(self, url):
+        year = url.rsplit("/", 1)[-1]
+        if year == "missing":
+            raise TransportError(f"GET {url} failed after 3 attempts")
+        time.sleep(0.05 if year == "2024" else 0.0)  # Finish out of order
+        return FILING_HTML.format(year=year)
+
+
+def test_pipeline_returns_sections_in_date_order():
+    filings_info = [{"date": f"{year}-02-01", "url": f"https://example/{year}"} for year in (2022, 2024, 2023)]
+    progress = []
+
+    results = FilingPipeline(FakeClient(), parse_workers=2).run(
+        filings_info, progress=lambda *counts: progress.append(counts))
+
+    assert [r["date"] for r in results] == ["2024-02-01", "2023-02-01", "2022-02-01"]
+    assert "widgets made in 2024" in results[0]["business"]
+    assert "fall out of fashion" in results[1]["risk"]
+    assert "Revenue grew in 2022" in results[2]["mda"]
+    assert max(p[0] for p in progress) == 3
+
+
+def test_pipeline_records_failed_downloads_per_filing():
+    filings_info = [{"date": "2024-02-01", "url": "https://example/2024"},
+                    {"date": "2023-02-01", "url": "https://example/missing"}]
+
+    results = FilingPipeline(FakeClient(), parse_workers=0).run(filings_info)
+
+    assert "widgets made in 2024" in results[0]["business"] and "error" not in results[0]
+    assert "failed after 3 attempts" in results[1]["error"] and results[1]["business"] == ""
@@ -0,0 +1,53 @@
+import json
+
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor, RateLimitError
+from src.qscanner.profiling import Profiler, profiler
+from src.qscanner.utils import clean_html
+
+
+def test_spans_and_counters_are_summarized_and_traced(tmp_path):
+    collector = Profiler()
+    with collector.span("clean_html", chars_in=100) as span:
+        span.add(chars_out=40)
+    with collector.span("clean_html", chars_in=50) as span:
+        span.add(chars_out=10)
+    collector.count("sec.cache_hits")
+    assert collector.counters() == {}  # Off until enabled
+
+    collector.enable()
+    for chars_in, chars_out in ((100, 40), (50, 10)):
+        with collector.span("clean_html", chars_in=chars_in) as span:
+            span.add(chars_out=chars_out)
+    collector.count("sec.cache_hits", 2)
+    collector.sample()
+
+    [stage] = collector.summary()
+    assert (stage.name, stage.calls, stage.counters) == ("clean_html", 2, {"chars_in": 150, "chars_out": 50})
+    assert collector.counters() == {"clean_html.chars_in": 150, "clean_html.chars_out": 50, "sec.cache_hits": 2}
+    assert collector.events() == {"sec.cache_hits": 2}
+
+    collector.write_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert [e["ph"] for e in trace["traceEvents"]] == ["X", "X", "C"]
+    assert trace["traceEvents"][2]["args"]["clean_html.chars_in"] == 150
+    assert trace["counters"]["sec.cache_hits"] == 2
+
+
+def test_instrumented_stages_record_characters_tokens_and_retries():
+    profiler.enable()
+    try:
+        clean_html("<p>Item 1. Business</p><script>x()</script>")
+        backend = FakeBackend(errors=[RateLimitError("quota", status=429, retry_after=0)])
+        executor = GeminiExecutor(backend, rpm=None, tpm=None)
+        executor.sleep = lambda seconds: None
+        executor.generate("model", "a prompt")
+        stages = {stage.name: stage for stage in profiler.summary()}
+    finally:
+        profiler.enabled = False
+        profiler.reset()
+
+    assert stages["clean_html"].counters == {"chars_in": 43, "chars_out": len("Item 1. Business")}
+    assert stages["gemini"].calls == 1
+    assert stages["gemini"].counters["retries"] == 1
+    assert stages["gemini"].counters["response_chars"] > 0
+    assert stages["gemini.backoff"].counters == {"retries": 1}
@@ -0,0 +1,41 @@
+import json
+
+from src.qscanner.replay import RecordingTransport, ReplayTransport, make_response
+from src.qscanner.sec_client import SECClient
+
+SUBMISSIONS_URL = "https://data.sec.gov/submissions/CIK0000000101.json"
+DOC_URL = "https://www.sec.gov/Archives/edgar/data/0000000101/000000010124000001/widg-20241231.htm"
+
+
+class FakeTransport:
+    def __init__(self, body):
+        self.body = body
+        self.calls = 0
+
+    def get(self, url, headers=None, stream=False):
+        self.calls += 1
+        return make_response(url, 200, self.body, {"Content-Type": "text/html", "Set-Cookie": "x"})
+
+
+def test_replay_serves_recorded_responses_and_404s_the_rest(tmp_path):
+    ReplayTransport(tmp_path).add(DOC_URL, b"<p>Item 1. Business</p>", headers={"Content-Type": "text/html"})
+
+    replay = ReplayTransport(tmp_path)
+    response = replay.get(DOC_URL)
+    assert response.status_code == 200
+    assert response.text == "<p>Item 1. Business</p>"
+    assert b"".join(replay.get(DOC_URL, stream=True).iter_content(4)) == b"<p>Item 1. Business</p>"
+    assert replay.get(SUBMISSIONS_URL).status_code == 404
+    assert (replay.requests, replay.bytes_served) == (3, 46)
+
+
+def test_recording_transport_records_for_replay(tmp_path):
+    live = FakeTransport(b"<html>filing</html>")
+    recorder = RecordingTransport(live, tmp_path)
+    assert recorder.get(DOC_URL).text == "<html>filing</html>"
+
+    entry = json.loads((tmp_path / "index.json").read_text())[DOC_URL]
+    assert entry["headers"] == {"Content-Type": "text/html"}
+    client = SECClient("test agent", data_dir=tmp_path, transport=ReplayTransport(tmp_path))
+    assert client.fetch_filing_content(DOC_URL) == "<html>filing</html>"
+    assert live.calls == 1
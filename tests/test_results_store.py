@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+from src.qscanner.analyzer import StockAnalyzer
+from src.qscanner.llm_cache import ResponseCache, SQLiteResponseCache
+from src.qscanner.llm_executor import FakeBackend, GeminiExecutor, InvalidResponseError
+from src.qscanner.results_store import MULTI_YEAR, ResultsStore
+from src.qscanner.schemas import MultiYearVerdict, QualitativeAnalysis
+
+MODEL = "gemini-2.5-flash"
+
+
+def qualitative(risk, moat="Strong"):
+    rated = lambda rating: {"rating": rating, "justification": "Per the filing."}
+    scenario = {"trigger": "A customer leaves", "mechanism": "Revenue falls", "management_preparedness": "Aware",
+                "severity": "Severe"}
+    return QualitativeAnalysis.model_validate({
+        "moat": rated(moat), "reinvestment": rated("Adequate"), "management": rated("Strong"),
+        "risk_profile": rated(risk), "scenarios": [scenario] * 3,
+    })
+
+
+def verdict(score, trend="Stable"):
+    return MultiYearVerdict(moat_durability="Durable", strategic_discipline="Consistent", risk_escalation="Some",
+                            risk_trend=trend, management_credibility="Credible", capital_allocation="Disciplined",
+                            score=score, rationale="Evidence across years.")
+
+
+def test_screen_finds_high_quality_names_whose_risk_worsened(tmp_path):
+    store = ResultsStore(tmp_path / "results.sqlite")
+    store.put("WIDG", ["2023-02-01"], MODEL, qualitative("Manageable"))
+    store.put("WIDG", ["2024-02-01"], MODEL, qualitative("High"))
+    store.put("WIDG", ["2022-02-01", "2023-02-01", "2024-02-01"], MODEL, verdict("High"))
+    store.put("GADG", ["2024-03-01"], MODEL, qualitative("Moderate", moat="Excellent"))
+    store.put("GADG", ["2022-03-01", "2024-03-01"], MODEL, verdict("Pristine", "Worsening"))
+    store.put("SAFE", ["2024-01-01"], MODEL, verdict("Pristine"))
+    store.put("MEH", ["2024-01-01"], MODEL, verdict("Moderate", "Worsening"))
+
+    rows = store.screen(MODEL, scores=["Pristine", "High"], risk_worsened=True)
+
+    assert [r.ticker for r in rows] == ["GADG", "WIDG"]
+    assert (rows[1].previous_risk_profile, rows[1].risk_profile, rows[1].score) == ("Manageable", "High", "High")
+    assert [r.ticker for r in store.screen(MODEL, moats=["Excellent"])] == ["GADG"]
+    assert store.screen("another-model") == []
+    assert store.get("GADG", MODEL, MULTI_YEAR).risk_trend == "Worsening"
+
+
+def test_structured_answers_are_validated_and_cached(tmp_path):
+    answers = [json.dumps({"score": "High"}), qualitative("Moderate").model_dump_json()]
+    backend = FakeBackend(responder=lambda prompt: answers.pop(0))
+    cache = ResponseCache(SQLiteResponseCache(tmp_path / "llm.sqlite"))
+    analyzer = StockAnalyzer(cache=cache, executor=GeminiExecutor(backend, rpm=None, tpm=None))
+
+    with pytest.raises(InvalidResponseError):
+        analyzer.assess_qualitative("WIDG", "business", "mda", "risk")
+    analysis = analyzer.assess_qualitative("WIDG", "business", "mda", "risk")
+    again = analyzer.assess_qualitative("WIDG", "business", "mda", "risk")
+
+    assert backend.calls == 2 and again == analysis  # The invalid answer was not cached; the valid one was
+    assert analysis.headline()["risk_profile"] == "Moderate"
+    assert "4. Risk Profile: Moderate" in analysis.render()
+    assert len(analysis.scenarios) == 3
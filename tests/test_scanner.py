@@ -0,0 +1,80 @@
+import json
+
+from src.qscanner.scanner import BatchScanner, Checkpoint, ResultWriter, load_watchlist
+
+FILING_HTML = """
+<p>Item 1. Business</p><p>{ticker} sells widgets.</p>
+<p>Item 1A. Risk Factors</p><p>Widgets may break.</p>
+<p>Item 7. Management's Discussion</p><p>Sales rose.</p>
+<p>Item 7A. Quantitative</p>
+"""
+
+
+class FakeClient:
+    def get_cik(self, ticker):
+        return {"AAPL": "0000320193", "MSFT": "0000789019", "BOOM": "0000000001"}.get(ticker)
+
+    def get_10k_urls(self, cik, limit=3):
+        return [{"date": "2024-11-01", "url": cik}]
+
+    def fetch_filing_content(self, url):
+        return FILING_HTML.format(ticker=url)
+
+
+class FakeAnalyzer:
+    def __init__(self):
+        self.calls = []
+
+    def analyze_qualitative(self, ticker, business, mda, risk, financials=None):
+        self.calls.append(ticker)
+        if ticker == "BOOM":
+            raise RuntimeError("quota exceeded")
+        return f"{ticker}: Moat Strong"
+
+
+def test_load_watchlist(tmp_path):
+    path = tmp_path / "watchlist.csv"
+    path.write_text("ticker,name\naapl,Apple\n# comment\n\nMSFT,Microsoft\nAAPL,dup\n")
+    assert load_watchlist(path) == ["AAPL", "MSFT"]
+
+
+def test_scan_streams_results_and_resumes_from_checkpoint(tmp_path):
+    output = tmp_path / "results.jsonl"
+    checkpoint = Checkpoint(tmp_path / "results.jsonl.checkpoint")
+    analyzer = FakeAnalyzer()
+    scanner = BatchScanner(FakeClient(), analyzer, sec_workers=2, llm_workers=2)
+
+    writer = ResultWriter(output)
+    summary = scanner.run(["AAPL", "NOPE", "BOOM"], writer, checkpoint)
+    writer.close()
+
+    results = {r["ticker"]: r for r in map(json.loads, output.read_text().splitlines())}
+    assert summary == {"skipped": 0, "ok": 1, "not_found": 1, "error": 1}
+    assert results["AAPL"]["report"] == "AAPL: Moat Strong"
+    assert results["BOOM"]["error"] == "quota exceeded"
+    assert checkpoint.completed() == {"AAPL", "NOPE"}
+
+    writer = ResultWriter(output, append=True, retain=checkpoint.completed())
+    summary = scanner.run(["AAPL", "BOOM", "MSFT"], writer, checkpoint)
+    writer.close()
+
+    assert summary["skipped"] == 1  # NOPE is checkpointed but not in this list
+    assert analyzer.calls.count("AAPL") == 1
+    tickers = [json.loads(line)["ticker"] for line in output.read_text().splitlines()]
+    assert sorted(tickers) == ["AAPL", "BOOM", "MSFT", "NOPE"]  # The retried BOOM error row is replaced
+
+
+def test_resumed_csv_drops_rows_that_will_be_retried(tmp_path):
+    output = tmp_path / "results.csv"
+    writer = ResultWriter(output)
+    writer.write({"ticker": "AAPL", "status": "ok", "filing_dates": ["2024-11-01"], "report": "fine"})
+    writer.write({"ticker": "BOOM", "status": "error", "error": "quota exceeded"})
+    writer.close()
+
+    writer = ResultWriter(output, append=True, retain={"AAPL"})
+    writer.write({"ticker": "BOOM", "status": "ok", "report": "recovered"})
+    writer.close()
+
+    lines = output.read_text().splitlines()
+    assert lines[0].startswith("ticker,") and len(lines) == 3
+    assert lines[1].startswith("AAPL,") and lines[2].startswith("BOOM,") and "recovered" in lines[2]
@@ -0,0 +1,84 @@
+import json
+
+import pytest
+from typer.testing import CliRunner
+
+from src.qscanner.main import app
+from src.qscanner.search_index import SearchError, SearchIndex
+from src.qscanner.section_store import SectionStore
+from src.qscanner.sections import process_filing
+
+
+def filing(risk):
+    return process_filing(f"""
+<p>Item 1. Business</p><p>We sell widgets to hardware stores across the country.</p>
+<p>Item 1A. Risk Factors</p><p>{risk}</p>
+<p>Item 7. Management's Discussion and Analysis</p><p>Revenue grew on higher volumes.</p>
+""")
+
+
+def populated_store(tmp_path):
+    store = SectionStore(tmp_path / "sections.sqlite")
+    store.put("0000000001", "acc-2023", filing("Widgets may fall out of fashion."), filing_date="2023-11-01")
+    store.put("0000000001", "acc-2024", filing(
+        "One customer accounted for 40% of revenue; this concentration of customers is a risk."),
+        filing_date="2024-11-01")
+    store.put("0000000002", "acc-2024", filing(
+        "Substantial doubt exists about our ability to continue as a going concern."), filing_date="2024-03-01")
+    return store
+
+
+def test_phrase_and_proximity_queries(tmp_path):
+    index = SearchIndex(tmp_path / "search.sqlite")
+    tickers = {"0000000001": "widg"}
+    assert index.update(populated_store(tmp_path), tickers.get) == {"added": 3, "removed": 0}
+
+    [hit] = index.search('"going concern"')
+    assert (hit.ticker, hit.filing_date, hit.item) == ("0000000002", "2024-03-01", "Item 1A")
+    assert "continue as a [going concern]" in hit.snippet
+
+    [hit] = index.search('NEAR("customer" "concentration", 5)')
+    assert (hit.ticker, hit.accession) == ("WIDG", "acc-2024")
+    assert index.search('NEAR("widgets" "concentration", 2)') == []
+    assert {h.item for h in index.search("widgets", tickers=["widg"])} == {"Item 1", "Item 1A"}
+    assert [h.accession for h in index.search("widgets", items=["risk"])] == ["acc-2023"]
+    assert [h.filing_date for h in index.search("revenue", tickers=["WIDG"], items=["7"], since="2024-01-01")] \
+        == ["2024-11-01"]
+    with pytest.raises(SearchError):
+        index.search('"unbalanced')
+
+
+def test_added_language_and_incremental_updates(tmp_path):
+    store = populated_store(tmp_path)
+    index = SearchIndex(tmp_path / "search.sqlite")
+    index.update(store)
+
+    # MD&A discusses revenue every year; customers appear from 2024, and the second filer has no earlier year.
+    assert index.search("revenue", items=["mda"], added=True) == []
+    assert [h.accession for h in index.search("customers", added=True)] == ["acc-2024"]
+    assert index.search("going concern", added=True) == []
+
+    assert index.update(store) == {"added": 0, "removed": 0}
+    store.put("0000000002", "acc-2025", filing("Going concern doubts were resolved."), filing_date="2025-03-01")
+    assert index.update(store) == {"added": 1, "removed": 0}
+    assert index.stats() == {"filings": 4, "companies": 2, "sections": 12}
+
+    assert SearchIndex(tmp_path / "search.sqlite").update(SectionStore(store.path, version="new")) \
+        == {"added": 0, "removed": 0}
+    assert index.stats()["filings"] == 0
+
+
+def test_search_command(tmp_path, monkeypatch):
+    monkeypatch.setenv("QSCANNER_CACHE_DIR", str(tmp_path))
+    populated_store(tmp_path)
+    monkeypatch.setattr("src.qscanner.sec_client.SECClient.get_tickers_for_cik",
+                        lambda self, cik: [])
+
+    result = CliRunner().invoke(app, ["search", '"going concern"', "--json"])
+    assert result.exit_code == 0, result.output
+    [line] = result.output.splitlines()[-1:]
+    assert json.loads(line)["cik"] == "0000000002"
+
+    result = CliRunner().invoke(app, ["search", "NEAR(widgets"])
+    assert result.exit_code == 1
+    assert "Invalid search query" in result.output
@@ -0,0 +1,48 @@
+from src.qscanner.section_diff import diff_section, year_over_year
+
+RISKS_2023 = """Item 1A. Risk Factors
+Our business depends on continued demand for widgets from hardware retailers in North America.
+We face intense competition from low-cost manufacturers, which may reduce our margins in fiscal 2023.
+Our credit facility contains covenants that restrict our ability to pay dividends and repurchase shares.
+Changes in tax law could adversely affect our effective tax rate and results of operations.
+"""
+
+RISKS_2024 = """Item 1A. Risk Factors
+Our business depends on continued demand for widgets from hardware retailers in North America.
+We face intense competition from low-cost manufacturers, which may reduce our margins in fiscal 2024.
+Our credit facility contains covenants that restrict our ability to pay dividends and repurchase shares, and we were not in compliance with one of them at year end.
+A single customer accounted for 35% of our revenue and the loss of that customer would harm us.
+"""
+
+
+def test_paragraphs_are_classified():
+    diff = diff_section(RISKS_2023, RISKS_2024, "risk")
+
+    assert diff.unchanged == 2  # Verbatim, and only the fiscal year rolled forward
+    assert [r.new for r in diff.reworded] == [RISKS_2024.splitlines()[3]]
+    assert diff.added == [RISKS_2024.splitlines()[4]]
+    assert diff.removed == [RISKS_2023.splitlines()[4]]
+    assert diff.summary() == "Item 1A: 1 added, 1 removed, 1 materially reworded, 2 unchanged paragraphs"
+
+
+def test_changes_omit_unchanged_text():
+    changes = diff_section(RISKS_2023, RISKS_2024, "risk").changes().splitlines()
+
+    assert changes[0].startswith("[ADDED] A single customer")
+    assert changes[1].startswith("[REWORDED] Our credit facility") and "(previously: " in changes[1]
+    assert changes[2].startswith("[REMOVED] Changes in tax law")
+    assert len(changes) == 3
+
+
+def test_year_over_year_pairs_consecutive_filings():
+    filings = [
+        {"date": "2024-02-01", "risk": RISKS_2024, "mda": ""},
+        {"date": "2022-02-01", "risk": RISKS_2023, "mda": ""},
+        {"date": "2023-02-01", "risk": RISKS_2023, "mda": ""},
+    ]
+
+    changes = year_over_year(filings)
+
+    assert sorted(changes) == ["2023-02-01", "2024-02-01"]
+    assert changes["2023-02-01"]["risk"].changed == 0
+    assert changes["2024-02-01"]["risk"].changed == 3
@@ -0,0 +1,54 @@
+from src.qscanner.pipeline import FilingPipeline
+from src.qscanner.section_store import SectionStore, extractor_version
+from src.qscanner.sections import process_filing
+
+FILING_HTML = """
+<p>PART I</p>
+<p>Item 1. Business</p><p>We sell widgets to hardware stores across the country.</p>
+<p>Item 1A. Risk Factors</p><p>Widgets may fall out of fashion at any time.</p>
+<p>Item 7. Management's Discussion and Analysis</p><p>Revenue grew on higher volumes.</p>
+"""
+
+
+class CountingClient:
+    def __init__(self):
+        self.fetches = 0
+
+    def fetch_filing_content(self, url):
+        self.fetches += 1
+        return FILING_HTML
+
+
+def test_roundtrip_preserves_sections(tmp_path):
+    store = SectionStore(tmp_path / "sections.sqlite")
+    processed = process_filing(FILING_HTML)
+
+    store.put("320193", "0000320193-24-000123", processed, filing_date="2024-11-01")
+
+    assert store.get("320193", "0000320193-24-000123").sections() == processed.sections()
+    assert store.get("320193", "0000320193-23-000106") is None
+
+
+def test_extractor_change_invalidates_stored_filings(tmp_path):
+    path = tmp_path / "sections.sqlite"
+    SectionStore(path, version="old").put("320193", "acc", process_filing(FILING_HTML))
+
+    assert SectionStore(path, version="old").get("320193", "acc") is not None
+    assert SectionStore(path).version == extractor_version()
+    assert SectionStore(path).get("320193", "acc") is None
+    assert SectionStore(path, version="old").get("320193", "acc") is not None  # Kept for older processes
+    assert SectionStore(path).prune() == 1
+    assert SectionStore(path, version="old").get("320193", "acc") is None
+
+
+def test_pipeline_skips_stored_filings(tmp_path):
+    store = SectionStore(tmp_path / "sections.sqlite")
+    client = CountingClient()
+    filings_info = [{"date": "2024-11-01", "url": "https://example/2024", "accession": "acc-2024"}]
+
+    first = FilingPipeline(client, parse_workers=0, store=store).run(filings_info, cik="320193")
+    second = FilingPipeline(client, parse_workers=0, store=store).run(filings_info, cik="320193")
+
+    assert client.fetches == 1
+    assert second == first
+    assert "hardware stores" in second[0]["business"]
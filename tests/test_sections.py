@@ -0,0 +1,68 @@
+from src.qscanner.pipeline import extract_filing_sections
+from src.qscanner.sections import SectionIndex
+
+FILING_TEXT = """Table of Contents
+Item 1. Business ........ 4
+Item 1A. Risk Factors 12
+Item 7. Management's Discussion and Analysis 30
+PART I
+Item 1. Business
+We design and sell widgets through a global network of partners.
+Item 1A. Risk Factors
+Demand for widgets may decline. As discussed in Item 7, margins vary.
+Item 2. Properties
+We lease our headquarters.
+Item 3. Legal Proceedings
+None of material significance to the widget business.
+PART II
+Item 5. Market for Registrant's Common Equity
+Our stock trades on Nasdaq under the symbol WIDG today.
+Item 7. Management's Discussion and Analysis
+Revenue grew 12% on higher widget volumes across all regions.
+Item 9A. Controls and Procedures
+Our controls were effective as of the end of the fiscal year covered.
+"""
+
+
+def test_every_item_is_located_in_one_scan():
+    index = SectionIndex(FILING_TEXT)
+
+    assert index.section("Item 1").startswith("Item 1. Business\nWe design")
+    assert index.section("Item 1A").endswith("margins vary.\n")
+    assert "Nasdaq" in index.section("Item 5")
+    assert index.section("Item 7").startswith("Item 7. Management's Discussion and Analysis\nRevenue grew")
+    assert sum(h.is_toc for h in index.headings) == 3
+
+
+def test_missing_end_boundary_is_reported():
+    index = SectionIndex(FILING_TEXT)
+
+    assert index.span("Item 3").end == FILING_TEXT.index("PART II\nItem 5") + len("PART II\n")
+    last = index.span("Item 9A")
+    assert not last.bounded
+    assert index.section("Item 9A", unbounded_chars=20) == FILING_TEXT[last.start:last.start + 20]
+    assert index.span("Item 8") is None
+
+
+ANCHORED_HTML = """
+<table>
+<tr><td>Item 1.</td><td><a href="#biz">Business</a></td><td>3</td></tr>
+<tr><td>Item 1A.</td><td><a href="#risk">Risk Factors</a></td><td><a href="#risk">9</a></td></tr>
+<tr><td><a href="#mda">Item 7. Management's Discussion and Analysis</a></td><td>30</td></tr>
+</table>
+<div id="biz"><span>PART I — Item 1. Business</span></div><div>We design and sell widgets.</div>
+<div id="risk"><span>RISK FACTORS</span></div><div>Widget demand is cyclical and may decline sharply.</div>
+<div><a name="mda"></a><span>Item 7. Management's Discussion and Analysis</span></div>
+<div>Revenue grew 12% on higher widget volumes across all regions.</div>
+<div><span>Item 8. Financial Statements and Supplementary Data</span></div>
+"""
+
+
+def test_toc_anchors_locate_unlabelled_headings():
+    sections = extract_filing_sections(ANCHORED_HTML)
+
+    assert sections["business"].startswith("PART I — Item 1. Business")
+    assert sections["business"].rstrip().endswith("We design and sell widgets.")
+    assert sections["risk"].startswith("RISK FACTORS Widget demand")
+    assert sections["mda"].startswith("Item 7. Management's Discussion")
+    assert "Item 8" not in sections["mda"]
@@ -0,0 +1,49 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from src.qscanner.filing_index import SUBMISSIONS_BASE
+from src.qscanner.replay import ReplayTransport
+from src.qscanner.ticker_index import TICKERS_URL
+
+ROOT = Path(__file__).resolve().parent.parent
+# Imported only by the commands that analyze filings.
+HEAVY_MODULES = ["google.genai", "numpy", "lxml", "bs4", "pydantic"]
+
+RUN_CLI = """
+import sys
+from src.qscanner.main import app
+try:
+    app(sys.argv[1:], prog_name="qscanner")
+except SystemExit:
+    pass
+print("LOADED", [name for name in {heavy!r} if name in sys.modules])
+"""
+
+
+def loaded_modules(args, env):
+    """Runs the CLI in a fresh interpreter and returns its output and the heavy modules it imported."""
+    result = subprocess.run([sys.executable, "-c", RUN_CLI.format(heavy=HEAVY_MODULES), *args],
+                            cwd=ROOT, env={**os.environ, **env}, capture_output=True, text=True, timeout=60)
+    output, _, loaded = result.stdout.rpartition("LOADED ")
+    assert loaded, result.stderr
+    return output, ast.literal_eval(loaded)
+
+
+def test_help_and_check_filings_skip_the_analysis_stack(tmp_path):
+    replay = ReplayTransport(tmp_path / "replay")
+    replay.add(TICKERS_URL, json.dumps({"0": {"cik_str": 101, "ticker": "WIDG", "title": "Widgets"}}).encode())
+    recent = {"form": ["10-K", "10-Q"], "accessionNumber": ["acc-1", "acc-2"],
+              "filingDate": ["2025-02-01", "2025-05-01"], "primaryDocument": ["widg-10k.htm", "widg-10q.htm"]}
+    replay.add(f"{SUBMISSIONS_BASE}CIK0000000101.json",
+               json.dumps({"cik": "101", "tickers": ["WIDG"], "filings": {"recent": recent}}).encode())
+    env = {"QSCANNER_CACHE_DIR": str(tmp_path / "cache"), "QSCANNER_REPLAY_DIR": str(tmp_path / "replay")}
+
+    output, loaded = loaded_modules(["--help"], env)
+    assert "check-filings" in output and loaded == []
+
+    output, loaded = loaded_modules(["check-filings", "WIDG"], env)
+    assert "2025-02-01" in output and loaded == []
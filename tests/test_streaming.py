@@ -0,0 +1,111 @@
+import pytest
+
+from src.qscanner.cache import HTTPCache
+from src.qscanner.html_text import CleanTextStream, html_to_text
+from src.qscanner.pipeline import FilingPipeline
+from src.qscanner.replay import ReplayTransport
+from src.qscanner.sec_client import SECClient
+from src.qscanner.section_store import SectionStore
+from src.qscanner.sections import ANALYZED_SECTIONS, process_filing, process_filing_stream
+
+DOC_URL = "https://www.sec.gov/Archives/edgar/data/101/000010125000001/widg-20241231.htm"
+MDA = "Revenue grew on higher widget volumes across every region we serve. " * 40
+
+
+def filing_html(block="p", toc_pages=True):
+    """A 10-K with a linked table of contents and a long Item 8; block='div' puts it all on one line."""
+    page = lambda n: f" {n}" if toc_pages else ""
+    row = lambda item, title, n: f'<{block}><a href="#i{item}">Item {item}. {title}</a>{page(n)}</{block}>'
+    body = lambda item, title, text: (f'<{block} id="i{item}">Item {item}.&#160;&#160;{title}</{block}>'
+                                      f'<{block}>{text}</{block}>')
+    statements = "".join(f"<{block}>Net sales {i:,} {i * 3:,} {i * 7:,}</{block}>" for i in range(3000))
+    return "".join([
+        "<html><body>",
+        row("1", "Business", 3), row("1A", "Risk Factors", 9), row("7", "Management's Discussion", 30),
+        row("7A", "Quantitative and Qualitative Disclosures", 41), row("8", "Financial Statements", 42),
+        f"<{block}>PART I</{block}>",
+        body("1", "Business", "We sell widgets to hardware stores. " * 20),
+        body("1A", "Risk Factors", "Widgets may fall out of fashion. " * 20),
+        body("7", "Management's Discussion and Analysis", MDA),
+        body("7A", "Quantitative and Qualitative Disclosures About Market Risk", "Rates may rise."),
+        body("8", "Financial Statements and Supplementary Data", statements),
+        body("9A", "Controls and Procedures", "Our controls were effective."),
+        "</body></html>",
+    ])
+
+
+def chunked(html, size=4096):
+    """The document in chunks, recording how many were read."""
+    chunked.read = 0
+    for i in range(0, len(html), size):
+        chunked.read += 1
+        yield html[i:i + size]
+
+
+def test_partial_line_is_a_prefix_of_the_finished_line():
+    html = "<div>Item&#160;1.  Business \xa0 We  sell</div><div>  widgets   to stores.</div>" * 50
+    stream = CleanTextStream()
+    partials = []
+    for i in range(0, len(html), 37):
+        assert stream.feed(html[i:i + 37]) == []
+        partials.append(stream.partial())
+    [line] = stream.close()
+    assert line == html_to_text(html)
+    assert all(line.startswith(p) for p in partials) and len(partials[-1]) > len(line) - 40
+
+
+@pytest.mark.parametrize("block,toc_pages", [("p", True), ("div", False)])
+def test_download_stops_after_the_requested_sections(block, toc_pages):
+    html = filing_html(block, toc_pages)
+    full = process_filing(html)
+
+    streamed = process_filing_stream(chunked(html), ANALYZED_SECTIONS)
+
+    assert streamed.truncated and streamed.covers(ANALYZED_SECTIONS)
+    assert chunked.read < len(html) / 4096 / 3  # Most of Item 8 was never read
+    assert full.text.startswith(streamed.text)
+    assert all(streamed.sections()[key] == full.sections()[key] for key in ANALYZED_SECTIONS)
+    assert MDA.strip() in streamed.sections()["mda"]
+    assert not streamed.covers(["controls"])
+
+
+def test_whole_document_is_read_without_a_later_heading():
+    html = filing_html().split('<p id="i7A">')[0] + "</body></html>"
+
+    streamed = process_filing_stream(chunked(html, 512), ANALYZED_SECTIONS)
+
+    assert not streamed.truncated
+    assert streamed == process_filing(html)
+
+
+def test_streamed_filings_are_stored_but_not_cached_whole(tmp_path):
+    replay = ReplayTransport(tmp_path / "replay")
+    replay.add(DOC_URL, filing_html().encode(), headers={"Content-Type": "text/html"})
+    cache = HTTPCache(tmp_path / "http")
+    client = SECClient("test agent", cache=cache, data_dir=tmp_path, transport=replay)
+    store = SectionStore(tmp_path / "sections.sqlite")
+    filings_info = [{"date": "2025-02-01", "url": DOC_URL, "accession": "acc"}]
+
+    [streamed] = FilingPipeline(client, store=store, sections=ANALYZED_SECTIONS).run(filings_info, cik="101")
+    assert MDA.strip() in streamed["mda"] and streamed["controls"] == ""
+    assert cache.get(DOC_URL) is None and store.get("101", "acc").truncated
+
+    # Served from the store while only the analyzed sections are needed...
+    FilingPipeline(client, store=store, sections=ANALYZED_SECTIONS).run(filings_info, cik="101")
+    assert replay.requests == 1
+    # ...and downloaded whole (and cached) once every section is.
+    [full] = FilingPipeline(client, parse_workers=0, store=store).run(filings_info, cik="101")
+    assert full["controls"].startswith("Item 9A") and full["mda"] == streamed["mda"]
+    assert replay.requests == 2 and cache.get(DOC_URL) is not None
+    assert not store.get("101", "acc").truncated
+
+
+def test_stream_read_to_the_end_is_cached(tmp_path):
+    replay = ReplayTransport(tmp_path / "replay")
+    replay.add(DOC_URL, filing_html().encode(), headers={"Content-Type": "text/html; charset=utf-8"})
+    cache = HTTPCache(tmp_path / "http")
+    client = SECClient("test agent", cache=cache, data_dir=tmp_path, transport=replay)
+
+    assert "".join(client.stream_filing_content(DOC_URL)) == filing_html()
+    assert cache.get(DOC_URL) is not None
+    assert "".join(client.stream_filing_content(DOC_URL)) == filing_html() and replay.requests == 1
@@ -0,0 +1,89 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.qscanner.ticker_index import TickerIndex
+
+TICKERS = {
+    "0": {"cik_str": 320193, "ticker": "AAPL", "title": "Apple Inc."},
+    "1": {"cik_str": 789019, "ticker": "MSFT", "title": "MICROSOFT CORP"},
+    "2": {"cik_str": 1652044, "ticker": "GOOGL", "title": "Alphabet Inc."},
+    "3": {"cik_str": 1652044, "ticker": "GOOG", "title": "Alphabet Inc."},
+}
+
+
+def make_index(tmp_path, **kwargs):
+    calls = []
+
+    def fetch():
+        calls.append(time.time())
+        return TICKERS
+
+    return TickerIndex(tmp_path / "tickers.sqlite", fetch=fetch, **kwargs), calls
+
+
+def test_index_is_built_lazily_and_reused(tmp_path):
+    index, calls = make_index(tmp_path)
+    assert calls == []
+
+    assert index.get_cik("aapl") == "0000320193"
+    assert index.get_cik("ZZZZ") is None
+
+    reopened, reopened_calls = make_index(tmp_path)
+    assert reopened.get_cik("MSFT") == "0000789019"
+    assert len(calls) == 1 and reopened_calls == []
+
+
+def test_reverse_lookup_and_fuzzy_search(tmp_path):
+    index, _ = make_index(tmp_path)
+
+    assert [r.ticker for r in index.lookup_cik("0001652044")] == ["GOOG", "GOOGL"]
+    assert index.search("microsoft")[0].ticker == "MSFT"
+    assert index.search("Alphabt")[0].cik == "0001652044"
+
+
+def test_stale_index_refreshes_in_background(tmp_path):
+    make_index(tmp_path)[0].get_cik("AAPL")
+    time.sleep(0.01)
+
+    index, calls = make_index(tmp_path, max_age=0)
+    assert index.get_cik("AAPL") == "0000320193"
+    index._refresh_thread.join()
+    assert len(calls) == 1
+    assert index.get_cik("GOOG") == "0001652044"
+
+
+def test_very_stale_index_is_rebuilt_before_use(tmp_path):
+    make_index(tmp_path)[0].get_cik("AAPL")
+    time.sleep(0.01)
+
+    index, calls = make_index(tmp_path, max_age=0, max_stale_age=0)
+    assert index.get_cik("AAPL") == "0000320193"
+    assert len(calls) == 1 and index._refresh_thread is None
+
+
+def test_failed_rebuild_leaves_no_temp_file_and_keeps_the_index(tmp_path):
+    make_index(tmp_path)[0].get_cik("AAPL")
+    abandoned = tmp_path / "tickers.killed.tmp"
+    abandoned.write_text("left over by a killed rebuild")
+    os.utime(abandoned, (time.time() - 2 * 60 * 60,) * 2)
+    (tmp_path / "tickers.building.tmp").write_text("another process's rebuild in progress")
+    time.sleep(0.01)
+
+    def fetch():
+        raise OSError("SEC unreachable")
+
+    index = TickerIndex(tmp_path / "tickers.sqlite", fetch=fetch, max_age=0, max_stale_age=0)
+    assert index.get_cik("AAPL") == "0000320193"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tickers.building.tmp", "tickers.sqlite"]
+
+
+def test_concurrent_rebuilds_do_not_collide(tmp_path):
+    # Separate instances stand in for separate processes: they share no lock.
+    indexes = [make_index(tmp_path)[0] for _ in range(3)]
+    for index in indexes:
+        index.fetch = lambda: time.sleep(0.1) or TICKERS
+    with ThreadPoolExecutor(3) as pool:
+        list(pool.map(lambda index: index.refresh(), indexes))
+    assert indexes[0].get_cik("MSFT") == "0000789019"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tickers.sqlite"]
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+import requests
+from typer.testing import CliRunner
+
+from src.qscanner import main
+from src.qscanner.main import app
+from src.qscanner.transport import (CircuitBreaker, CircuitOpenError, SECTransport, TokenBucket,
+                                    TransportError, parse_retry_after)
+
+
+class FakeSession:
+    def __init__(self, outcomes):
+        self.headers = {}
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        response = requests.Response()
+        response._content, response._content_consumed = b"", True
+        response.status_code, response.headers["Retry-After"] = outcome
+        return response
+
+
+def make_transport(outcomes, **kwargs):
+    transport = SECTransport("test agent", rate=1000, session=FakeSession(outcomes), **kwargs)
+    transport.sleeps = []
+    transport.sleep = transport.sleeps.append
+    return transport
+
+
+def test_token_bucket_paces_concurrent_callers():
+    bucket = TokenBucket(rate=50)
+    start = time.monotonic()
+    threads = [threading.Thread(target=bucket.acquire) for _ in range(11)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # The first token is available immediately; the other ten are spaced 20ms apart.
+    assert 0.18 <= time.monotonic() - start < 0.5
+
+
+def test_retry_after_is_honored_then_success():
+    transport = make_transport([(429, "3"), (503, ""), (200, "")])
+
+    assert transport.get("https://data.sec.gov/x").status_code == 200
+    assert transport.sleeps[0] == 3.0
+    assert 0 <= transport.sleeps[1] <= 2.0
+
+
+def test_retries_are_bounded():
+    transport = make_transport([(503, "")] * 3, max_retries=2)
+    assert transport.get("https://data.sec.gov/x").status_code == 503
+    assert transport.session.calls == 3
+
+    failing = make_transport([requests.ConnectionError("down")] * 2, max_retries=1)
+    with pytest.raises(TransportError):
+        failing.get("https://data.sec.gov/x")
+
+
+def test_circuit_breaker_opens_after_repeated_failures():
+    transport = make_transport([(503, "")] * 4, max_retries=3,
+                               breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    with pytest.raises(CircuitOpenError):
+        transport.get("https://data.sec.gov/x")
+    assert transport.session.calls == 2
+
+
+def test_parse_retry_after_http_date():
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+
+
+def test_commands_report_failed_sec_requests(tmp_path, monkeypatch):
+    monkeypatch.setenv("QSCANNER_CACHE_DIR", str(tmp_path))
+    failing = make_transport([requests.ConnectionError("down")] * 2, max_retries=1)
+    monkeypatch.setattr(main, "build_transport", lambda user_agent, use_daemon=True: failing)
+
+    result = CliRunner().invoke(app, ["check-filings", "WIDG"])
+    assert result.exit_code == 1 and not isinstance(result.exception, TransportError)
+    assert "SEC request failed" in result.output and "Traceback" not in result.output